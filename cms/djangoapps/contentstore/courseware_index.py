@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 from abc import ABCMeta, abstractmethod
 from datetime import timedelta
+import hashlib
 import logging
 import re
 from six import add_metaclass
@@ -12,6 +13,7 @@ from django.core.urlresolvers import resolve
 
 from contentstore.utils import course_image_url
 from contentstore.course_group_config import GroupConfiguration
+from contentstore.models import SearchIndexVersion
 from course_modes.models import CourseMode
 from eventtracking import tracker
 from search.search_engine_base import SearchEngine
@@ -26,6 +28,9 @@ from xmodule.library_tools import normalize_key_for_search
 # how far back from the trigger point to look back in order to index
 REINDEX_AGE = timedelta(0, 60)  # 60 seconds
 
+# The number of items sent to the search engine in each bulk index or remove request
+INDEX_BATCH_SIZE = 500
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -111,7 +116,23 @@ class SearchIndexerBase(object):
             exclude_dictionary={"id": list(exclude_items)}
         )
         result_ids = [result["data"]["id"] for result in response["results"]]
-        searcher.remove(cls.DOCUMENT_TYPE, result_ids)
+        for start in range(0, len(result_ids), INDEX_BATCH_SIZE):
+            searcher.remove(cls.DOCUMENT_TYPE, result_ids[start:start + INDEX_BATCH_SIZE])
+
+    @staticmethod
+    def _structure_version(structure):
+        """
+        Returns the version of the published structure, or None if the modulestore doesn't version structures
+        """
+        version = getattr(structure.location.course_key, "version_guid", None)
+        return unicode(version) if version else None
+
+    @staticmethod
+    def _items_digest(indexed_items):
+        """
+        Returns a digest of the ids of the items that are kept in the index
+        """
+        return hashlib.sha1(u"\n".join(sorted(indexed_items)).encode("utf-8")).hexdigest()
 
     @classmethod
     def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE):
@@ -130,6 +151,11 @@ class SearchIndexerBase(object):
             which items may need to be removed from the index
             If None, then a full reindex takes place
 
+        The SearchIndexVersion of the structure records what was last indexed:
+        an update is skipped when the published structure hasn't changed since,
+        becomes a full reindex when the structure was never indexed, and only
+        looks for deleted items when the set of items has changed.
+
         Returns:
         Number of items that have been added to the index
         """
@@ -140,6 +166,9 @@ class SearchIndexerBase(object):
 
         structure_key = cls.normalize_structure_key(structure_key)
         location_info = cls._get_location_info(structure_key)
+        index_version = SearchIndexVersion.get_for_structure(cls.INDEX_NAME, structure_key)
+        if index_version is None:
+            triggered_at = None
 
         # Wrap counter in dictionary - otherwise we seem to lose scope inside the embedded function `prepare_item_index`
         indexed_count = {
@@ -152,9 +181,9 @@ class SearchIndexerBase(object):
         # list - those are ready to be destroyed
         indexed_items = set()
 
-        # items_index is a list of all the items index dictionaries.
-        # it is used to collect all indexes and index them using bulk API,
-        # instead of per item index API call.
+        # items_index is a list of the index dictionaries of the items that have
+        # not been sent to the index yet. They are sent with the bulk API, in
+        # batches of INDEX_BATCH_SIZE, instead of per item index API calls.
         items_index = []
 
         def get_item_location(item):
@@ -163,6 +192,14 @@ class SearchIndexerBase(object):
             """
             return item.location.version_agnostic().replace(branch=None)
 
+        def flush_items_index():
+            """
+            Send the pending index dictionaries to the index
+            """
+            if items_index:
+                searcher.index(cls.DOCUMENT_TYPE, list(items_index))
+                del items_index[:]
+
         def prepare_item_index(item, skip_index=False, groups_usage_info=None):
             """
             Add this item to the items_index and indexed_items list
@@ -179,9 +216,13 @@ class SearchIndexerBase(object):
             item_content_groups - content groups assigned to indexed item
             """
             is_indexable = hasattr(item, "index_dictionary")
-            item_index_dictionary = item.index_dictionary() if is_indexable else None
             # if it's not indexable and it does not have children, then ignore
-            if not item_index_dictionary and not item.has_children:
+            if not is_indexable and not item.has_children:
+                return
+
+            # building the index dictionary strips the html of the content, so only do it for changed items
+            item_index_dictionary = item.index_dictionary() if is_indexable and not skip_index else None
+            if not skip_index and not item_index_dictionary and not item.has_children:
                 return
 
             item_content_groups = None
@@ -240,15 +281,27 @@ class SearchIndexerBase(object):
                 item_index.update(cls.supplemental_fields(item))
                 items_index.append(item_index)
                 indexed_count["count"] += 1
+                if len(items_index) >= INDEX_BATCH_SIZE:
+                    flush_items_index()
                 return item_content_groups
             except Exception as err:  # pylint: disable=broad-except
                 # broad exception so that index operation does not fail on one item of many
                 log.warning('Could not index item: %s - %r', item.location, err)
                 error_list.append(_('Could not index item: {}').format(item.location))
 
+        structure_version = None
+        items_digest = None
         try:
             with modulestore.branch_setting(ModuleStoreEnum.RevisionOption.published_only):
                 structure = cls._fetch_top_level(modulestore, structure_key)
+                structure_version = cls._structure_version(structure)
+                if (
+                        triggered_at is not None and structure_version is not None and
+                        structure_version == index_version.structure_version
+                ):
+                    log.info('Search index of %s is up to date with version %s', structure_key, structure_version)
+                    return 0
+
                 groups_usage_info = cls.fetch_group_usage(modulestore, structure)
 
                 # First perform any additional indexing from the structure object
@@ -257,8 +310,12 @@ class SearchIndexerBase(object):
                 # Now index the content
                 for item in structure.get_children():
                     prepare_item_index(item, groups_usage_info=groups_usage_info)
-                searcher.index(cls.DOCUMENT_TYPE, items_index)
-                cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                flush_items_index()
+
+                # Only look for deleted items if the set of items isn't the one indexed last time
+                items_digest = cls._items_digest(indexed_items)
+                if index_version is None or items_digest != index_version.items_digest:
+                    cls.remove_deleted_items(searcher, structure_key, indexed_items)
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -271,6 +328,7 @@ class SearchIndexerBase(object):
         if error_list:
             raise SearchIndexingError('Error(s) present during indexing', error_list)
 
+        SearchIndexVersion.record(cls.INDEX_NAME, structure_key, structure_version, items_digest)
         return indexed_count["count"]
 
     @classmethod
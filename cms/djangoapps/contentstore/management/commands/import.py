@@ -5,7 +5,7 @@ Script for importing courseware from XML format
 from django.core.management.base import BaseCommand, CommandError, make_option
 from django_comment_common.utils import (seed_permissions_roles,
                                          are_permissions_roles_seeded)
-from xmodule.modulestore.xml_importer import import_course_from_xml
+from xmodule.modulestore.xml_importer import import_course_from_xml, DEFAULT_STATIC_IMPORT_WORKERS
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 from xmodule.contentstore.django import contentstore
@@ -21,6 +21,13 @@ class Command(BaseCommand):
         make_option('--nostatic',
                     action='store_true',
                     help='Skip import of static content'),
+        make_option('--workers',
+                    type='int',
+                    default=DEFAULT_STATIC_IMPORT_WORKERS,
+                    help='How many threads upload static content at once'),
+        make_option('--incremental',
+                    action='store_true',
+                    help='Only write the blocks and static content that changed since the last import'),
     )
 
     def handle(self, *args, **options):
@@ -45,6 +52,8 @@ class Command(BaseCommand):
             static_content_store=contentstore(), verbose=True,
             do_import_static=do_import_static,
             create_if_not_present=True,
+            static_import_workers=options['workers'],
+            incremental=options.get('incremental', False),
         )
 
         for course in course_items:
@@ -3,9 +3,12 @@ Models for contentstore
 """
 # pylint: disable=no-member
 
+from django.db import models
 from django.db.models.fields import TextField
+from django.utils import timezone
 
 from config_models.models import ConfigurationModel
+from xmodule_django.models import CourseKeyField
 
 
 class VideoUploadConfig(ConfigurationModel):
@@ -23,3 +26,47 @@ class VideoUploadConfig(ConfigurationModel):
 
 class PushNotificationConfig(ConfigurationModel):
     """Configuration for mobile push notifications."""
+
+
+class SearchIndexVersion(models.Model):
+    """
+    What was last indexed for search of a course or library.
+
+    Index updates use it to skip structures whose published version hasn't
+    changed, and to only look for deleted items when the set of items has.
+    """
+    index_name = models.CharField(max_length=100)
+    structure_key = CourseKeyField(max_length=255, db_index=True)
+    # the version of the published structure, empty if the modulestore doesn't version structures
+    structure_version = models.CharField(max_length=255, blank=True)
+    # the SHA1 of the ids of the items kept in the index
+    items_digest = models.CharField(max_length=40, blank=True)
+    indexed_at = models.DateTimeField()
+
+    class Meta(object):
+        unique_together = ('index_name', 'structure_key')
+
+    @classmethod
+    def get_for_structure(cls, index_name, structure_key):
+        """
+        Returns the SearchIndexVersion of the structure in the index, or None if it was never indexed.
+        """
+        try:
+            return cls.objects.get(index_name=index_name, structure_key=structure_key)
+        except cls.DoesNotExist:
+            return None
+
+    @classmethod
+    def record(cls, index_name, structure_key, structure_version, items_digest):
+        """
+        Records that the structure has just been indexed.
+        """
+        index_version, __ = cls.objects.get_or_create(
+            index_name=index_name,
+            structure_key=structure_key,
+            defaults={'indexed_at': timezone.now()},
+        )
+        index_version.structure_version = structure_version or ''
+        index_version.items_digest = items_digest or ''
+        index_version.indexed_at = timezone.now()
+        index_version.save()
@@ -1,5 +1,6 @@
-from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content
+from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content, LocalContentCache
 from opaque_keys.edx.locations import Location
+from django.core.cache import cache
 from django.test import TestCase
 
 
@@ -38,3 +39,57 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+    def test_served_from_process(self):
+        set_cached_content(self.mockAsset)
+        cache.delete(unicode(self.unicodeLocation).encode('utf-8'))
+        self.assertEqual(self.mockAsset.content, get_cached_content(self.unicodeLocation).content,
+                         'should be stored in the cache of the process')
+        del_cached_content(self.unicodeLocation)
+
+    def test_lock_checked_in_shared_cache(self):
+        set_cached_content(self.mockAsset)
+        # Another process locks the asset, which drops it from the shared cache.
+        cache.clear()
+        self.assertEqual(None, get_cached_content(self.unicodeLocation),
+                         'should not be served from the cache of the process')
+        del_cached_content(self.unicodeLocation)
+
+
+class LocalContentCacheTestCase(TestCase):
+    """
+    Tests for the process-local tier of the content cache
+    """
+    def setUp(self):
+        super(LocalContentCacheTestCase, self).setUp()
+        self.cache = LocalContentCache(max_bytes=1000, max_entry_bytes=400, timeout=60)
+
+    def test_get_returns_a_copy(self):
+        self.cache.set('key', Content('location', 'my content'))
+        cached = self.cache.get('key')
+        cached.content = 'changed'
+        self.assertEqual(self.cache.get('key').content, 'my content')
+
+    def test_evicts_least_recently_used(self):
+        for key in 'abcde':
+            self.cache.set(key, Content('location', 'x' * 200))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('e'))
+        self.assertLessEqual(self.cache.size, 1000)
+
+    def test_too_big(self):
+        self.cache.set('key', Content('location', 'x' * 500))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_timeout(self):
+        self.cache.timeout = -1
+        self.cache.set('key', Content('location', 'my content'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_delete(self):
+        self.cache.set('key', Content('location', 'my content'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.size, 0)
@@ -5,7 +5,7 @@ import ddt
 import json
 from lazy.lazy import lazy
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from dateutil.tz import tzutc
 from mock import patch, call
 from pytz import UTC
@@ -43,6 +43,7 @@ from contentstore.courseware_index import (
     SearchIndexingError,
     CourseAboutSearchIndexer,
 )
+from contentstore.models import SearchIndexVersion
 from contentstore.signals import listen_for_course_publish, listen_for_library_update
 from contentstore.utils import reverse_course_url, reverse_usage_url
 from contentstore.tests.utils import CourseTestCase
@@ -450,6 +451,41 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
         indexed_count = self.reindex_course(store)
         self.assertEqual(indexed_count, 7)
 
+    def _test_unchanged_structure_index(self, store):
+        """ Make sure that an index update skips structures that haven't been published since they were indexed """
+        self.publish_item(store, self.vertical.location)
+        self.reindex_course(store)
+        index_version = SearchIndexVersion.get_for_structure(CoursewareSearchIndexer.INDEX_NAME, self.course.id)
+        self.assertIsNotNone(index_version)
+
+        with patch(settings.SEARCH_ENGINE + '.index') as mock_index:
+            new_indexed_count = self.index_recent_changes(store, datetime.now(UTC) - timedelta(days=1))
+        if store.get_modulestore_type(self.course.id) == ModuleStoreEnum.Type.split:
+            # the published structure has the version that was indexed
+            self.assertEqual(new_indexed_count, 0)
+            self.assertFalse(mock_index.called)
+        else:
+            self.assertEqual(new_indexed_count, 4)
+            self.assertEqual(
+                SearchIndexVersion.get_for_structure(CoursewareSearchIndexer.INDEX_NAME, self.course.id).items_digest,
+                index_version.items_digest
+            )
+
+    @patch('contentstore.courseware_index.INDEX_BATCH_SIZE', 3)
+    def _test_batched_index(self, store):
+        """ Make sure that items are sent to the index in batches """
+        self.publish_item(store, self.vertical.location)
+        with patch(settings.SEARCH_ENGINE + '.index') as mock_index:
+            indexed_count = self.reindex_course(store)
+        self.assertEqual(indexed_count, 4)
+        self.assertEqual(
+            [
+                len(args[1]) for args, __ in mock_index.call_args_list
+                if args[0] == CoursewareSearchIndexer.DOCUMENT_TYPE
+            ],
+            [3, 1]
+        )
+
     def _test_course_about_property_index(self, store):
         """ Test that informational properties in the course object end up in the course_info index """
         display_name = "Help, I need somebody!"
@@ -582,6 +618,14 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
     def test_exception(self, store_type):
         self._perform_test_using_store(store_type, self._test_exception)
 
+    @ddt.data(*WORKS_WITH_STORES)
+    def test_unchanged_structure_index(self, store_type):
+        self._perform_test_using_store(store_type, self._test_unchanged_structure_index)
+
+    @ddt.data(*WORKS_WITH_STORES)
+    def test_batched_index(self, store_type):
+        self._perform_test_using_store(store_type, self._test_batched_index)
+
     @ddt.data(*WORKS_WITH_STORES)
     def test_course_about_property_index(self, store_type):
         self._perform_test_using_store(store_type, self._test_course_about_property_index)
@@ -9,6 +9,7 @@ from django.test.utils import override_settings
 from django.conf import settings
 import ddt
 import copy
+import mock
 
 from openedx.core.djangoapps.content.course_structures.tests import SignalDisconnectTestMixin
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
@@ -16,7 +17,7 @@ from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.tests.factories import check_exact_number_of_calls, check_number_of_calls
-from xmodule.modulestore.xml_importer import import_course_from_xml
+from xmodule.modulestore.xml_importer import import_course_from_xml, CourseImportManager
 from xmodule.exceptions import NotFoundError
 from uuid import uuid4
 
@@ -147,6 +148,53 @@ class ContentStoreImportTest(SignalDisconnectTestMixin, ModuleStoreTestCase):
         self.assertEqual(len(all_assets), 0)
         self.assertEqual(count, 0)
 
+    @ddt.data(1, 4)
+    def test_asset_import_workers(self, workers):
+        """
+        Static files are all imported, whether uploaded by one thread or several, and their progress is reported
+        """
+        content_store = contentstore()
+        module_store = modulestore()
+        progress = []
+        manager = CourseImportManager(
+            module_store, self.user.id, TEST_DATA_DIR, ['toy'],
+            static_content_store=content_store, create_if_not_present=True,
+            static_import_workers=workers,
+            progress_callback=lambda stage, done, total: progress.append((stage, done, total)),
+        )
+        course = list(manager.run_imports())[0]
+
+        __, count = content_store.get_all_content_for_course(course.id)
+        self.assertEqual(count, 5)
+        static_progress = [(done, total) for stage, done, total in progress if stage == 'static']
+        self.assertEqual(static_progress, [(done, 5) for done in range(1, 6)])
+        children_progress = [(done, total) for stage, done, total in progress if stage == 'children']
+        self.assertEqual(children_progress[-1][0], children_progress[-1][1])
+        self.assertItemsEqual(manager.stage_timings, ['parse', 'static', 'asset_metadata', 'children', 'drafts'])
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_incremental_reimport(self, default_ms_type):
+        """
+        Re-importing an unchanged course incrementally writes no blocks but its root, and no static content
+        """
+        with modulestore().default_store(default_ms_type):
+            module_store = modulestore()
+            content_store = contentstore()
+            course = import_course_from_xml(
+                module_store, self.user.id, TEST_DATA_DIR, ['toy'],
+                static_content_store=content_store, create_if_not_present=True,
+            )[0]
+
+            with mock.patch.object(module_store, 'import_xblock', wraps=module_store.import_xblock) as import_xblock:
+                with mock.patch.object(content_store, 'save') as save:
+                    import_course_from_xml(
+                        module_store, self.user.id, TEST_DATA_DIR, ['toy'],
+                        static_content_store=content_store, target_id=course.id, incremental=True,
+                    )
+            imported_types = set(call[0][2] for call in import_xblock.call_args_list)
+            self.assertLessEqual(imported_types, {'course'})
+            self.assertFalse(save.called)
+
     def test_no_static_link_rewrites_on_import(self):
         module_store = modulestore()
         courses = import_course_from_xml(
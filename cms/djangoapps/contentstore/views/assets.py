@@ -16,6 +16,7 @@ from contentstore.utils import reverse_course_url
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.mongo import content_type_filter
 from xmodule.exceptions import NotFoundError
 from contentstore.views.exception import AssetNotFoundException
 from django.core.exceptions import PermissionDenied
@@ -50,6 +51,10 @@ def assets_handler(request, course_key_string=None, asset_key_string=None):
             page_size: the number of items per page (defaults to 50)
             sort: the asset field to sort by (defaults to "date_added")
             direction: the sort direction (defaults to "descending")
+            asset_type: the type of the assets to return, as in FILES_AND_UPLOAD_TYPE_FILTERS, or "OTHER"
+            cursor: if given, the page after this cursor is returned (the first page if it's empty),
+                along with the cursor of the next one (nextCursor, null on the last page), instead
+                of the page numbered "page"
     POST
         json: create (or update?) an asset. The only updating that can be done is changing the lock state.
     PUT
@@ -101,27 +106,11 @@ def _assets_json(request, course_key):
     requested_page_size = int(request.REQUEST.get('page_size', 50))
     requested_sort = request.REQUEST.get('sort', 'date_added')
     requested_filter = request.REQUEST.get('asset_type', '')
-    requested_file_types = settings.FILES_AND_UPLOAD_TYPE_FILTERS.get(
-        requested_filter, None)
+    content_types, exclude_content_types = _get_requested_content_types(requested_filter)
     filter_params = None
-    if requested_filter:
-        if requested_filter == 'OTHER':
-            all_filters = settings.FILES_AND_UPLOAD_TYPE_FILTERS
-            where = []
-            for all_filter in all_filters:
-                extension_filters = all_filters[all_filter]
-                where.extend(
-                    ["JSON.stringify(this.contentType).toUpperCase() != JSON.stringify('{}').toUpperCase()".format(
-                        extension_filter) for extension_filter in extension_filters])
-            filter_params = {
-                "$where": ' && '.join(where),
-            }
-        else:
-            where = ["JSON.stringify(this.contentType).toUpperCase() == JSON.stringify('{}').toUpperCase()".format(
-                req_filter) for req_filter in requested_file_types]
-            filter_params = {
-                "$where": ' || '.join(where),
-            }
+    if content_types is not None:
+        # Filter in the query itself rather than with $where, which runs javascript on each asset of the course
+        filter_params = content_type_filter(content_types, exclude=exclude_content_types)
 
     sort_direction = DESCENDING
     if request.REQUEST.get('direction', '').lower() == 'asc':
@@ -134,6 +123,23 @@ def _assets_json(request, course_key):
         requested_sort = 'displayname'
     sort = [(requested_sort, sort_direction)]
 
+    if 'cursor' in request.REQUEST:
+        # Keyset pagination, for courses with too many assets to skip through
+        try:
+            assets, next_cursor = contentstore().get_content_page(
+                course_key, max(requested_page_size, 1), cursor=request.REQUEST['cursor'] or None,
+                sort_field=requested_sort, ascending=(sort_direction == ASCENDING),
+                content_types=content_types, exclude_content_types=exclude_content_types,
+            )
+        except ValueError:
+            return HttpResponseBadRequest()
+        return JsonResponse({
+            'pageSize': requested_page_size,
+            'assets': [_get_asset_json_from_data(course_key, asset) for asset in assets],
+            'sort': requested_sort,
+            'nextCursor': next_cursor,
+        })
+
     current_page = max(requested_page, 0)
     start = current_page * requested_page_size
     options = {
@@ -153,25 +159,7 @@ def _assets_json(request, course_key):
         assets, total_count = _get_assets_for_page(request, course_key, options)
         end = start + len(assets)
 
-    asset_json = []
-    for asset in assets:
-        asset_location = asset['asset_key']
-        # note, due to the schema change we may not have a 'thumbnail_location'
-        # in the result set
-        thumbnail_location = asset.get('thumbnail_location', None)
-        if thumbnail_location:
-            thumbnail_location = course_key.make_asset_key(
-                'thumbnail', thumbnail_location[4])
-
-        asset_locked = asset.get('locked', False)
-        asset_json.append(_get_asset_json(
-            asset['displayname'],
-            asset['contentType'],
-            asset['uploadDate'],
-            asset_location,
-            thumbnail_location,
-            asset_locked
-        ))
+    asset_json = [_get_asset_json_from_data(course_key, asset) for asset in assets]
 
     return JsonResponse({
         'start': start,
@@ -184,6 +172,42 @@ def _assets_json(request, course_key):
     })
 
 
+def _get_requested_content_types(requested_filter):
+    """
+    Returns the content types that the asset_type filter asks for (None for all), and whether the assets
+    with these types are excluded rather than selected.
+    """
+    if not requested_filter:
+        return None, False
+    if requested_filter == 'OTHER':
+        all_content_types = []
+        for content_types in settings.FILES_AND_UPLOAD_TYPE_FILTERS.itervalues():
+            all_content_types.extend(content_types)
+        return all_content_types, True
+    return settings.FILES_AND_UPLOAD_TYPE_FILTERS.get(requested_filter, []), False
+
+
+def _get_asset_json_from_data(course_key, asset):
+    """
+    Returns the JSON of an asset from its data dictionary, as returned by the contentstore.
+    """
+    # note, due to the schema change we may not have a 'thumbnail_location'
+    # in the result set
+    thumbnail_location = asset.get('thumbnail_location', None)
+    if thumbnail_location:
+        thumbnail_location = course_key.make_asset_key(
+            'thumbnail', thumbnail_location[4])
+
+    return _get_asset_json(
+        asset['displayname'],
+        asset['contentType'],
+        asset['uploadDate'],
+        asset['asset_key'],
+        thumbnail_location,
+        asset.get('locked', False)
+    )
+
+
 def _get_assets_for_page(request, course_key, options):
     """
     Returns the list of assets for the specified page and page size.
@@ -9,7 +9,6 @@ import re
 import shutil
 import tarfile
 from path import Path as path
-from tempfile import mkdtemp
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
@@ -29,7 +28,7 @@ from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import LibraryLocator
 from xmodule.modulestore.xml_importer import import_course_from_xml, import_library_from_xml
-from xmodule.modulestore.xml_exporter import export_course_to_xml, export_library_to_xml
+from xmodule.modulestore.xml_exporter import export_course_to_archive, export_library_to_archive
 from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
 
 from student.auth import has_course_author_access
@@ -270,7 +269,9 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
                         settings.GITHUB_REPO_ROOT, [dirpath],
                         load_error_modules=False,
                         static_content_store=contentstore(),
-                        target_id=courselike_key
+                        target_id=courselike_key,
+                        static_import_workers=settings.COURSE_IMPORT_STATIC_WORKERS,
+                        progress_callback=_log_import_progress(courselike_key),
                     )
 
                 new_location = courselike_items[0].location
@@ -315,6 +316,23 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
         return HttpResponseNotFound()
 
 
+def _log_import_progress(courselike_key):
+    """
+    Return an import progress callback that logs every 10% of each stage of the import of `courselike_key`.
+    """
+    logged = {}
+
+    def log_progress(stage, done, total):
+        """
+        Log the progress of a stage, when it reaches the next 10%.
+        """
+        percent = done * 100 // total if total else 100
+        if percent // 10 > logged.get(stage, -1):
+            logged[stage] = percent // 10
+            log.info("Course import %s: %s %d/%d (%d%%)", courselike_key, stage, done, total, percent)
+    return log_progress
+
+
 def _save_request_status(request, key, status):
     """
     Save import status for a course in request session
@@ -365,17 +383,21 @@ def create_export_tarball(course_module, course_key, context):
     """
     name = course_module.url_name
     export_file = NamedTemporaryFile(prefix=name + '.', suffix=".tar.gz")
-    root_dir = path(mkdtemp())
 
     try:
+        # The files of the course are written straight into the tarball, without a temporary tree.
+        logging.debug(u'tar file being generated at %s', export_file.name)
         if isinstance(course_key, LibraryLocator):
-            export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name)
+            export_library_to_archive(
+                modulestore(), contentstore(), course_key, export_file, name,
+                asset_workers=settings.COURSE_EXPORT_ASSET_WORKERS,
+            )
         else:
-            export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name)
-
-        logging.debug(u'tar file being generated at %s', export_file.name)
-        with tarfile.open(name=export_file.name, mode='w:gz') as tar_file:
-            tar_file.add(root_dir / name, arcname=name)
+            export_course_to_archive(
+                modulestore(), contentstore(), course_module.id, export_file, name,
+                asset_workers=settings.COURSE_EXPORT_ASSET_WORKERS,
+            )
+        export_file.seek(0)
 
     except SerializationError as exc:
         log.exception(u'There was an error exporting %s', course_key)
@@ -409,8 +431,6 @@ def create_export_tarball(course_module, course_key, context):
             'unit': None,
             'raw_err_msg': str(exc)})
         raise
-    finally:
-        shutil.rmtree(root_dir / name)
 
     return export_file
 
@@ -182,6 +182,36 @@ class PaginationTestCase(AssetsTestCase):
         self.assert_correct_asset_response(
             self.url + "?page_size=3&page=1", 3, 1, 4)
 
+    def test_cursor_pagination(self):
+        """
+        Test walking through the assets with cursors
+        """
+        for index in range(5):
+            self.upload_asset("asset-{}".format(index))
+
+        for sort, direction in (('date_added', 'desc'), ('display_name', 'asc')):
+            names = []
+            cursor = ''
+            while cursor is not None:
+                resp = self.client.get(
+                    self.url, {'page_size': 2, 'cursor': cursor, 'sort': sort, 'direction': direction},
+                    HTTP_ACCEPT='application/json'
+                )
+                json_response = json.loads(resp.content)
+                self.assertLessEqual(len(json_response['assets']), 2)
+                names.extend(asset['display_name'] for asset in json_response['assets'])
+                cursor = json_response['nextCursor']
+            self.assertEqual(sorted(names), ["asset-{}.txt".format(index) for index in range(5)])
+            if sort == 'display_name':
+                self.assertEqual(names, sorted(names))
+
+    def test_invalid_cursor(self):
+        """
+        Test that an invalid cursor is a bad request
+        """
+        resp = self.client.get(self.url, {'cursor': 'not a cursor'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 400)
+
     @mock.patch('xmodule.contentstore.mongo.MongoContentStore.get_all_content_for_course')
     def test_mocked_filtered_response(self, mock_get_all_content_for_course):
         """
@@ -9,6 +9,7 @@ import os
 import shutil
 import tarfile
 import tempfile
+from StringIO import StringIO
 from path import Path as path
 from uuid import uuid4
 
@@ -393,6 +394,19 @@ class ExportTestCase(CourseTestCase):
         self.assertEquals(resp.status_code, 200)
         self.assertTrue(resp.get('Content-Disposition').startswith('attachment'))
 
+    def test_export_targz_contents(self):
+        """
+        The tarball holds the course files, written to it without a temporary tree.
+        """
+        resp = self.client.get(self.url, HTTP_ACCEPT='application/x-tgz')
+        self._verify_export_succeeded(resp)
+        with tarfile.open(fileobj=StringIO(resp.content), mode='r:gz') as tar_file:
+            names = tar_file.getnames()
+            name = self.course.url_name
+            self.assertIn(name + '/course.xml', names)
+            self.assertIn(name + '/policies/assets.json', names)
+            self.assertEqual(json.loads(tar_file.extractfile(name + '/policies/assets.json').read()), {})
+
     def test_export_failure_top_level(self):
         """
         Export failure.
@@ -110,6 +110,8 @@ if STATIC_URL_BASE:
 # GITHUB_REPO_ROOT is the base directory
 # for course data
 GITHUB_REPO_ROOT = ENV_TOKENS.get('GITHUB_REPO_ROOT', GITHUB_REPO_ROOT)
+COURSE_IMPORT_STATIC_WORKERS = ENV_TOKENS.get('COURSE_IMPORT_STATIC_WORKERS', COURSE_IMPORT_STATIC_WORKERS)
+COURSE_EXPORT_ASSET_WORKERS = ENV_TOKENS.get('COURSE_EXPORT_ASSET_WORKERS', COURSE_EXPORT_ASSET_WORKERS)
 
 # STATIC_ROOT specifies the directory where static files are
 # collected
@@ -170,6 +172,9 @@ TECH_SUPPORT_EMAIL = ENV_TOKENS.get('TECH_SUPPORT_EMAIL', TECH_SUPPORT_EMAIL)
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
+ASSET_CHUNK_CACHE.update(ENV_TOKENS.get('ASSET_CHUNK_CACHE', {}))
+ASSET_CACHE_POLICY.update(ENV_TOKENS.get('ASSET_CACHE_POLICY', {}))
+IMAGE_VARIANTS.update(ENV_TOKENS.get('IMAGE_VARIANTS', {}))
 
 # Theme overrides
 THEME_NAME = ENV_TOKENS.get('THEME_NAME', None)
@@ -36,7 +36,8 @@ import lms.envs.common
 # Although this module itself may not use these imported variables, other dependent modules may.
 from lms.envs.common import (
     USE_TZ, TECH_SUPPORT_EMAIL, PLATFORM_NAME, BUGS_EMAIL, DOC_STORE_CONFIG, DATA_DIR, ALL_LANGUAGES, WIKI_ENABLED,
-    update_module_store_settings, ASSET_IGNORE_REGEX, COPYRIGHT_YEAR, PARENTAL_CONSENT_AGE_LIMIT,
+    update_module_store_settings, ASSET_IGNORE_REGEX, ASSET_CHUNK_CACHE, ASSET_CACHE_POLICY, IMAGE_VARIANTS,
+    COPYRIGHT_YEAR, PARENTAL_CONSENT_AGE_LIMIT,
     # The following PROFILE_IMAGE_* settings are included as they are
     # indirectly accessed through the email opt-in API, which is
     # technically accessible through the CMS via legacy URLs.
@@ -201,6 +202,12 @@ ENV_ROOT = REPO_ROOT.dirname()  # virtualenv dir /edx-platform is in
 
 GITHUB_REPO_ROOT = ENV_ROOT / "data"
 
+# How many threads upload the static files of an imported course at once
+COURSE_IMPORT_STATIC_WORKERS = 4
+
+# How many threads fetch the static assets of an exported course at once
+COURSE_EXPORT_ASSET_WORKERS = 4
+
 sys.path.append(REPO_ROOT)
 sys.path.append(PROJECT_ROOT / 'djangoapps')
 sys.path.append(COMMON_ROOT / 'djangoapps')
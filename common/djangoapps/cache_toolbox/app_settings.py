@@ -6,3 +6,28 @@ CACHE_TOOLBOX_DEFAULT_TIMEOUT = getattr(
     'CACHE_TOOLBOX_DEFAULT_TIMEOUT',
     60 * 60 * 24 * 3,
 )
+
+# How much memory (in bytes) the static content cached in each process can
+# take, in front of the django cache. 0 disables the process-local tier.
+CACHE_TOOLBOX_LOCAL_CONTENT_MAX_BYTES = getattr(
+    settings,
+    'CACHE_TOOLBOX_LOCAL_CONTENT_MAX_BYTES',
+    32 * 1024 * 1024,
+)
+
+# Static content bigger than this (pickled) isn't cached in each process.
+CACHE_TOOLBOX_LOCAL_CONTENT_MAX_ENTRY_BYTES = getattr(
+    settings,
+    'CACHE_TOOLBOX_LOCAL_CONTENT_MAX_ENTRY_BYTES',
+    256 * 1024,
+)
+
+# How long (in seconds) static content stays in the cache of each process.
+# Other processes can't invalidate it, so this bounds how long they may serve
+# an asset that was changed or deleted. Whether an asset is locked is always
+# checked against the django cache.
+CACHE_TOOLBOX_LOCAL_CONTENT_TIMEOUT = getattr(
+    settings,
+    'CACHE_TOOLBOX_LOCAL_CONTENT_TIMEOUT',
+    60,
+)
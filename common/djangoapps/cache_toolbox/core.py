@@ -8,6 +8,11 @@ Core methods
 
 """
 
+from collections import OrderedDict
+import cPickle as pickle
+import threading
+import time
+
 from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS
 from opaque_keys import InvalidKeyError
@@ -110,12 +115,113 @@ def instance_key(model, instance_or_pk):
     )
 
 
+class LocalContentCache(object):
+    """
+    A process-local LRU cache of static content, in front of the django cache.
+
+    Contents are stored pickled, so that callers can't modify the cached copy,
+    and their total size is kept under `max_bytes`. Contents bigger than
+    `max_entry_bytes` aren't kept. Since other processes can't invalidate this
+    cache, each content is only kept for `timeout` seconds, and
+    `get_cached_content` checks that its lock state is still current in the
+    django cache before serving it.
+    """
+    def __init__(self, max_bytes, max_entry_bytes, timeout):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the content stored under `key`, or None.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            expires_at, pickled = entry
+            if expires_at < time.time():
+                self.size -= len(pickled)
+                return None
+            self.entries[key] = entry
+        return pickle.loads(pickled)
+
+    def set(self, key, content):
+        """
+        Store `content` under `key`, evicting the least recently used contents to make room.
+        """
+        pickled = pickle.dumps(content, pickle.HIGHEST_PROTOCOL)
+        if len(pickled) > self.max_entry_bytes:
+            self.delete(key)
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[key] = (time.time() + self.timeout, pickled)
+            self.size += len(pickled)
+            while self.size > self.max_bytes:
+                __, (__, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, key):
+        """
+        Forget the content stored under `key`, if any.
+        """
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+
+    def clear(self):
+        """
+        Forget every content.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+if app_settings.CACHE_TOOLBOX_LOCAL_CONTENT_MAX_BYTES:
+    local_content_cache = LocalContentCache(
+        app_settings.CACHE_TOOLBOX_LOCAL_CONTENT_MAX_BYTES,
+        app_settings.CACHE_TOOLBOX_LOCAL_CONTENT_MAX_ENTRY_BYTES,
+        app_settings.CACHE_TOOLBOX_LOCAL_CONTENT_TIMEOUT,
+    )
+else:
+    local_content_cache = None
+
+
+def _lock_key(key):
+    """
+    Return the key under which the lock state of the content cached under `key` is kept.
+    """
+    return key + ":locked"
+
+
 def set_cached_content(content):
-    cache.set(unicode(content.location).encode("utf-8"), content)
+    key = unicode(content.location).encode("utf-8")
+    cache.set_many({key: content, _lock_key(key): bool(getattr(content, "locked", False))})
+    if local_content_cache is not None:
+        local_content_cache.set(key, content)
 
 
 def get_cached_content(location):
-    return cache.get(unicode(location).encode("utf-8"))
+    key = unicode(location).encode("utf-8")
+    if local_content_cache is not None:
+        content = local_content_cache.get(key)
+        # This process doesn't hear about assets being locked or unlocked, which
+        # drops them from the django cache, so only serve its copy while the
+        # django cache still holds the same lock state.
+        if content is not None and cache.get(_lock_key(key)) == bool(getattr(content, "locked", False)):
+            return content
+    content = cache.get(key)
+    if content is not None and local_content_cache is not None:
+        local_content_cache.set(key, content)
+    return content
 
 
 def del_cached_content(location):
@@ -134,4 +240,7 @@ def del_cached_content(location):
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
-    cache.delete_many(locations)
+    cache.delete_many(locations + [_lock_key(key) for key in locations])
+    if local_content_cache is not None:
+        for key in locations:
+            local_content_cache.delete(key)
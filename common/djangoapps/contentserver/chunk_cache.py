@@ -0,0 +1,150 @@
+"""
+A local on-disk cache of the chunks of large assets.
+
+Assets too big for the django cache are streamed from GridFS. The chunk cache
+keeps the chunks it streams in files under ASSET_CHUNK_CACHE['DIRECTORY'], so
+that later requests for a hot asset (or for any range of it, as video players
+make) read them from the local disk instead of from Mongo.
+
+Chunks are keyed by the asset's location and its upload date, which changes
+whenever the asset is saved again, so a cached chunk never goes stale. Files
+are written atomically, and the oldest are removed when the cache grows past
+ASSET_CHUNK_CACHE['MAX_BYTES']; processes can share the directory.
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+import dogstats_wrapper as dog_stats_api
+
+log = logging.getLogger(__name__)
+
+
+class AssetChunkCache(object):
+    """
+    The chunks of large assets, in files under `directory`.
+    """
+    def __init__(self, directory, chunk_size, max_bytes):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.size = None
+
+    def asset_key(self, content):
+        """
+        Return the key of the version of the asset that `content` holds.
+        """
+        version = u"{}@{}".format(content.location, content.last_modified_at.isoformat())
+        return hashlib.sha1(version.encode('utf-8')).hexdigest()
+
+    def chunk_path(self, key, index):
+        """
+        Return the path of the file of the chunk number `index` of an asset.
+        """
+        return os.path.join(self.directory, key[:2], "{}.{}".format(key, index))
+
+    def read_chunk(self, path):
+        """
+        Return the chunk stored at `path`, or None.
+        """
+        try:
+            with open(path, 'rb') as chunk_file:
+                return chunk_file.read()
+        except IOError:
+            return None
+
+    def write_chunk(self, path, data):
+        """
+        Store a chunk at `path`, making room for it if needed.
+        """
+        try:
+            chunk_dir = os.path.dirname(path)
+            if not os.path.isdir(chunk_dir):
+                os.makedirs(chunk_dir)
+            handle, temp_path = tempfile.mkstemp(dir=chunk_dir, prefix='.tmp')
+            with os.fdopen(handle, 'wb') as temp_file:
+                temp_file.write(data)
+            os.rename(temp_path, path)
+        except (IOError, OSError) as exception:
+            if exception.errno != errno.EEXIST:
+                log.warning(u"Couldn't cache asset chunk %s: %s", path, exception)
+            return
+
+        if self.size is not None:
+            self.size += len(data)
+        if self.size is None or self.size > self.max_bytes:
+            self.trim()
+
+    def trim(self):
+        """
+        Remove the least recently used chunks until the cache is back to 90% of its maximum size.
+        """
+        chunks = []
+        for dirpath, __, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                chunks.append((stat.st_atime, stat.st_size, path))
+
+        self.size = sum(size for __, size, __ in chunks)
+        if self.size <= self.max_bytes:
+            return
+        chunks.sort()
+        target = self.max_bytes * 0.9
+        for __, size, path in chunks:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.size -= size
+            dog_stats_api.increment('contentserver.chunk_cache.eviction')
+
+    def stream_range(self, content, first, last):
+        """
+        Yield the bytes from `first` to `last` (included) of `content`, a StaticContentStream.
+
+        Chunks missing from the cache are read from the content's stream and stored.
+        """
+        key = self.asset_key(content)
+        index = first // self.chunk_size
+        while index * self.chunk_size <= last:
+            chunk_start = index * self.chunk_size
+            path = self.chunk_path(key, index)
+            data = self.read_chunk(path)
+            if data is None:
+                dog_stats_api.increment('contentserver.chunk_cache.miss')
+                data = content.read_chunk(chunk_start, min(self.chunk_size, content.length - chunk_start))
+                self.write_chunk(path, data)
+            else:
+                dog_stats_api.increment('contentserver.chunk_cache.hit')
+            yield data[max(first - chunk_start, 0):last - chunk_start + 1]
+            index += 1
+
+
+_CHUNK_CACHE = None
+
+
+def get_chunk_cache():
+    """
+    Return the chunk cache configured by ASSET_CHUNK_CACHE, or None if it is disabled.
+    """
+    global _CHUNK_CACHE  # pylint: disable=global-statement
+    config = getattr(settings, 'ASSET_CHUNK_CACHE', {})
+    if not config.get('DIRECTORY'):
+        return None
+    if _CHUNK_CACHE is None or _CHUNK_CACHE.directory != config['DIRECTORY']:
+        _CHUNK_CACHE = AssetChunkCache(
+            config['DIRECTORY'],
+            config.get('CHUNK_SIZE', 1024 * 1024),
+            config.get('MAX_BYTES', 10 * 1024 * 1024 * 1024),
+        )
+    return _CHUNK_CACHE
@@ -2,15 +2,20 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
+import time
+from uuid import uuid4
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
@@ -18,11 +23,24 @@ from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
+from .chunk_cache import get_chunk_cache
+from .variants import VARIANT_CATEGORY, get_variant, get_variant_spec
+
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
 log = logging.getLogger(__name__)
 
+# Assets smaller than this are kept in the django cache; bigger ones are streamed
+# from the DB, through the chunk cache if it is enabled.
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
+# Requests with more ranges than this get the full content.
+MAX_RANGES = 20
+
+# The format of the Last-Modified dates that we used to send.
+LEGACY_LAST_MODIFIED_FORMAT = "%a, %d-%b-%Y %H:%M:%S GMT"
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -41,6 +59,12 @@ class StaticContentServer(object):
                 response.status_code = 400
                 return response
 
+            if loc.category == VARIANT_CATEGORY:
+                # variants are only served through the URL of their image, which checks access to it
+                response = HttpResponse()
+                response.status_code = 404
+                return response
+
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
             if content is None:
@@ -55,10 +79,14 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MAX_CACHED_CONTENT_LENGTH:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    else:
+                        # cache the metadata alone, so that access checks and conditional requests
+                        # don't need the DB
+                        set_cached_content(content.copy_metadata())
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -77,29 +105,41 @@ class StaticContentServer(object):
                     ):
                         return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # serve a resized or re-encoded variant of an image if the request asks for one
+            variant_spec = get_variant_spec(request, content)
+            if variant_spec is not None:
+                variant = get_variant(content, variant_spec)
+                if variant is not None:
+                    content = variant
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # see if the client has cached this version of the content, if so then just
+            # return a 304 (Not Modified)
+            etag = get_etag(content)
+            if is_not_modified(request, content, etag):
+                response = HttpResponseNotModified()
+                set_caching_headers(response, content, loc, etag)
+                return response
+
+            if content.data is None and not isinstance(content, StaticContentStream):
+                # only the metadata of this content was cached: stream its data from the DB
+                try:
+                    content = AssetManager.find(loc, as_stream=True)
+                except (ItemNotFoundError, NotFoundError):
+                    response = HttpResponse()
+                    response.status_code = 404
+                    return response
+                etag = get_etag(content)
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
+            # Request -> Range attribute structure: "Range: bytes=first-[last][, first-[last]...]"
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
+            # If-Range: the client only wants the ranges if its copy is still current,
+            # and the full content otherwise.
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
+            if request.META.get('HTTP_RANGE') and if_range_matches(request, content, etag):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -112,43 +152,196 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
+                    elif len(ranges) > MAX_RANGES:
+                        # Too many ranges are more likely an attack than a client's need: send the full content.
                         log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            u"Too many ranges in Range header: %s for content: %s", header_value, unicode(loc)
                         )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        ranges = merge_ranges(
+                            [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        )
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            response = HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Range'] = 'bytes */{length}'.format(length=content.length)
+                            return response
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = HttpResponse(stream_content_range(content, first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
+                            response['Content-Type'] = content.content_type
                             response.status_code = 206  # Partial Content
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # According to Http/1.1 spec content for multiple ranges should be sent as a
+                            # multipart message: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, ranges)
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = HttpResponse(stream_content(content))
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
-            response['Last-Modified'] = last_modified_at_str
+            set_caching_headers(response, content, loc, etag)
 
             return response
 
 
+def last_modified_http_date(content):
+    """
+    Return the date at which `content` was last modified, in the format of HTTP headers.
+    """
+    return http_date(calendar.timegm(content.last_modified_at.utctimetuple()))
+
+
+def get_etag(content):
+    """
+    Return the strong entity tag of `content`, from the MD5 of its data, or None if it isn't known.
+    """
+    content_digest = getattr(content, 'content_digest', None)
+    if content_digest is None:
+        return None
+    return '"{}"'.format(content_digest)
+
+
+def is_not_modified(request, content, etag):
+    """
+    Return True if the conditional headers of `request` show that the client has the current version of `content`.
+
+    http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since. Weak comparison is allowed here.
+        client_etags = [
+            client_etag[2:] if client_etag.startswith('W/') else client_etag
+            for client_etag in (value.strip() for value in if_none_match.split(','))
+        ]
+        return '*' in client_etags or (etag is not None and etag in client_etags)
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since is not None:
+        # Clients may still hold the Last-Modified dates that we used to send, in a non-standard format.
+        if if_modified_since == content.last_modified_at.strftime(LEGACY_LAST_MODIFIED_FORMAT):
+            return True
+        since = parse_http_date_safe(if_modified_since)
+        return since is not None and calendar.timegm(content.last_modified_at.utctimetuple()) <= since
+
+    return False
+
+
+def if_range_matches(request, content, etag):
+    """
+    Return True if the ranges of `request` should be served: it has no If-Range header, or it matches `content`.
+
+    http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # Only strong comparison is allowed, so weak entity tags never match.
+        return etag is not None and if_range == etag
+    return if_range == last_modified_http_date(content)
+
+
+def get_cache_max_age(course_key):
+    """
+    Return how long (in seconds) shared caches can keep the unlocked assets of a course.
+    """
+    policy = getattr(settings, 'ASSET_CACHE_POLICY', {})
+    course_max_age = policy.get('COURSE_MAX_AGE', {})
+    return course_max_age.get(unicode(course_key), policy.get('MAX_AGE', 0))
+
+
+def set_caching_headers(response, content, loc, etag):
+    """
+    Set the headers that let browsers and CDNs cache and revalidate `content`.
+
+    Locked assets depend on the user, so only the browser can keep them, and
+    must check with us before using them.
+    """
+    if etag is not None:
+        response['ETag'] = etag
+    response['Last-Modified'] = last_modified_http_date(content)
+    if getattr(content, 'locked', False):
+        response['Cache-Control'] = 'private, no-cache'
+    else:
+        max_age = get_cache_max_age(loc.course_key)
+        if max_age > 0:
+            response['Cache-Control'] = 'public, max-age={}'.format(max_age)
+            response['Expires'] = http_date(time.time() + max_age)
+
+
+def stream_content(content):
+    """
+    Yield all of the data of `content`, from the chunk cache if it is streamed from the DB.
+    """
+    chunk_cache = get_chunk_cache()
+    if chunk_cache is not None and isinstance(content, StaticContentStream):
+        return chunk_cache.stream_range(content, 0, content.length - 1)
+    return content.stream_data()
+
+
+def stream_content_range(content, first, last):
+    """
+    Yield the data of `content` from byte `first` to byte `last` (included).
+    """
+    chunk_cache = get_chunk_cache()
+    if chunk_cache is not None and isinstance(content, StaticContentStream):
+        return chunk_cache.stream_range(content, first, last)
+    return content.stream_data_in_range(first, last)
+
+
+def multipart_byteranges_response(content, ranges):
+    """
+    Return a multipart/byteranges response with the data of `content` in each of `ranges`.
+
+    The parts are streamed one after the other; their total length is known in advance.
+    See http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    boundary = uuid4().hex
+    part_headers = [
+        (
+            "\r\n--{boundary}\r\n"
+            "Content-Type: {content_type}\r\n"
+            "Content-Range: bytes {first}-{last}/{length}\r\n\r\n"
+        ).format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        ).encode('utf-8')
+        for first, last in ranges
+    ]
+    closing = "\r\n--{boundary}--\r\n".format(boundary=boundary)
+
+    def parts():
+        """
+        Yield the parts of the message, each followed by its data.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in stream_content_range(content, first, last):
+                yield chunk
+        yield closing
+
+    response = HttpResponse(parts(), status=206)  # Partial Content
+    response['Content-Type'] = 'multipart/byteranges; boundary={}'.format(boundary)
+    response['Content-Length'] = str(
+        sum(len(part_header) for part_header in part_headers) +
+        sum(last - first + 1 for first, last in ranges) +
+        len(closing)
+    )
+    return response
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
@@ -190,3 +383,18 @@ def parse_range_header(header_value, content_length):
         raise ValueError('Invalid syntax')
 
     return unit, ranges
+
+
+def merge_ranges(ranges):
+    """
+    Returns the (start, end) tuples of `ranges` in order, with the ranges that overlap or are adjacent merged.
+
+    The response to overlapping ranges could otherwise be many times as long as the content itself.
+    """
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
@@ -2,8 +2,11 @@
 Tests for StaticContentServer
 """
 import copy
+import datetime
 import ddt
 import logging
+import shutil
+import tempfile
 import unittest
 from uuid import uuid4
 
@@ -17,7 +20,9 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.chunk_cache import AssetChunkCache
+from contentserver.middleware import merge_ranges, parse_range_header, MAX_RANGES
+from contentserver.variants import VariantSpec, get_variant_location, get_variant_url
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -110,6 +115,134 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200)
 
+    def test_etag(self):
+        """
+        Test that assets are served with an entity tag made from the MD5 of their content.
+        """
+        resp = self.client.get(self.url_unlocked)
+        md5 = self.contentstore.get_attr(self.unlocked_asset, 'md5')
+        self.assertEqual(resp['ETag'], '"{}"'.format(md5))
+
+    def test_if_none_match(self):
+        """
+        Test that a request with the current entity tag gets a 304 Not Modified, and other ones the content.
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", {}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='W/{}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_if_modified_since(self):
+        """
+        Test that a request with the current Last-Modified date gets a 304 Not Modified.
+        """
+        last_modified = self.client.get(self.url_unlocked)['Last-Modified']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2000 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_if_range(self):
+        """
+        Test that ranges are only served if If-Range matches the current version of the asset.
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(resp.status_code, 206)
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_unlocked_asset_cache_policy(self):
+        """
+        Test that unlocked assets can be cached by CDNs for the time set for their course.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertNotIn('Cache-Control', resp)
+
+        with override_settings(ASSET_CACHE_POLICY={'MAX_AGE': 60, 'COURSE_MAX_AGE': {}}):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=60')
+        self.assertIn('Expires', resp)
+
+        course_policy = {'MAX_AGE': 60, 'COURSE_MAX_AGE': {unicode(self.course_key): 3600}}
+        with override_settings(ASSET_CACHE_POLICY=course_policy):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=3600')
+
+    def test_locked_asset_cache_policy(self):
+        """
+        Test that locked assets can only be kept by the browser, which must revalidate them.
+        """
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        with override_settings(ASSET_CACHE_POLICY={'MAX_AGE': 60, 'COURSE_MAX_AGE': {}}):
+            resp = self.client.get(self.url_locked)
+        self.assertEqual(resp['Cache-Control'], 'private, no-cache')
+        self.assertNotIn('Expires', resp)
+
+    @override_settings(IMAGE_VARIANTS={'ENABLED': True, 'SIZES': [64, 128], 'MAX_BYTES': 1024 * 1024})
+    def test_image_variant(self):
+        """
+        Test that images can be served resized and re-encoded.
+        """
+        url = unicode(self.course_key.make_asset_key('asset', 'just_a_test.jpg'))
+        resp = self.client.get(url, {'width': 100, 'format': 'png'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'image/png')
+        self.assertTrue(resp.content.startswith('\x89PNG'))
+
+        # The variant is stored, and served again from the store.
+        etag = resp['ETag']
+        resp = self.client.get(url, {'width': 128, 'format': 'png'})
+        self.assertEqual(resp['ETag'], etag)
+
+        # Invalid parameters get the original image.
+        resp = self.client.get(url, {'width': 'wide'})
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+
+    @override_settings(IMAGE_VARIANTS={'ENABLED': True, 'SIZES': [64, 128], 'MAX_BYTES': 1024 * 1024})
+    def test_image_variant_locked(self):
+        """
+        Test that the variants of a locked image are only served to the users who can see the image.
+        """
+        asset_key = self.course_key.make_asset_key('asset', 'just_a_test.jpg')
+        self.contentstore.set_attr(asset_key, 'locked', True)
+        url = unicode(asset_key)
+
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        resp = self.client.get(url, {'width': 100, 'format': 'png'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'image/png')
+        variant_key = get_variant_location(self.contentstore.find(asset_key), VariantSpec(128, None, 'png'))
+        self.assertTrue(self.contentstore.get_attr(variant_key, 'locked'))
+
+        anonymous_client = Client()
+        resp = anonymous_client.get(url, {'width': 100, 'format': 'png'})
+        self.assertEqual(resp.status_code, 403)
+        # The variant can't be fetched by its own key, which would skip the checks of the image.
+        resp = anonymous_client.get(unicode(variant_key))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_image_variant_disabled(self):
+        """
+        Test that variant parameters are ignored when variants are disabled.
+        """
+        url = unicode(self.course_key.make_asset_key('asset', 'just_a_test.jpg'))
+        resp = self.client.get(url, {'width': 100, 'format': 'png'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+
     def test_range_request_full_file(self):
         """
         Test that a range request from byte 0 to last,
@@ -146,7 +279,7 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message with a part for each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
@@ -154,6 +287,55 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
             first=first_byte, last=last_byte)
         )
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        boundary = resp['Content-Type'].split('boundary=')[1]
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        full_content = self.contentstore.find(self.unlocked_asset).data
+        parts = resp.content.split('\r\n--{}'.format(boundary))
+        self.assertEqual(parts[0], '')
+        self.assertEqual(parts[-1], '--\r\n')
+        expected_ranges = [(first_byte, last_byte), (self.length_unlocked - 100, self.length_unlocked - 1)]
+        for part, (first, last) in zip(parts[1:-1], expected_ranges):
+            headers, data = part.split('\r\n\r\n', 1)
+            self.assertIn('Content-Range: bytes {first}-{last}/{length}'.format(
+                first=first, last=last, length=self.length_unlocked), headers)
+            self.assertEqual(data, full_content[first:last + 1])
+
+    def test_range_request_some_ranges_not_satisfiable(self):
+        """
+        Test that the ranges that can't be satisfied are left out of the response.
+        """
+        first_byte = self.length_unlocked / 4
+        last_byte = self.length_unlocked / 2
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, {length}-'.format(
+            first=first_byte, last=last_byte, length=self.length_unlocked)
+        )
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes {first}-{last}/{length}'.format(
+            first=first_byte, last=last_byte, length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], str(last_byte - first_byte + 1))
+
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that overlapping and adjacent ranges are merged, so that their content is only sent once.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-, 0-, 0-9, 10-')
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes 0-{last}/{length}'.format(
+            last=self.length_unlocked - 1, length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that a request with more ranges than MAX_RANGES outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=' + ', '.join(['0-0'] * (MAX_RANGES + 1)))
+
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
@@ -191,6 +373,7 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
             first=(self.length_unlocked), last=(self.length_unlocked))
         )
         self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp['Content-Range'], 'bytes */{length}'.format(length=self.length_unlocked))
 
 
 @ddt.ddt
@@ -237,3 +420,104 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+class FakeStreamedContent(object):
+    """
+    The part of StaticContentStream that the chunk cache uses.
+    """
+    def __init__(self, data):
+        self.location = 'asset-v1:edX+toy+2012_Fall+type@asset+block@video.mp4'
+        self.last_modified_at = datetime.datetime(2015, 1, 1)
+        self.length = len(data)
+        self.data = data
+        self.reads = []
+
+    def read_chunk(self, offset, size):
+        """
+        Return `size` bytes of the data from `offset`, and remember the read.
+        """
+        self.reads.append((offset, size))
+        return self.data[offset:offset + size]
+
+
+class AssetChunkCacheTestCase(unittest.TestCase):
+    """
+    Tests for the on-disk chunk cache of large assets.
+    """
+    def setUp(self):
+        super(AssetChunkCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = AssetChunkCache(self.directory, chunk_size=10, max_bytes=1000)
+        self.content = FakeStreamedContent(''.join(chr(ord('a') + i % 26) for i in range(95)))
+
+    def test_stream_range(self):
+        for first, last in [(0, 94), (0, 0), (5, 24), (10, 19), (90, 94), (33, 33)]:
+            data = ''.join(self.cache.stream_range(self.content, first, last))
+            self.assertEqual(data, self.content.data[first:last + 1])
+
+    def test_chunks_are_read_once(self):
+        ''.join(self.cache.stream_range(self.content, 15, 34))
+        self.assertEqual(self.content.reads, [(10, 10), (20, 10), (30, 10)])
+        data = ''.join(self.cache.stream_range(self.content, 0, 94))
+        self.assertEqual(data, self.content.data)
+        self.assertEqual(
+            self.content.reads,
+            [(10, 10), (20, 10), (30, 10), (0, 10), (40, 10), (50, 10), (60, 10), (70, 10), (80, 10), (90, 5)]
+        )
+
+    def test_new_version_is_not_stale(self):
+        ''.join(self.cache.stream_range(self.content, 0, 94))
+        self.content.data = self.content.data.upper()
+        self.content.last_modified_at = datetime.datetime(2015, 1, 2)
+        self.assertEqual(''.join(self.cache.stream_range(self.content, 0, 94)), self.content.data)
+
+    def test_trim(self):
+        self.cache.max_bytes = 50
+        ''.join(self.cache.stream_range(self.content, 0, 94))
+        self.cache.trim()
+        self.assertLessEqual(self.cache.size, 50)
+        # The cache still serves the whole content.
+        self.assertEqual(''.join(self.cache.stream_range(self.content, 0, 94)), self.content.data)
+
+
+class VariantUrlTestCase(unittest.TestCase):
+    """
+    Tests for the URLs of image variants.
+    """
+    @override_settings(IMAGE_VARIANTS={'ENABLED': True})
+    def test_asset_urls(self):
+        self.assertEqual(
+            get_variant_url('/c4x/edX/toy/asset/image.png', width=256),
+            '/c4x/edX/toy/asset/image.png?width=256'
+        )
+        self.assertEqual(
+            get_variant_url('/asset-v1:edX+toy+2012_Fall+type@asset+block@image.png', width=256, image_format='jpeg'),
+            '/asset-v1:edX+toy+2012_Fall+type@asset+block@image.png?width=256&format=jpeg'
+        )
+
+    @override_settings(IMAGE_VARIANTS={'ENABLED': True})
+    def test_other_urls(self):
+        self.assertEqual(get_variant_url('/static/images/image.png', width=256), '/static/images/image.png')
+
+    @override_settings(IMAGE_VARIANTS={'ENABLED': False})
+    def test_disabled(self):
+        self.assertEqual(get_variant_url('/c4x/edX/toy/asset/image.png', width=256), '/c4x/edX/toy/asset/image.png')
+
+
+@ddt.ddt
+class MergeRangesTestCase(unittest.TestCase):
+    """
+    Tests for the merge_ranges function.
+    """
+    @ddt.data(
+        ([(0, 9)], [(0, 9)]),
+        ([(20, 29), (0, 9)], [(0, 9), (20, 29)]),
+        ([(0, 9), (10, 19)], [(0, 19)]),
+        ([(0, 9), (5, 7), (8, 14), (16, 20)], [(0, 14), (16, 20)]),
+        ([(0, 99), (0, 99), (0, 99)], [(0, 99)]),
+    )
+    @ddt.unpack
+    def test_merge_ranges(self, ranges, expected_ranges):
+        self.assertEqual(merge_ranges(ranges), expected_ranges)
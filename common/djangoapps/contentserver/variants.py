@@ -0,0 +1,210 @@
+"""
+Resized and re-encoded variants of image assets.
+
+The URL of an image asset can ask for a variant of the image with the `width`,
+`height` and `format` query parameters, e.g.::
+
+    /c4x/edX/toy/asset/course_image.png?width=256&format=jpeg
+
+The image is scaled down to fit in the requested box, keeping its aspect
+ratio (it is never enlarged), and encoded in the requested format. Requested
+dimensions are rounded up to one of IMAGE_VARIANTS['SIZES'], so that only a few
+variants of each image can be made.
+
+Variants are stored in the contentstore, under a name made from the MD5 of the
+original image and the variant parameters: a new version of an image gets new
+variants, and stale ones are never served. When variants take more than
+IMAGE_VARIANTS['MAX_BYTES'] in total, the least recently used are deleted.
+Variants are only served through the URL of their image, with the access
+checks of the image; StaticContentServer doesn't serve their own asset keys.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+import hashlib
+import logging
+import StringIO
+import urllib
+
+from django.conf import settings
+from PIL import Image
+from pytz import UTC
+
+from cache_toolbox.core import get_cached_content, set_cached_content
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.exceptions import NotFoundError
+import dogstats_wrapper as dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# The category of the asset keys of variants.
+VARIANT_CATEGORY = 'variant'
+
+# The formats that variants can be encoded in, with their content types.
+VARIANT_FORMATS = {
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+# The content types of the images that variants can be made of.
+SOURCE_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/gif')
+
+DEFAULT_SIZES = [64, 128, 256, 512, 1024]
+
+VariantSpec = namedtuple('VariantSpec', ['width', 'height', 'image_format'])
+
+
+def get_variant_settings():
+    """
+    Return the IMAGE_VARIANTS setting.
+    """
+    return getattr(settings, 'IMAGE_VARIANTS', {})
+
+
+def _round_up(value, sizes):
+    """
+    Return the smallest of `sizes` that is at least `value`, or the largest one.
+    """
+    value = int(value)
+    if value <= 0:
+        raise ValueError("Image dimensions must be positive")
+    for size in sorted(sizes):
+        if value <= size:
+            return size
+    return max(sizes)
+
+
+def get_variant_spec(request, content):
+    """
+    Return the VariantSpec of the variant of `content` that `request` asks for, or None if it asks for none.
+
+    Requests for variants of content that isn't an image, or with invalid
+    parameters, get the content itself.
+    """
+    config = get_variant_settings()
+    params = request.GET
+    if not config.get('ENABLED') or not any(name in params for name in ('width', 'height', 'format')):
+        return None
+    if content.content_type not in SOURCE_CONTENT_TYPES or getattr(content, 'content_digest', None) is None:
+        return None
+
+    sizes = config.get('SIZES', DEFAULT_SIZES)
+    try:
+        width = _round_up(params['width'], sizes) if 'width' in params else None
+        height = _round_up(params['height'], sizes) if 'height' in params else None
+    except ValueError:
+        return None
+    image_format = params.get('format', 'jpeg' if content.content_type == 'image/jpeg' else 'png')
+    if image_format not in VARIANT_FORMATS:
+        return None
+    return VariantSpec(width, height, image_format)
+
+
+def get_variant_location(content, spec):
+    """
+    Return the asset key of the variant `spec` of `content`.
+    """
+    variant_id = hashlib.sha1(
+        '{}:{}:{}:{}'.format(content.content_digest, spec.width, spec.height, spec.image_format)
+    ).hexdigest()
+    return content.location.course_key.make_asset_key(
+        VARIANT_CATEGORY, '{}.{}'.format(variant_id, spec.image_format)
+    )
+
+
+def make_variant_data(data, spec, jpeg_quality):
+    """
+    Return the image `data` scaled down and encoded as `spec` says.
+    """
+    image = Image.open(StringIO.StringIO(data))
+    if spec.image_format == 'jpeg':
+        # Palletted and transparent images can't be saved as JPEG.
+        image = image.convert('RGB')
+    elif image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    image.thumbnail((spec.width or image.size[0], spec.height or image.size[1]), Image.ANTIALIAS)
+
+    variant_file = StringIO.StringIO()
+    if spec.image_format == 'jpeg':
+        image.save(variant_file, 'JPEG', quality=jpeg_quality, optimize=True)
+    else:
+        image.save(variant_file, 'PNG', optimize=True)
+    return variant_file.getvalue()
+
+
+def get_variant(content, spec):
+    """
+    Return the variant `spec` of `content`, making it if needed; or None if it can't be made.
+
+    The variant is locked if `content` is, so that it is served with the same headers.
+    """
+    location = get_variant_location(content, spec)
+    variant = get_cached_content(location)
+    if variant is None:
+        store = contentstore()
+        try:
+            variant = store.find(location)
+        except NotFoundError:
+            variant = make_variant(store, content, spec, location)
+            if variant is None:
+                return None
+        else:
+            dog_stats_api.increment('contentserver.variant.found')
+            # Variants are only fetched from the DB when they aren't cached, so this is an approximate LRU.
+            store.set_attr(location, 'last_accessed', datetime.now(UTC))
+        variant.locked = getattr(content, 'locked', False)
+        set_cached_content(variant)
+    # the image may have been locked or unlocked since the variant was cached
+    variant.locked = getattr(content, 'locked', False)
+    return variant
+
+
+def make_variant(store, content, spec, location):
+    """
+    Make the variant `spec` of `content`, store it at `location`, and return it; or None if it can't be made.
+    """
+    config = get_variant_settings()
+    try:
+        data = content.data
+        if data is None:
+            # only the metadata of the content was cached
+            data = store.find(content.location).data
+        variant_data = make_variant_data(data, spec, config.get('JPEG_QUALITY', 85))
+    except Exception:  # pylint: disable=broad-except
+        # log and serve the original, as variants are optional
+        log.exception(u"Failed to make variant %s of %s", spec, content.location)
+        return None
+
+    store.save(StaticContent(
+        location, location.name, VARIANT_FORMATS[spec.image_format], variant_data, length=len(variant_data),
+        locked=getattr(content, 'locked', False)
+    ))
+    store.set_attr(location, 'last_accessed', datetime.now(UTC))
+    dog_stats_api.increment('contentserver.variant.made')
+
+    evicted = store.trim_variants(config.get('MAX_BYTES', 1024 * 1024 * 1024))
+    if evicted:
+        dog_stats_api.increment('contentserver.variant.evicted', evicted)
+
+    # find it again for the attributes that the store sets, such as its MD5
+    return store.find(location)
+
+
+def get_variant_url(url, width=None, height=None, image_format=None):
+    """
+    Return the URL of a variant of the image asset at `url`.
+
+    `url` is returned as is when variants are disabled, or when it isn't the URL
+    of an asset served by StaticContentServer.
+    """
+    is_asset_url = StaticContent.is_c4x_path(url) or '/asset-v1:' in url
+    if not get_variant_settings().get('ENABLED') or not is_asset_url:
+        return url
+    params = [
+        (name, value) for name, value in (('width', width), ('height', height), ('format', image_format))
+        if value is not None
+    ]
+    if not params:
+        return url
+    return u'{}{}{}'.format(url, '&' if '?' in url else '?', urllib.urlencode(params))
@@ -26,3 +26,14 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_many(self, events, raise_errors=False):
+        """
+        Send a batch of events to tracker, by default one at a time.
+
+        Backends that log and drop the events they fail to store raise the
+        error instead if `raise_errors` is set, e.g. when the events are
+        replayed from an event spool and must not be lost.
+        """
+        for event in events:
+            self.send(event)
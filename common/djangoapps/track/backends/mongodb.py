@@ -97,3 +97,13 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_many(self, events, raise_errors=False):
+        """Insert the events in to the Mongo collection at once"""
+        try:
+            self.collection.insert(events, manipulate=False)
+        except (PyMongoError, BSONError):
+            if raise_errors:
+                raise
+            msg = 'Error inserting to MongoDB event tracker backend'
+            log.exception(msg)
@@ -0,0 +1,224 @@
+"""
+Event tracker backend that sends events to another backend in batches, from a background thread.
+
+Requests only add events to a bounded in-process queue. A flusher thread
+takes them off in batches of up to `batch_size` events, waiting at most
+`flush_interval` seconds to fill a batch, and sends each batch to the wrapped
+backend with its `send_many` method (a single bulk insert for the Django and
+MongoDB backends)::
+
+  TRACKING_BACKENDS = {
+      'sql': {
+          'ENGINE': 'track.backends.queued.QueuedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.django.DjangoBackend',
+              },
+              'max_queue_size': 10000,
+              'batch_size': 100,
+              'flush_interval': 1.0,
+              'overflow': 'drop_newest',
+          }
+      }
+  }
+
+When the queue is full, the `overflow` policy decides which event is lost:
+'drop_newest' drops the event being sent, 'drop_oldest' makes room for it by
+dropping the oldest queued event, and 'block' makes the request wait up to
+`block_timeout` seconds for room before dropping the event being sent.
+
+Events that are still queued when the process exits are flushed, waiting up
+to `shutdown_timeout` seconds for the wrapped backend.
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import Queue
+import threading
+from time import time
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+# Put on the queue to send the events before it without waiting for the batch to fill up
+_FLUSH = object()
+
+# Put on the queue to stop the flusher thread once the events before it are sent
+_STOP = object()
+
+
+class QueuedBackend(BaseBackend):
+    """Event tracker backend that queues events for another backend"""
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, flush_interval=1.0,
+                 overflow='drop_newest', block_timeout=0.05, shutdown_timeout=5.0, name=None, **kwargs):
+        """
+        Configure the queue, and the backend that the events are sent to.
+
+        :Parameters:
+
+          - `backend`: configuration of the wrapped backend, with its
+            'ENGINE' and 'OPTIONS', as in TRACKING_BACKENDS
+          - `max_queue_size`: maximum number of queued events
+          - `batch_size`: maximum number of events sent to the wrapped
+            backend at once
+          - `flush_interval`: maximum number of seconds that an event waits
+            for a batch to fill up
+          - `overflow`: what happens when the queue is full, one of
+            OVERFLOW_POLICIES
+          - `block_timeout`: maximum number of seconds that sending an
+            event waits for room in the queue, with the 'block' policy
+          - `shutdown_timeout`: maximum number of seconds that the exiting
+            process waits for the queued events to be sent
+          - `name`: name of the backend in the metrics, by default the
+            class name of the wrapped backend
+
+        """
+        super(QueuedBackend, self).__init__(**kwargs)
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Invalid overflow policy {0}, expected one of {1}'.format(overflow, OVERFLOW_POLICIES))
+
+        # Imported here to avoid a circular import, as the tracker instantiates this backend.
+        from track.tracker import _instantiate_backend_from_name
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.metric_tags = [u'backend:{0}'.format(name or self.backend.__class__.__name__)]
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self.queue = None
+        self.thread = None
+        atexit.register(self.close)
+
+    def _get_queue(self):
+        """
+        Return the queue of this process, starting its flusher thread if it isn't running yet.
+
+        Forked processes (e.g. workers of a preforking server) start their own
+        queue and thread, as threads don't survive a fork.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return self.queue
+        with self._lock:
+            if self._pid != pid:
+                self.queue = Queue.Queue(self.max_queue_size)
+                self.thread = threading.Thread(target=self._run, args=(self.queue,), name='track-queued-backend')
+                self.thread.daemon = True
+                self.thread.start()
+                self._pid = pid
+        return self.queue
+
+    def send(self, event):
+        """Queue the event, or drop an event if the queue is full"""
+        queue = self._get_queue()
+        try:
+            if self.overflow == 'block':
+                queue.put(event, timeout=self.block_timeout)
+            else:
+                queue.put_nowait(event)
+            return
+        except Queue.Full:
+            pass
+
+        if self.overflow == 'drop_oldest':
+            try:
+                queue.get_nowait()
+                queue.task_done()
+            except Queue.Empty:
+                pass
+            try:
+                queue.put_nowait(event)
+            except Queue.Full:
+                pass
+        dog_stats_api.increment('track.queue.dropped', tags=self.metric_tags)
+
+    def _next_batch(self, queue):
+        """
+        Return the next batch of events, and whether the thread should stop once they are sent.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time()
+            if timeout <= 0:
+                break
+            try:
+                event = queue.get(timeout=timeout)
+            except Queue.Empty:
+                break
+            if event is _FLUSH or event is _STOP:
+                queue.task_done()
+                return batch, event is _STOP
+            batch.append(event)
+            if deadline is None:
+                deadline = time() + self.flush_interval
+        return batch, False
+
+    def _send_batch(self, queue, batch):
+        """
+        Send a batch of events to the wrapped backend.
+        """
+        dog_stats_api.gauge('track.queue.depth', queue.qsize(), tags=self.metric_tags)
+        dog_stats_api.histogram('track.queue.batch_size', len(batch), tags=self.metric_tags)
+        try:
+            with dog_stats_api.timer('track.queue.send_many', tags=self.metric_tags):
+                self.backend.send_many(batch)
+        except Exception:  # pylint: disable=broad-except
+            # The batch is lost, but the thread must keep sending the next ones.
+            log.exception('Error sending %d events to the queued event tracker backend', len(batch))
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+    def _run(self, queue):
+        """
+        Send the queued events in batches until the thread is stopped.
+        """
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch(queue)
+            if batch:
+                self._send_batch(queue, batch)
+
+    def flush(self):
+        """
+        Send the events queued so far, and wait until they have been sent.
+        """
+        if self._pid == os.getpid():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+
+    def close(self):
+        """
+        Send the queued events, and stop the flusher thread of this process.
+        """
+        if self._pid != os.getpid() or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=self.shutdown_timeout)
+        except Queue.Full:
+            log.warning('Could not stop the queued event tracker backend, as its queue is full')
+            return
+        self.thread.join(self.shutdown_timeout)
+        if self.thread.is_alive():
+            log.warning('Events were lost while stopping the queued event tracker backend')
+        with self._lock:
+            # events sent from now on start a new thread
+            self._pid = None
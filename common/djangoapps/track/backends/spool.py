@@ -0,0 +1,272 @@
+"""
+Event tracker backend that appends events to rotating segment files on the local disk.
+
+The spool is a cheap, durable local buffer: events can be replayed later into
+other backends (see `replay` and the replay_event_spool management command),
+so that the downstream event sinks don't add latency to requests, and can
+catch up after a load spike or an outage.
+
+Each event is stored as a record: a header with the record's flags, the length
+of its payload and the CRC32 checksum of the payload, followed by the payload,
+the event encoded to JSON and, if `compress` is set, compressed with zlib.
+
+Each process appends to its own segment, named
+``<prefix>-<time>-<pid>-<sequence>.spool`` after the time it was started, with
+an ``.open`` suffix while it is being written. A segment is closed, and a new one started, once it reaches
+`max_segment_bytes` or is older than `max_segment_age` seconds. The segment
+is flushed after each event, but only synced to disk once `fsync_every`
+events were written, or `fsync_interval` seconds passed, since the last sync.
+"""
+
+from __future__ import absolute_import
+
+import atexit
+from datetime import datetime
+import json
+import logging
+import os
+import struct
+import threading
+from time import time
+import zlib
+
+import dateutil.parser
+
+from track.backends import BaseBackend
+from track.backends.queued import QueuedBackend
+from track.utils import DateTimeJSONEncoder
+
+
+log = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.spool'
+OPEN_SUFFIX = '.open'
+REPLAYED_SUFFIX = '.replayed'
+
+# flags, payload length and payload CRC32 of a record
+RECORD_HEADER = struct.Struct('>BII')
+FLAG_COMPRESSED = 0x01
+
+
+def encode_record(event, compress=False):
+    """
+    Return the record of `event`.
+    """
+    payload = json.dumps(event, cls=DateTimeJSONEncoder)
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= FLAG_COMPRESSED
+    return RECORD_HEADER.pack(flags, len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+
+class SpoolBackend(BaseBackend):
+    """Event tracker backend that appends events to local segment files"""
+
+    def __init__(self, directory, prefix='events', compress=False, max_segment_bytes=64 * 1024 * 1024,
+                 max_segment_age=300, fsync_every=1000, fsync_interval=1.0, **kwargs):
+        """
+        Configure the spool.
+
+        :Parameters:
+
+          - `directory`: directory of the segment files, created if needed
+          - `prefix`: prefix of the names of the segment files
+          - `compress`: whether each event is compressed
+          - `max_segment_bytes`: size above which a segment is closed
+          - `max_segment_age`: number of seconds after which a segment is
+            closed, checked when an event is sent
+          - `fsync_every`: maximum number of events written between syncs
+          - `fsync_interval`: maximum number of seconds between syncs,
+            checked when an event is sent
+
+        """
+        super(SpoolBackend, self).__init__(**kwargs)
+
+        self.directory = directory
+        self.prefix = prefix
+        self.compress = compress
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._sequence = 0
+        self._segment = None
+        self._segment_path = None
+        self._segment_started = None
+        self._segment_bytes = 0
+        self._unsynced = 0
+        self._synced_at = None
+        atexit.register(self.close)
+
+    def _open_segment(self):
+        """
+        Start a new segment for this process.
+        """
+        self._sequence += 1
+        name = '{0}-{1}-{2}-{3}{4}'.format(
+            self.prefix, datetime.utcnow().strftime('%Y%m%dT%H%M%S%f'), os.getpid(), self._sequence, SEGMENT_SUFFIX
+        )
+        self._segment_path = os.path.join(self.directory, name)
+        self._segment = open(self._segment_path + OPEN_SUFFIX, 'ab')
+        self._segment_started = self._synced_at = time()
+        self._segment_bytes = 0
+        self._unsynced = 0
+        self._pid = os.getpid()
+
+    def _sync(self):
+        """
+        Sync the segment to disk.
+        """
+        os.fsync(self._segment.fileno())
+        self._unsynced = 0
+        self._synced_at = time()
+
+    def _close_segment(self):
+        """
+        Sync and close the segment, so that it can be replayed.
+        """
+        self._sync()
+        segment, self._segment = self._segment, None
+        segment.close()
+        os.rename(self._segment_path + OPEN_SUFFIX, self._segment_path)
+
+    def _get_segment(self):
+        """
+        Return the segment that events are appended to, rotating it if it is full or too old.
+        """
+        if self._segment is not None and self._pid != os.getpid():
+            # The segment belongs to the parent of this forked process. As it
+            # is flushed after each event, it can be dropped without losing any.
+            self._segment = None
+        if self._segment is not None and (
+                self._segment_bytes >= self.max_segment_bytes or
+                time() - self._segment_started >= self.max_segment_age
+        ):
+            self._close_segment()
+        if self._segment is None:
+            self._open_segment()
+        return self._segment
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events, raise_errors=False):
+        """Append the events to the segment with a single write"""
+        records = ''.join(encode_record(event, self.compress) for event in events)
+        with self._lock:
+            try:
+                segment = self._get_segment()
+                segment.write(records)
+                segment.flush()
+                self._segment_bytes += len(records)
+                self._unsynced += len(events)
+                if self._unsynced >= self.fsync_every or time() - self._synced_at >= self.fsync_interval:
+                    self._sync()
+            except (IOError, OSError):
+                if raise_errors:
+                    raise
+                log.exception('Error appending %d events to the event spool in %s', len(events), self.directory)
+
+    def close(self):
+        """
+        Close the segment of this process, if it has one, so that it can be replayed.
+        """
+        with self._lock:
+            if self._segment is None or self._pid != os.getpid():
+                return
+            try:
+                self._close_segment()
+            except (IOError, OSError):
+                log.exception('Error closing the event spool segment %s', self._segment_path)
+
+
+def read_segment(path):
+    """
+    Yield the events of the segment file at `path`, in order.
+
+    Reading stops at the first incomplete or corrupted record, which can only
+    be the last one of a segment that was not closed.
+    """
+    with open(path, 'rb') as segment:
+        while True:
+            header = segment.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < RECORD_HEADER.size:
+                log.warning('Incomplete record header at the end of event spool segment %s', path)
+                return
+            flags, length, checksum = RECORD_HEADER.unpack(header)
+            payload = segment.read(length)
+            if len(payload) < length or zlib.crc32(payload) & 0xffffffff != checksum:
+                log.warning('Incomplete or corrupted record in event spool segment %s', path)
+                return
+            if flags & FLAG_COMPRESSED:
+                payload = zlib.decompress(payload)
+            yield json.loads(payload)
+
+
+def iter_segments(directory, prefix='events', include_open=False):
+    """
+    Return the paths of the segment files in `directory`, oldest first.
+
+    Segments that are still being written are only included if `include_open`
+    is set, e.g. to recover the segments of processes that died.
+    """
+    suffixes = (SEGMENT_SUFFIX, SEGMENT_SUFFIX + OPEN_SUFFIX) if include_open else (SEGMENT_SUFFIX,)
+    names = [
+        name for name in os.listdir(directory)
+        if name.startswith(prefix + '-') and name.endswith(suffixes)
+    ]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+def decode_event(event):
+    """
+    Return `event` as read from a segment, with its time converted back from ISO format to a datetime.
+    """
+    if isinstance(event.get('time'), basestring):
+        event['time'] = dateutil.parser.parse(event['time'])
+    return event
+
+
+def replay(directory, backend, prefix='events', batch_size=100, delete=False, include_open=False):
+    """
+    Send the events of the segments in `directory` to `backend`, in batches of up to `batch_size` events.
+
+    Each segment is deleted if `delete` is set, and otherwise renamed with a
+    REPLAYED_SUFFIX so that it isn't replayed again, once all of its events
+    were sent. The batches are sent with `raise_errors`, so replaying stops
+    at the first batch that the backend fails to store, and leaves its
+    segment to be replayed again, including the events that were already
+    sent. Returns the number of replayed events.
+
+    Raises ValueError if `backend` is a QueuedBackend, as it would drop the
+    events that don't fit in its queue.
+    """
+    if isinstance(backend, QueuedBackend):
+        raise ValueError('Events cannot be replayed into a queued backend, replay them into the backend it wraps')
+
+    count = 0
+    for path in iter_segments(directory, prefix, include_open):
+        batch = []
+        for event in read_segment(path):
+            batch.append(decode_event(event))
+            if len(batch) >= batch_size:
+                backend.send_many(batch, raise_errors=True)
+                count += len(batch)
+                batch = []
+        if batch:
+            backend.send_many(batch, raise_errors=True)
+            count += len(batch)
+        if delete:
+            os.remove(path)
+        else:
+            os.rename(path, path + REPLAYED_SUFFIX)
+    return count
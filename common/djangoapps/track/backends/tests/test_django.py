@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
+from django.db import DatabaseError
 from django.test import TestCase
+from mock import patch
 
 from track.backends.django import DjangoBackend, TrackingLog
 
@@ -24,3 +26,23 @@ class TestDjangoBackend(TestCase):
 
         # Check if time is stored in UTC
         self.assertEqual(str(results[0].time), '2013-01-01 17:01:00+00:00')
+
+    def test_django_backend_send_many(self):
+        events = [
+            {'username': 'test{0}'.format(index), 'time': '2013-01-01T12:01:00-05:00'}
+            for index in range(3)
+        ]
+        with self.assertNumQueries(1):
+            self.backend.send_many(events)
+
+        results = TrackingLog.objects.order_by('username')
+
+        self.assertEqual([result.username for result in results], ['test0', 'test1', 'test2'])
+
+    def test_django_backend_send_many_errors(self):
+        events = [{'username': 'test', 'time': '2013-01-01T12:01:00-05:00'}]
+        with patch.object(TrackingLog.objects, 'using', side_effect=DatabaseError):
+            # errors are logged, unless they should be raised
+            self.backend.send_many(events)
+            with self.assertRaises(DatabaseError):
+                self.backend.send_many(events, raise_errors=True)
@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.queued import QueuedBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Backend that records the batches of events it is sent, optionally waiting for an event first"""
+    def __init__(self, **kwargs):
+        super(RecordingBackend, self).__init__(**kwargs)
+        self.batches = []
+        self.resume = threading.Event()
+        self.resume.set()
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events):
+        self.resume.wait()
+        self.batches.append(list(events))
+
+
+class TestQueuedBackend(TestCase):
+    def make_backend(self, **options):
+        backend = QueuedBackend(
+            backend={'ENGINE': 'track.backends.tests.test_queued.RecordingBackend'},
+            **options
+        )
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_batches(self):
+        backend = self.make_backend(batch_size=2, flush_interval=0.1)
+        backend.backend.resume.clear()
+        backend.send({'test': 0})
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+        backend.backend.resume.set()
+        backend.flush()
+
+        self.assertEqual(backend.backend.batches, [[{'test': 0}, {'test': 1}], [{'test': 2}]])
+
+    def test_flush_on_close(self):
+        backend = self.make_backend(flush_interval=60)
+        backend.send({'test': 0})
+        backend.close()
+
+        self.assertFalse(backend.thread.is_alive())
+        self.assertEqual(backend.backend.batches, [[{'test': 0}]])
+
+        # sending again starts a new thread
+        backend.send({'test': 1})
+        backend.flush()
+        self.assertEqual(backend.backend.batches, [[{'test': 0}], [{'test': 1}]])
+
+    def assert_overflow(self, overflow, expected_events):
+        """
+        Fills up the queue with the overflow policy, and checks which events were sent.
+        """
+        backend = self.make_backend(max_queue_size=2, batch_size=1, overflow=overflow, block_timeout=0.01)
+        backend.backend.resume.clear()
+        backend.send({'test': 0})
+        # wait for the thread to take the first event, and to wait for the backend
+        while not backend.queue.empty():
+            time.sleep(0.001)
+        with patch('track.backends.queued.dog_stats_api') as mock_stats:
+            for index in range(1, 5):
+                backend.send({'test': index})
+        backend.backend.resume.set()
+        backend.flush()
+
+        self.assertEqual([batch[0]['test'] for batch in backend.backend.batches], expected_events)
+        self.assertEqual(mock_stats.increment.call_count, 2)
+
+    def test_drop_newest(self):
+        self.assert_overflow('drop_newest', [0, 1, 2])
+
+    def test_drop_oldest(self):
+        self.assert_overflow('drop_oldest', [0, 3, 4])
+
+    def test_block(self):
+        self.assert_overflow('block', [0, 1, 2])
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            self.make_backend(overflow='unknown')
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from mock import Mock
+from pytz import UTC
+
+from django.test import TestCase
+
+from track.backends.queued import QueuedBackend
+from track.backends.spool import REPLAYED_SUFFIX, SpoolBackend, iter_segments, read_segment, replay
+
+
+class TestSpoolBackend(TestCase):
+    def setUp(self):
+        super(TestSpoolBackend, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_backend(self, **options):
+        backend = SpoolBackend(directory=self.directory, **options)
+        self.addCleanup(backend.close)
+        return backend
+
+    def read_events(self, include_open=False):
+        return [
+            event
+            for path in iter_segments(self.directory, include_open=include_open)
+            for event in read_segment(path)
+        ]
+
+    def test_round_trip(self):
+        for compress in (False, True):
+            backend = self.make_backend(prefix='compressed' if compress else 'events', compress=compress)
+            events = [
+                {'event_type': 'test', 'time': datetime.datetime(2013, 1, 1, 12, 1)},
+                {'event_type': u'événement', 'event': {'index': 1}},
+            ]
+            backend.send(events[0])
+            backend.send_many(events[1:])
+
+            # the segment can only be replayed once it is closed
+            self.assertEqual(iter_segments(self.directory, prefix=backend.prefix), [])
+            backend.close()
+            paths = iter_segments(self.directory, prefix=backend.prefix)
+            self.assertEqual(len(paths), 1)
+            self.assertEqual(
+                list(read_segment(paths[0])),
+                [
+                    {'event_type': 'test', 'time': '2013-01-01T12:01:00+00:00'},
+                    {'event_type': u'événement', 'event': {'index': 1}},
+                ]
+            )
+
+    def test_rotation(self):
+        backend = self.make_backend(max_segment_bytes=1)
+        for index in range(3):
+            backend.send({'index': index})
+
+        # the last segment is still open
+        self.assertEqual(len(iter_segments(self.directory)), 2)
+        self.assertEqual(self.read_events(include_open=True), [{'index': index} for index in range(3)])
+
+    def test_fsync_batching(self):
+        backend = self.make_backend(fsync_every=2, fsync_interval=60)
+        backend.send({'index': 0})
+        self.assertEqual(backend._unsynced, 1)  # pylint: disable=protected-access
+        backend.send({'index': 1})
+        self.assertEqual(backend._unsynced, 0)  # pylint: disable=protected-access
+
+    def test_incomplete_record(self):
+        backend = self.make_backend()
+        backend.send_many([{'index': 0}, {'index': 1}])
+        backend.close()
+        path = iter_segments(self.directory)[0]
+        with open(path, 'r+b') as segment:
+            segment.truncate(os.path.getsize(path) - 1)
+
+        self.assertEqual(self.read_events(), [{'index': 0}])
+
+    def test_replay(self):
+        backend = self.make_backend()
+        backend.send_many([{'index': index} for index in range(5)])
+        backend.close()
+        target = Mock()
+
+        self.assertEqual(replay(self.directory, target, batch_size=2), 5)
+        self.assertEqual(
+            [call[0][0] for call in target.send_many.call_args_list],
+            [[{'index': 0}, {'index': 1}], [{'index': 2}, {'index': 3}], [{'index': 4}]]
+        )
+        self.assertTrue(all(call[1] == {'raise_errors': True} for call in target.send_many.call_args_list))
+
+        # replayed segments are not replayed again
+        self.assertEqual(replay(self.directory, target), 0)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_replay_delete(self):
+        backend = self.make_backend()
+        backend.send({'index': 0})
+        backend.close()
+
+        self.assertEqual(replay(self.directory, Mock(), delete=True), 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_replay_time(self):
+        backend = self.make_backend()
+        backend.send({'time': datetime.datetime(2013, 1, 1, 12, 1)})
+        backend.close()
+        target = Mock()
+
+        replay(self.directory, target)
+        target.send_many.assert_called_once_with(
+            [{'time': datetime.datetime(2013, 1, 1, 12, 1, tzinfo=UTC)}], raise_errors=True
+        )
+
+    def test_replay_error(self):
+        backend = self.make_backend(max_segment_bytes=1)
+        for index in range(3):
+            backend.send({'index': index})
+        backend.close()
+        target = Mock()
+        target.send_many.side_effect = [None, IOError, None, None]
+
+        # the segment whose events couldn't all be sent is kept, and the next ones aren't replayed yet
+        with self.assertRaises(IOError):
+            replay(self.directory, target)
+        self.assertEqual(len(iter_segments(self.directory)), 2)
+
+        self.assertEqual(replay(self.directory, target), 2)
+        self.assertEqual(iter_segments(self.directory), [])
+        self.assertEqual(
+            [name.endswith(REPLAYED_SUFFIX) for name in os.listdir(self.directory)],
+            [True, True, True]
+        )
+
+    def test_replay_queued_backend(self):
+        target = QueuedBackend(backend={
+            'ENGINE': 'track.backends.logger.LoggerBackend',
+            'OPTIONS': {'name': 'tracking'},
+        })
+        self.addCleanup(target.close)
+        with self.assertRaises(ValueError):
+            replay(self.directory, target)
@@ -0,0 +1,64 @@
+"""
+Replay the events of an event spool into one of the tracking backends.
+"""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from track import tracker
+from track.backends.spool import replay
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--prefix',
+                    dest='prefix',
+                    default='events',
+                    help='Prefix of the names of the segment files'),
+        make_option('--batch-size',
+                    dest='batch_size',
+                    type='int',
+                    default=100,
+                    help='Maximum number of events sent to the backend at once'),
+        make_option('--delete',
+                    action='store_true',
+                    dest='delete',
+                    default=False,
+                    help='Delete the replayed segments instead of renaming them'),
+        make_option('--include-open',
+                    action='store_true',
+                    dest='include_open',
+                    default=False,
+                    help='Also replay the segments that were not closed, of processes that are no longer running'),
+    )
+
+    args = '<spool directory> <backend name>'
+    help = """
+    Send the events of the closed segments of an event spool
+    (track.backends.spool.SpoolBackend) to the backend of TRACKING_BACKENDS
+    with the given name.
+    """
+
+    def handle(self, *args, **options):
+        if len(args) != 2:
+            raise CommandError('Usage is replay_event_spool {0}'.format(self.args))
+
+        directory, backend_name = args
+        try:
+            backend = tracker.backends[backend_name]
+        except KeyError:
+            raise CommandError('Tracking backend {0} is not configured'.format(backend_name))
+
+        try:
+            count = replay(
+                directory,
+                backend,
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                delete=options['delete'],
+                include_open=options['include_open'],
+            )
+        except ValueError as error:
+            raise CommandError(error.message)
+        self.stdout.write('Replayed {0} events\n'.format(count))
@@ -0,0 +1,47 @@
+"""Tests of the replay_event_spool management command."""
+import shutil
+from StringIO import StringIO
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from mock import Mock, patch
+
+from track.backends.queued import QueuedBackend
+from track.backends.spool import SpoolBackend
+from track.management.commands.replay_event_spool import Command
+
+
+class ReplayEventSpoolTest(TestCase):
+    def setUp(self):
+        super(ReplayEventSpoolTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_replay(self):
+        spool = SpoolBackend(directory=self.directory)
+        spool.send({'index': 0})
+        spool.close()
+        target = Mock()
+        out = StringIO()
+        with patch.dict('track.tracker.backends', {'target': target}):
+            call_command('replay_event_spool', self.directory, 'target', stdout=out)
+
+        target.send_many.assert_called_once_with([{'index': 0}], raise_errors=True)
+        self.assertEqual(out.getvalue(), 'Replayed 1 events\n')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(CommandError):
+            Command().handle(self.directory, 'unknown')
+
+    def test_queued_backend(self):
+        target = QueuedBackend(backend={
+            'ENGINE': 'track.backends.logger.LoggerBackend',
+            'OPTIONS': {'name': 'tracking'},
+        })
+        self.addCleanup(target.close)
+        with patch.dict('track.tracker.backends', {'target': target}):
+            with self.assertRaises(CommandError):
+                Command().handle(self.directory, 'target', prefix='events', batch_size=100, delete=False,
+                                 include_open=False)
@@ -16,6 +16,12 @@ below::
       }
   }
 
+Backends that write to a database can be wrapped in a
+`track.backends.queued.QueuedBackend`, so that events are sent to them in
+batches from a background thread instead of within the request. Events can
+also be buffered on the local disk with `track.backends.spool.SpoolBackend`,
+and replayed into other backends later.
+
 """
 
 import inspect
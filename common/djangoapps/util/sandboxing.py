@@ -1,5 +1,8 @@
 import re
 from django.conf import settings
+from django.core.cache import cache
+
+from capa.safe_exec.result_cache import LocalResultCache, ResultCache
 
 # We'll make assets named this be importable by Python code in the sandbox.
 PYTHON_LIB_ZIP = "python_lib.zip"
@@ -38,3 +41,25 @@ def get_python_lib_zip(contentstore, course_id):
         return zip_lib.data
     else:
         return None
+
+
+_SAFE_EXEC_CACHE = None
+
+
+def get_safe_exec_cache():
+    """
+    Return the cache of the results of capa's Python code.
+
+    Results are cached in the django cache, with an in-process tier in front
+    of it, sized by the SAFE_EXEC_RESULT_CACHE setting.
+    """
+    global _SAFE_EXEC_CACHE  # pylint: disable=global-statement
+    if _SAFE_EXEC_CACHE is None:
+        cache_settings = getattr(settings, 'SAFE_EXEC_RESULT_CACHE', {})
+        local_max_bytes = cache_settings.get('local_max_bytes')
+        _SAFE_EXEC_CACHE = ResultCache(
+            cache,
+            local=LocalResultCache(local_max_bytes) if local_max_bytes else None,
+            max_entry_bytes=cache_settings.get('max_entry_bytes', 1000 * 1000),
+        )
+    return _SAFE_EXEC_CACHE
@@ -4,7 +4,9 @@ Tests for sandboxing.py in util app
 
 from django.test import TestCase
 from opaque_keys.edx.locator import LibraryLocator
-from util.sandboxing import can_execute_unsafe_code
+from mock import patch
+from util import sandboxing
+from util.sandboxing import can_execute_unsafe_code, get_safe_exec_cache
 from django.test.utils import override_settings
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
@@ -37,3 +39,26 @@ class SandboxingTest(TestCase):
         self.assertFalse(can_execute_unsafe_code(SlashSeparatedCourseKey('edX', 'full', '2012_Fall')))
         self.assertFalse(can_execute_unsafe_code(SlashSeparatedCourseKey('edX', 'full', '2013_Spring')))
         self.assertFalse(can_execute_unsafe_code(LibraryLocator('edX', 'test_bank')))
+
+
+class SafeExecCacheTest(TestCase):
+    """
+    Test the cache of the results of sandboxed code
+    """
+    @override_settings(SAFE_EXEC_RESULT_CACHE={'local_max_bytes': 1000, 'max_entry_bytes': 100})
+    @patch.object(sandboxing, '_SAFE_EXEC_CACHE', None)
+    def test_local_tier(self):
+        cache = get_safe_exec_cache()
+        self.assertIs(cache, get_safe_exec_cache())
+        self.assertEqual(cache.local.max_bytes, 1000)
+        self.assertEqual(cache.max_entry_bytes, 100)
+
+        cache.set('key', (None, {'a': 1}))
+        cache.local.clear()
+        # Found in the django cache.
+        self.assertEqual(cache.get('key'), (None, {'a': 1}))
+
+    @override_settings(SAFE_EXEC_RESULT_CACHE={'local_max_bytes': 0})
+    @patch.object(sandboxing, '_SAFE_EXEC_CACHE', None)
+    def test_no_local_tier(self):
+        self.assertIsNone(get_safe_exec_cache().local)
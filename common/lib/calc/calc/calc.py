@@ -2,11 +2,19 @@
 Parser and evaluator for FormulaResponse and NumericalResponse
 
 Uses pyparsing to parse. Main function as of now is evaluator().
+
+Parsing is by far the slowest part of an evaluation, so parsed expressions
+are kept in a least-recently-used cache (see `parse_expression`), along with
+the callable they compile to (see `compile_expression`). A compiled expression
+can also evaluate a whole list of sample points at once, with numpy arrays in
+place of the variables (see `evaluate_samples`).
 """
 
+from collections import OrderedDict
 import math
 import operator
 import numbers
+import threading
 import numpy
 import scipy.constants
 import functions
@@ -72,6 +80,9 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# How many parsed expressions to keep around.
+PARSE_CACHE_SIZE = 1024
+
 
 class UndefinedVariable(Exception):
     """
@@ -228,34 +239,181 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    return compile_expression(math_expr, case_sensitive)(variables, functions)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+def evaluate_samples(samples, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression at many points; return the list of results.
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+    `samples` is a list of dictionaries of variables, one per point, as they
+    would be passed to `evaluator`. The result is the same as calling
+    `evaluator` for each of them, but the expression is only evaluated once,
+    on numpy arrays of the samples, when possible.
+    """
+    if math_expr.strip() == "":
+        return [float('nan')] * len(samples)
+
+    return compile_expression(math_expr, case_sensitive).evaluate_many(samples, functions)
+
+
+class ParseCache(object):
+    """
+    A least-recently-used cache of `ParseAugmenter`s, keyed by the expression
+    and its case sensitivity.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the entry for `key` and mark it as recently used, or None.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        """
+        Store `entry` under `key`, evicting the least recently used entry if the cache is full.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Forget every entry.
+        """
+        with self.lock:
+            self.entries.clear()
+
+
+PARSE_CACHE = ParseCache(PARSE_CACHE_SIZE)
+
+
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Return a `ParseAugmenter` holding the parse of `math_expr`.
+
+    The result is cached, so it must not be modified. Expressions that fail to
+    parse aren't cached; the `ParseException` is raised every time.
+    """
+    key = (math_expr, case_sensitive)
+    math_interpreter = PARSE_CACHE.get(key)
+    if math_interpreter is None:
+        math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        math_interpreter.parse_algebra()
+        PARSE_CACHE.set(key, math_interpreter)
+    return math_interpreter
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the `CompiledExpression` of `math_expr`, parsing it if it isn't cached.
+    """
+    return parse_expression(math_expr, case_sensitive).compile()
+
+
+def eval_parallel_samples(values):
+    """
+    Like `eval_parallel`, but for operands that may be numpy arrays of samples.
+
+    Return NaN for the samples where one of the inputs is zero.
+    """
+    if len(values) == 1:
+        return values[0]
+    has_zero = reduce(numpy.logical_or, [numpy.equal(value, 0) for value in values])
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        result = 1. / sum(1. / value for value in values)
+    return numpy.where(has_zero, float('nan'), result)
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+def compile_tree(tree, casify):
+    """
+    Turn a parse tree into a function of `(variables, functions)` returning its value.
+
+    Operators and numbers are resolved once, here, instead of on each
+    evaluation. The arithmetic is the same as that of the `eval_*` actions, and
+    works on numpy arrays as well as on numbers.
+    """
+    def compile_node(node):
+        """
+        Return the function computing the value of `node`.
+        """
+        node_name = node.getName()
+
+        if node_name == 'number':
+            number = eval_number(list(node))
+            return lambda variables, functions: number
+
+        if node_name == 'variable':
+            varname = casify(node[0])
+            return lambda variables, functions: variables[varname]
+
+        if node_name == 'function':
+            funcname = casify(node[0])
+            argument = compile_node(node[1])
+            return lambda variables, functions: functions[funcname](argument(variables, functions))
+
+        if node_name == 'atom':
+            # Skip the parenthesis, if any.
+            return compile_node(next(k for k in node if isinstance(k, ParseResults)))
+
+        if node_name == 'power':
+            # Exponentiate right to left, as `eval_power` does.
+            operands = [compile_node(k) for k in reversed(node) if isinstance(k, ParseResults)]
+            return lambda variables, functions: reduce(
+                lambda a, b: b ** a, [operand(variables, functions) for operand in operands]
+            )
+
+        if node_name == 'parallel':
+            operands = [compile_node(k) for k in node if isinstance(k, ParseResults)]
+
+            def parallel(variables, functions):
+                """
+                Combine the operands with `eval_parallel`, or its array version.
+                """
+                values = [operand(variables, functions) for operand in operands]
+                if any(isinstance(value, numpy.ndarray) for value in values):
+                    return eval_parallel_samples(values)
+                return eval_parallel(values)
+            return parallel
+
+        if node_name in ('sum', 'product'):
+            if node_name == 'sum':
+                initial = 0.0
+                operators = {'+': operator.add, '-': operator.sub}
+            else:
+                initial = 1.0
+                operators = {'*': operator.mul, '/': operator.truediv}
+            current_op = operator.add if node_name == 'sum' else operator.mul
+            terms = []
+            for token in node:
+                if isinstance(token, ParseResults):
+                    terms.append((current_op, compile_node(token)))
+                else:
+                    current_op = operators[token]
+
+            def combine(variables, functions):
+                """
+                Apply each term's operator to the running total, left to right.
+                """
+                total = initial
+                for term_op, term in terms:
+                    total = term_op(total, term(variables, functions))
+                return total
+            return combine
+
+        raise Exception(u"Unknown branch name '{}'".format(node_name))  # pragma: no cover
+
+    return compile_node(tree)
 
 
 class ParseAugmenter(object):
@@ -277,6 +435,7 @@ class ParseAugmenter(object):
         self.tree = None
         self.variables_used = set()
         self.functions_used = set()
+        self.compiled = None
 
         def vpa(tokens):
             """
@@ -397,6 +556,14 @@ class ParseAugmenter(object):
         # Find the value of the entire tree.
         return handle_node(self.tree)
 
+    def compile(self):
+        """
+        Return the `CompiledExpression` of `self.tree`, compiling it the first time.
+        """
+        if self.compiled is None:
+            self.compiled = CompiledExpression(self)
+        return self.compiled
+
     def check_variables(self, valid_variables, valid_functions):
         """
         Confirm that all the variables used in the tree are valid/defined.
@@ -416,3 +583,76 @@ class ParseAugmenter(object):
 
         if bad_vars:
             raise UndefinedVariable(' '.join(sorted(bad_vars)))
+
+
+class CompiledExpression(object):
+    """
+    A parsed expression, compiled into a callable that can be evaluated many times.
+
+    Call it like `evaluator`, without the expression: `OBJ(variables, functions)`.
+    """
+    def __init__(self, math_interpreter):
+        self.math_interpreter = math_interpreter
+        self.case_sensitive = math_interpreter.case_sensitive
+        if self.case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+        self.evaluate = compile_tree(math_interpreter.tree, casify)
+
+    def __call__(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.math_interpreter.check_variables(all_variables, all_functions)
+        return self.evaluate(all_variables, all_functions)
+
+    def evaluate_many(self, samples, functions):
+        """
+        Evaluate the expression for each dictionary of variables in `samples`; return the list of results.
+
+        When every sample defines the same variables, as floats or complex
+        numbers, evaluate the expression once, on arrays of their values.
+        Anything that the arrays can't reproduce exactly falls back to
+        evaluating the samples one by one: functions that don't accept arrays,
+        and floating point errors (division by zero, overflow, etc.), which
+        python numbers raise or treat differently than numpy arrays.
+        """
+        results = self.evaluate_vectorized(samples, functions)
+        if results is None:
+            results = [self(variables, functions) for variables in samples]
+        return results
+
+    def evaluate_vectorized(self, samples, functions):
+        """
+        Return the list of results of `evaluate_many`, or None if they can't be computed with arrays.
+        """
+        if len(samples) < 2:
+            return None
+
+        names = set(samples[0])
+        if any(set(variables) != names for variables in samples):
+            return None
+        columns = {}
+        for name in names:
+            values = [variables[name] for variables in samples]
+            if not all(isinstance(value, (float, complex)) for value in values):
+                return None
+            columns[name] = numpy.array(values)
+
+        all_variables, all_functions = add_defaults(columns, functions, self.case_sensitive)
+        self.math_interpreter.check_variables(all_variables, all_functions)
+        try:
+            with numpy.errstate(all='raise'):
+                result = numpy.asarray(self.evaluate(all_variables, all_functions))
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+        if result.dtype.kind not in 'fc':
+            return None
+        if result.shape == ():
+            result = numpy.repeat(result, len(samples))
+        if result.shape != (len(samples),):
+            return None
+        return result.tolist()
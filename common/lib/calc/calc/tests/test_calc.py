@@ -559,3 +559,99 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class ParseCacheTest(unittest.TestCase):
+    """
+    Test that parsed expressions are reused, and evicted least recently used first.
+    """
+    def setUp(self):
+        super(ParseCacheTest, self).setUp()
+        calc.PARSE_CACHE.clear()
+        self.addCleanup(calc.PARSE_CACHE.clear)
+
+    def test_reuse(self):
+        parsed = calc.parse_expression('x^2+1')
+        self.assertIs(parsed, calc.parse_expression('x^2+1'))
+        self.assertIs(parsed.compile(), calc.compile_expression('x^2+1'))
+        # Case sensitivity is part of the key.
+        self.assertIsNot(parsed, calc.parse_expression('x^2+1', case_sensitive=True))
+
+    def test_parse_errors_not_cached(self):
+        with self.assertRaises(ParseException):
+            calc.evaluator({}, {}, '1+')
+        self.assertNotIn(('1+', False), calc.PARSE_CACHE.entries)
+
+    def test_eviction(self):
+        cache = calc.ParseCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Test that evaluating many samples at once gives the results `evaluator` gives for each.
+    """
+    def assert_same_as_evaluator(self, math_expr, samples, functions=None, case_sensitive=False):
+        """
+        Check `evaluate_samples` against calling `evaluator` on each sample.
+        """
+        functions = functions or {}
+        expected = [calc.evaluator(variables, functions, math_expr, case_sensitive) for variables in samples]
+        results = calc.evaluate_samples(samples, functions, math_expr, case_sensitive)
+        self.assertEqual(len(results), len(expected))
+        for result, value in zip(results, expected):
+            if numpy.isnan(value):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, value, delta=1e-12 * max(1, abs(value)))
+
+    def test_expressions(self):
+        samples = [{'x': x, 'Y': y} for x, y in [(0.5, 2.0), (1.5, -3.0), (2.5, 7.25), (10.0, 0.125)]]
+        for math_expr in [
+                'x', '3', '-x+2*y-3', 'x/y*2', 'x^2^0.5', '2^(-x)', 'x||y', 'x||1k||y',
+                'sin(x)+cos(y)', 'sqrt(x)*exp(-y)', '(x+y)^2/(1+x^2)', 'i*x', 'e^(pi*x)',
+        ]:
+            self.assert_same_as_evaluator(math_expr, samples)
+
+    def test_case_sensitive(self):
+        samples = [{'x': 1.0, 'X': 2.0}, {'x': 3.0, 'X': 4.0}]
+        self.assert_same_as_evaluator('x*10+X', samples, case_sensitive=True)
+
+    def test_fallback(self):
+        # Samples where the arrays would behave differently from python numbers.
+        self.assert_same_as_evaluator('x||1', [{'x': 0.0}, {'x': 1.0}])
+        self.assert_same_as_evaluator('fact(x)', [{'x': 3.0}, {'x': 4.0}])
+        self.assert_same_as_evaluator('x^2', [{'x': 2}, {'x': 3}])
+        self.assert_same_as_evaluator('f(x)', [{'x': 1.0}, {'x': -1.0}], functions={'f': lambda x: 1 if x > 0 else 2})
+
+    def test_errors(self):
+        samples = [{'x': 1.0}, {'x': 0.0}]
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(samples, {}, '1/x')
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples([{'x': 1.5}, {'x': 2.5}], {}, 'fact(x)')
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(samples, {}, 'x+z')
+
+    def test_empty(self):
+        results = calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}], {}, ' ')
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(numpy.isnan(result) for result in results))
+
+    def test_vectorized(self):
+        # One call of the function for all of the samples.
+        calls = []
+
+        def square(x):  # pylint: disable=missing-docstring
+            calls.append(x)
+            return x * x
+
+        results = calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}, {'x': 3.0}], {'sq': square}, 'sq(x)+1')
+        self.assertEqual(results, [2.0, 5.0, 10.0])
+        self.assertEqual(len(calls), 1)
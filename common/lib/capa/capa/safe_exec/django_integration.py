@@ -0,0 +1,34 @@
+"""
+Django integration for the sandbox pool.
+
+Add ConfigureSandboxPoolMiddleware to MIDDLEWARE_CLASSES after codejail's
+ConfigureCodeJailMiddleware, and configure the pool in the "pool" entry of
+the CODE_JAIL setting::
+
+    CODE_JAIL = {
+        ...
+        'pool': {
+            'size': 2,
+        },
+    }
+
+"""
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import sandbox_pool
+
+
+class ConfigureSandboxPoolMiddleware(object):
+    """
+    Configure the sandbox pool, and start its sandboxes, when Django starts.
+    """
+    def __init__(self):
+        pool_settings = settings.CODE_JAIL.get('pool', {})
+        if pool_settings.get('size'):
+            sandbox_pool.configure(pool_settings['size'])
+            sandbox_pool.warm()
+
+        # Django won't use this middleware for anything else.
+        raise MiddlewareNotUsed
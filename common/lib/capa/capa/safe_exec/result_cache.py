@@ -0,0 +1,169 @@
+"""
+Caching of safe_exec results.
+
+A result is keyed by the content of everything that determines it: the code,
+the globals, the random seed and the files on the Python path. Since a key
+can only ever have one result, results can be kept anywhere, for as long as
+we like, without being invalidated.
+
+`ResultCache` stores results in tiers: an optional in-process LRU cache
+(`LocalResultCache`), in front of a shared backend such as the django cache.
+Any object with `.get(key)` and `.set(key, value)` methods can be a tier.
+
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from dogapi import dog_stats_api
+
+# Results bigger than this (as JSON) aren't cached: memcached won't store
+# values over 1MB anyway.
+DEFAULT_MAX_ENTRY_BYTES = 1000 * 1000
+
+# How much memory the results cached in each process can take.
+DEFAULT_LOCAL_MAX_BYTES = 8 * 1024 * 1024
+
+# The encoder of canonical globals. Leaving out sort_keys lets json use its C encoder.
+_encoder = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+
+def _canonical(obj):
+    """
+    Return JSON-safe `obj` with each dict replaced by the list of its items, sorted.
+
+    Each dict becomes a dict with one key, '', so that its encoding can't be
+    that of a list, and equal objects encode identically.
+    """
+    if isinstance(obj, dict):
+        return {u'': [[key, _canonical(obj[key])] for key in sorted(obj)]}
+    if isinstance(obj, list) and any(isinstance(item, (dict, list)) for item in obj):
+        return [_canonical(item) for item in obj]
+    return obj
+
+
+def cache_key(code, safe_globals, random_seed, python_path=None, extra_files=None):
+    """
+    Return the cache key of executing `code` with `safe_globals` (the output of json_safe).
+    """
+    if isinstance(code, unicode):
+        code = code.encode('utf8')
+    hasher = hashlib.sha1()
+    hasher.update("%d:" % len(code))
+    hasher.update(code)
+    hasher.update(_encoder.encode(_canonical(safe_globals)))
+    for name in python_path or ():
+        hasher.update("\0path:%s" % name)
+    for name, contents in extra_files or ():
+        hasher.update("\0file:%s:%s" % (name, hashlib.sha1(contents).hexdigest()))
+    return "safe_exec.%r.%s" % (random_seed, hasher.hexdigest())
+
+
+def _record(event, tier):
+    """
+    Count a cache event, such as a hit, for a tier.
+    """
+    dog_stats_api.increment("capa.safe_exec.cache.{}".format(event), tags=["tier:{}".format(tier)])
+
+
+class LocalResultCache(object):
+    """
+    An in-process LRU cache of results, limited by the size of their JSON.
+
+    Results are stored as JSON, so that callers can't modify the cached copy.
+    """
+    def __init__(self, max_bytes=DEFAULT_LOCAL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the result stored under `key`, or None.
+        """
+        with self.lock:
+            serialized = self.entries.pop(key, None)
+            if serialized is None:
+                return None
+            self.entries[key] = serialized
+        return tuple(json.loads(serialized))
+
+    def set(self, key, value, serialized=None):
+        """
+        Store `value` under `key`, evicting the least recently used results to make room.
+
+        `serialized` is the JSON of `value`, if the caller has it already.
+        """
+        if serialized is None:
+            serialized = json.dumps(value)
+        if len(serialized) > self.max_bytes:
+            return
+        evictions = 0
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = serialized
+            self.size += len(serialized)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                evictions += 1
+        if evictions:
+            dog_stats_api.increment("capa.safe_exec.cache.eviction", evictions, tags=["tier:local"])
+
+    def clear(self):
+        """
+        Forget every result.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class ResultCache(object):
+    """
+    The tiers of the result cache: the `local` one, if any, in front of the `shared` one, if any.
+    """
+    def __init__(self, shared=None, local=None, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES):
+        self.shared = shared
+        self.local = local
+        self.max_entry_bytes = max_entry_bytes
+
+    def __nonzero__(self):
+        return bool(self.shared or self.local)
+
+    def get(self, key):
+        """
+        Return the result stored under `key` in the nearest tier that has it, or None.
+        """
+        if self.local is not None:
+            value = self.local.get(key)
+            _record("hit" if value is not None else "miss", "local")
+            if value is not None:
+                return value
+
+        if self.shared:
+            value = self.shared.get(key)
+            _record("hit" if value is not None else "miss", "shared")
+            if value is not None:
+                if self.local is not None:
+                    self.local.set(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        """
+        Store `value` under `key` in every tier, unless it is too big to cache.
+        """
+        serialized = json.dumps(value)
+        if len(serialized) > self.max_entry_bytes:
+            dog_stats_api.increment("capa.safe_exec.cache.oversized")
+            return
+        if self.local is not None:
+            self.local.set(key, value, serialized)
+        if self.shared:
+            self.shared.set(key, value)
@@ -4,10 +4,10 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import sandbox_pool
+from .result_cache import ResultCache, cache_key
 from dogapi import dog_stats_api
 
-import hashlib
-
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
 # The name "random" is a properly-seeded stand-in for the random module.
@@ -99,7 +99,8 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    the random seed, and the files on the python path.  It can be a `ResultCache`, to
+    cache results in more than one tier.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -108,12 +109,11 @@ def safe_exec(
 
     """
     # Check the cache for a previous result.
+    if cache and not isinstance(cache, ResultCache):
+        cache = ResultCache(cache)
     if cache:
         safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = cache_key(code, safe_globals, random_seed, python_path, extra_files)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -132,13 +132,20 @@ def safe_exec(
         exec_fn = codejail_not_safe_exec
     else:
         exec_fn = codejail_safe_exec
+    pool = None if unsafely else sandbox_pool.get_pool()
 
     # Run the code!  Results are side effects in globals_dict.
     try:
-        exec_fn(
+        # A warm sandbox from the pool, if there is one, else a new one.
+        pooled = pool is not None and pool.safe_exec(
             code_prolog + LAZY_IMPORTS + code, globals_dict,
             python_path=python_path, extra_files=extra_files, slug=slug,
         )
+        if not pooled:
+            exec_fn(
+                code_prolog + LAZY_IMPORTS + code, globals_dict,
+                python_path=python_path, extra_files=extra_files, slug=slug,
+            )
     except SafeExecException as e:
         emsg = e.message
     else:
@@ -0,0 +1,348 @@
+"""
+A pool of warm sandboxes for capa's safe_exec.
+
+Running code through codejail starts a new sandboxed Python for every
+execution, which then imports numpy, scipy and the rest of the modules that
+capa code assumes. That start-up usually costs much more than running the
+code itself.
+
+A warm sandbox is a sandboxed Python, started the way codejail starts one,
+that imports those modules ahead of time and then executes a single request
+with codejail's limits applied (see sandbox_worker.py). The pool starts a
+replacement as soon as a sandbox has been used, so the next execution finds
+one already warm. Since no sandbox ever runs the code of two executions, they
+are as isolated from each other as they are under codejail: the code can't
+find earlier code, globals or results in its memory, nor reach a long-lived
+process of the sandbox user. A sandbox that doesn't respond within the
+REALTIME limit is killed, as codejail does.
+
+The pool is used when codejail is configured for Python and `configure` has
+been called with a size greater than zero. When no sandbox is available, or
+one fails, the code is run through codejail as usual.
+
+"""
+
+import atexit
+import errno
+import json
+import logging
+import os
+import os.path
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+from dogapi import dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# We'll need the code from sandbox_worker.py to start a sandbox, so read it now.
+sandbox_worker_py_file = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+WORKER_CODE = open(sandbox_worker_py_file).read()
+
+POOL_SETTINGS = {
+    # How many warm sandboxes to keep in each process. 0 disables the pool.
+    "size": 0,
+}
+
+
+# How many seconds to wait for a sandbox to finish warming up.
+STARTUP_TIMEOUT = 60
+
+
+class SandboxError(Exception):
+    """
+    A warm sandbox stopped working.
+    """
+    pass
+
+
+def _make_home():
+    """
+    Make a directory that the sandbox can read, as codejail does.
+    """
+    home = tempfile.mkdtemp(prefix="codejail-")
+    os.chmod(home, 0775)
+    return home
+
+
+class Sandbox(object):
+    """
+    A warm sandboxed Python process, for one execution.
+    """
+    def __init__(self, cmdline=None):
+        if cmdline is None:
+            cmdline = jail_code.COMMANDS["python"]["cmdline_start"]
+        self.home = _make_home()
+        with open(os.path.join(self.home, "jailed_code"), "w") as jailed_code:
+            jailed_code.write(WORKER_CODE)
+        with open(os.devnull, "w") as devnull:
+            self.process = subprocess.Popen(
+                cmdline + ["jailed_code"],
+                cwd=self.home, env={}, close_fds=True,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+            )
+
+    def execute(self, code, globals_dict, home, python_path, limits):
+        """
+        Execute `code` in the sandbox; return the response of sandbox_worker.py.
+
+        Raises SandboxError if the sandbox didn't start, in which case the code
+        wasn't executed.
+        """
+        request = {
+            "code": code,
+            "globals": globals_dict,
+            "home": home,
+            "python_path": python_path,
+            "limits": limits,
+        }
+        try:
+            if self._read_line(time.time() + STARTUP_TIMEOUT) != "ready\n":
+                raise SandboxError("The sandbox didn't start")
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except (IOError, OSError) as err:
+            raise SandboxError(err)
+
+        # From here on, failures are the code's, and reported as codejail would.
+        realtime = limits.get("REALTIME")
+        deadline = time.time() + realtime if realtime else None
+        try:
+            response = json.loads(self._read_line(deadline))
+        except (IOError, OSError, SandboxError, ValueError):
+            response = None
+        if isinstance(response, dict):
+            return response
+        if self.process.poll() is None:
+            self.process.kill()
+        status = self.process.wait()
+        if deadline is not None and time.time() >= deadline:
+            return {"error": "Timed out after {} seconds".format(realtime)}
+        elif status < 0:
+            return {"error": "Killed by signal {}".format(-status)}
+        return {"error": "Exited without a result"}
+
+    def _read_line(self, deadline):
+        """
+        Read a line from the sandbox, waiting until the `deadline` (None for none).
+
+        Raises SandboxError if the sandbox exits, or the deadline passes, first.
+        """
+        fd = self.process.stdout.fileno()
+        chunks = []
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    raise SandboxError("The sandbox didn't respond in time")
+            try:
+                readable, _, _ = select.select([fd], [], [], timeout)
+            except select.error as err:
+                if err.args[0] == errno.EINTR:
+                    continue
+                raise SandboxError(err)
+            if not readable:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise SandboxError("The sandbox exited with status {}".format(self.process.poll()))
+            chunks.append(chunk)
+            if chunk.endswith("\n"):
+                return "".join(chunks)
+
+    def close(self):
+        """
+        Stop the sandbox, and remove its files.
+        """
+        try:
+            self.process.stdin.close()
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+        except (IOError, OSError):
+            pass
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def detach(self):
+        """
+        Close this process's ends of the pipes of a sandbox started by its parent, leaving the sandbox running.
+        """
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except (IOError, OSError):
+                pass
+
+
+class SandboxPool(object):
+    """
+    Warm sandboxes for the executions of one process.
+    """
+    def __init__(self, size, cmdline=None):
+        self.size = size
+        self.cmdline = cmdline
+        self.idle = []
+        self.count = 0
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def checkout(self):
+        """
+        Return an idle sandbox, starting one if the pool isn't full; or None if there isn't any.
+        """
+        with self.lock:
+            self._forget_parent_sandboxes()
+            if self.idle:
+                return self.idle.pop()
+            if self.count >= self.size:
+                return None
+            self.count += 1
+        try:
+            return Sandbox(self.cmdline)
+        except (IOError, OSError):
+            log.exception("Couldn't start a sandbox")
+            with self.lock:
+                self.count -= 1
+            return None
+
+    def _forget_parent_sandboxes(self):
+        """
+        If this is a forked copy of the pool, drop the sandboxes, which belong to the parent.
+
+        Must be called with the lock held.
+        """
+        if os.getpid() != self.pid:
+            for sandbox in self.idle:
+                sandbox.detach()
+            self.idle, self.count, self.pid = [], 0, os.getpid()
+
+    def checkin(self, sandbox):
+        """
+        Stop a sandbox that was checked out, and start its replacement.
+        """
+        sandbox.close()
+        try:
+            replacement = Sandbox(self.cmdline)
+        except (IOError, OSError):
+            log.exception("Couldn't start a sandbox")
+            with self.lock:
+                self.count -= 1
+            return
+        with self.lock:
+            self.idle.append(replacement)
+
+    def warm(self):
+        """
+        Start all of the pool's sandboxes.
+        """
+        sandboxes = [self.checkout() for _ in xrange(self.size)]
+        with self.lock:
+            self.idle.extend(sandbox for sandbox in sandboxes if sandbox is not None)
+
+    def close(self):
+        """
+        Stop the idle sandboxes.
+        """
+        with self.lock:
+            self._forget_parent_sandboxes()
+            sandboxes, self.idle = self.idle, []
+            self.count -= len(sandboxes)
+        for sandbox in sandboxes:
+            sandbox.close()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute code like codejail's safe_exec, in a warm sandbox.
+
+        Returns False, without executing the code, if no sandbox could run it.
+        """
+        sandbox = self.checkout()
+        if sandbox is None:
+            dog_stats_api.increment("capa.safe_exec.pool.unavailable")
+            return False
+
+        home, path_names = _prepare_files(python_path or (), extra_files or ())
+        try:
+            response = sandbox.execute(code, json_safe(globals_dict), home, path_names, dict(jail_code.LIMITS))
+        except SandboxError:
+            log.warning("Sandbox failed to start for %s", slug, exc_info=True)
+            dog_stats_api.increment("capa.safe_exec.pool.failed")
+            return False
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+            self.checkin(sandbox)
+
+        if "error" in response:
+            raise SafeExecException("Couldn't execute jailed code: %s" % response["error"])
+        globals_dict.update(response["globals"])
+        return True
+
+
+def _prepare_files(python_path, extra_files):
+    """
+    Make the directory for one execution, with its files, as codejail does.
+
+    Returns the directory, and the names of its entries to add to the Python path.
+    """
+    home = _make_home()
+    extra_names = set(name for name, _ in extra_files)
+    for name, contents in extra_files:
+        with open(os.path.join(home, name), "wb") as extra_file:
+            extra_file.write(contents)
+    path_names = []
+    for pydir in python_path:
+        pybase = os.path.basename(pydir)
+        path_names.append(pybase)
+        if pybase in extra_names:
+            continue
+        if os.path.isdir(pydir):
+            shutil.copytree(pydir, os.path.join(home, pybase))
+        else:
+            shutil.copy(pydir, home)
+    return home, path_names
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure(size):
+    """
+    Set the size of the pool.
+    """
+    global _POOL  # pylint: disable=global-statement
+    POOL_SETTINGS["size"] = size
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+        _POOL = None
+
+
+def get_pool():
+    """
+    Return the pool of this process, or None if the pool isn't used.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if not POOL_SETTINGS["size"] or not jail_code.is_configured("python"):
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = SandboxPool(**POOL_SETTINGS)
+            atexit.register(_POOL.close)
+        return _POOL
+
+
+def warm():
+    """
+    Start the sandboxes of the pool, if it is used, so that the first executions don't wait for them.
+    """
+    pool = get_pool()
+    if pool is not None:
+        pool.warm()
@@ -0,0 +1,147 @@
+"""
+The program run by a warm sandbox of the sandbox pool.
+
+This file isn't imported: its source is copied into the sandbox and run by
+the sandboxed Python (see sandbox_pool.py). It imports the modules that capa
+code assumes, writes a line to stdout to say that it is ready, then reads one
+request from stdin as a JSON object on a line, executes it with the limits
+applied, writes one JSON response line to stdout, and exits.
+
+A sandbox executes exactly one request, so the code never runs in a process
+that has held the code, globals or results of another execution, and has no
+process of its own uid to signal or trace: its parent is the process that
+started the sandbox, as with codejail.
+
+A request has the keys:
+
+    code: the code to execute.
+    globals: the globals dictionary to execute it with.
+    home: the directory to execute it in, holding its files.
+    python_path: the names of the files and directories in `home` to add to
+        the Python path.
+    limits: the resource limits to apply, as codejail's LIMITS.
+
+A response has the keys:
+
+    globals: the JSON-able globals after execution, if it succeeded.
+    error: a description of the error, if it failed.
+
+"""
+
+import json
+import os
+import resource
+import sys
+import traceback
+
+# The modules that capa code can use without importing them; see ASSUMED_IMPORTS in safe_exec.py.
+WARM_MODULES = [
+    "numpy", "math", "scipy", "calc", "eia",
+    "chem.chemcalc", "chem.chemtools", "chem.miller", "verifiers.draganddrop",
+]
+
+
+class DevNull(object):
+    """
+    Swallow what the executed code prints.
+    """
+    def write(self, *args, **kwargs):
+        pass
+
+    def flush(self):
+        pass
+
+
+def jsonable(value):
+    """
+    Return True if `value` can be sent back as JSON.
+    """
+    ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+    if not isinstance(value, ok_types):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def vm_size():
+    """
+    Return the virtual memory size of this process in bytes, or 0 if it can't be read.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (IOError, OSError, ValueError, IndexError):
+        return 0
+
+
+def set_limits(limits):
+    """
+    Apply codejail's resource limits to this process.
+
+    The memory limit is counted from the size of the warmed-up worker, so that the
+    preloaded modules don't use up the code's allowance.
+    """
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    cpu = limits.get("CPU")
+    if cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    vmem = limits.get("VMEM")
+    if vmem:
+        vmem += vm_size()
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+    fsize = limits.get("FSIZE", 0)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+
+
+def execute(request):
+    """
+    Execute a request in this process, and return its response.
+    """
+    os.chdir(request["home"])
+    set_limits(request["limits"])
+    for name in request["python_path"]:
+        sys.path.append(name)
+    sys.stdout = DevNull()
+
+    globals_dict = request["globals"]
+    exec request["code"] in globals_dict  # pylint: disable=exec-used
+    return {
+        "globals": dict(
+            (key, value) for key, value in globals_dict.iteritems()
+            if key != "__builtins__" and jsonable(value)
+        ),
+    }
+
+
+def main():
+    """
+    Warm up, then execute one request.
+    """
+    for modname in WARM_MODULES:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            # The code will get the error if it uses the module.
+            pass
+
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdout = DevNull()
+    stdout.write("ready\n")
+    stdout.flush()
+    line = stdin.readline()
+    if not line:
+        return
+    try:
+        response = execute(json.loads(line))
+    except BaseException:  # pylint: disable=broad-except
+        response = {"error": traceback.format_exc()}
+    stdout.write(json.dumps(response) + "\n")
+    stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Test result_cache.py"""
+
+import unittest
+
+from capa.safe_exec import safe_exec
+from capa.safe_exec.result_cache import LocalResultCache, ResultCache, cache_key
+from capa.safe_exec.tests.test_safe_exec import DictCache
+
+
+class TestCacheKey(unittest.TestCase):
+    """Test that cache keys depend on exactly what determines a result."""
+
+    def equal_but_different_dicts(self):
+        """Make two equal dicts with different key order."""
+        d1 = {k: 1 for k in u"abcdefghijklmnopqrstuvwxyz"}
+        d2 = dict(d1)
+        for i in xrange(10000):
+            d2[i] = 1
+        for i in xrange(10000):
+            del d2[i]
+        self.assertEqual(d1, d2)
+        self.assertNotEqual(d1.keys(), d2.keys())
+        return d1, d2
+
+    def test_dict_ordering(self):
+        d1, d2 = self.equal_but_different_dicts()
+        self.assertEqual(
+            cache_key("a = 1", {u'x': [1, [d1]], u'y': d1}, 1),
+            cache_key("a = 1", {u'y': d2, u'x': [1, [d2]]}, 1),
+        )
+
+    def test_differences(self):
+        key = cache_key("a = 1", {u'x': [1, 2]}, 1)
+        self.assertNotEqual(key, cache_key("a = 2", {u'x': [1, 2]}, 1))
+        self.assertNotEqual(key, cache_key("a = 1", {u'x': [2, 1]}, 1))
+        self.assertNotEqual(key, cache_key("a = 1", {u'x': [1, 2]}, 2))
+        self.assertNotEqual(key, cache_key("a = 1", {u'x': [1, 2]}, 1, python_path=["lib"]))
+        # A dict and the list of its items don't collide.
+        self.assertNotEqual(
+            cache_key("a = 1", {u'x': {u'k': 1}}, 1),
+            cache_key("a = 1", {u'x': [[u'k', 1]]}, 1),
+        )
+
+    def test_extra_files(self):
+        key = cache_key("a = 1", {}, 1, python_path=["python_lib.zip"], extra_files=[("python_lib.zip", "v1")])
+        self.assertNotEqual(
+            key,
+            cache_key("a = 1", {}, 1, python_path=["python_lib.zip"], extra_files=[("python_lib.zip", "v2")]),
+        )
+        self.assertLessEqual(len(key), 250)
+
+
+class TestLocalResultCache(unittest.TestCase):
+    """Test the in-process tier."""
+
+    def test_copies(self):
+        cache = LocalResultCache()
+        cache.set('k', (None, {u'a': [1]}))
+        value = cache.get('k')
+        self.assertEqual(value, (None, {u'a': [1]}))
+        value[1][u'a'].append(2)
+        self.assertEqual(cache.get('k'), (None, {u'a': [1]}))
+
+    def test_eviction_by_size(self):
+        cache = LocalResultCache(max_bytes=60)
+        cache.set('a', (None, {u'x': u'1' * 10}))
+        cache.set('b', (None, {u'x': u'2' * 10}))
+        cache.get('a')
+        cache.set('c', (None, {u'x': u'3' * 10}))
+        # 'b' was the least recently used.
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.size, 60)
+
+        # Too big to be cached at all.
+        cache.set('d', (None, {u'x': u'4' * 100}))
+        self.assertIsNone(cache.get('d'))
+
+
+class TestResultCache(unittest.TestCase):
+    """Test the tiers of the result cache."""
+
+    def test_tiers(self):
+        shared = {}
+        cache = ResultCache(DictCache(shared), local=LocalResultCache())
+
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(len(shared), 1)
+        self.assertEqual(len(cache.local.entries), 1)
+
+        # The local tier answers first.
+        shared[shared.keys()[0]] = (None, {'a': 17})
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(g['a'], 3)
+
+        # The shared tier fills the local tier.
+        cache.local.clear()
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(g['a'], 17)
+        self.assertEqual(cache.local.get(shared.keys()[0]), (None, {u'a': 17}))
+
+    def test_oversized(self):
+        shared = {}
+        cache = ResultCache(DictCache(shared), local=LocalResultCache(), max_entry_bytes=100)
+        g = {}
+        safe_exec("a = 'x' * 1000", g, cache=cache)
+        self.assertEqual(len(g['a']), 1000)
+        self.assertEqual(shared, {})
+        self.assertEqual(cache.local.entries, {})
@@ -0,0 +1,120 @@
+"""Test sandbox_pool.py"""
+
+import os
+import os.path
+import sys
+import unittest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec.safe_exec import CODE_PROLOG, LAZY_IMPORTS
+from capa.safe_exec.sandbox_pool import SandboxPool
+
+
+# The sandboxes of these tests run the current Python, without a jail.
+PYTHON_CMDLINE = [sys.executable, "-E", "-B"]
+
+
+class TestSandboxPool(unittest.TestCase):
+    """Test executing code in warm sandboxes."""
+
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool(1, cmdline=PYTHON_CMDLINE)
+        self.addCleanup(self.pool.close)
+
+    def pool_exec(self, code, globals_dict, random_seed=None, **kwargs):
+        """Execute `code` as capa's safe_exec would, in the pool."""
+        self.assertTrue(self.pool.safe_exec(CODE_PROLOG % random_seed + LAZY_IMPORTS + code, globals_dict, **kwargs))
+
+    def test_set_values(self):
+        g = {'b': 5}
+        self.pool_exec("a = 17 + b\nc = 1/2\nd = int(math.pi)", g)
+        self.assertEqual(g, {'a': 22, 'b': 5, 'c': 0.5, 'd': 3})
+
+    def test_random_seeding(self):
+        g1, g2 = {}, {}
+        self.pool_exec("r = random.randint(0, 999)", g1, random_seed=17)
+        self.pool_exec("r = random.randint(0, 999)", g2, random_seed=17)
+        self.assertEqual(g1['r'], g2['r'])
+
+    def test_isolation(self):
+        # Changes made by one execution aren't seen by the next one.
+        self.pool_exec("import json\njson.marker = 1", {})
+        g = {}
+        self.pool_exec("import json\nmarked = hasattr(json, 'marker')", g)
+        self.assertFalse(g['marked'])
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+        # The sandbox still works after an error.
+        g = {}
+        self.pool_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_python_lib(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+    def test_single_use(self):
+        g1, g2 = {}, {}
+        self.pool_exec("import os\npid, ppid = os.getpid(), os.getppid()", g1)
+        self.pool_exec("import os\npid, ppid = os.getpid(), os.getppid()", g2)
+        # Each execution had a process of its own, whose parent is this one
+        # rather than a long-lived sandbox process.
+        self.assertNotEqual(g1['pid'], g2['pid'])
+        self.assertEqual(g1['ppid'], os.getpid())
+        self.assertEqual(g2['ppid'], os.getpid())
+        # A replacement was started for the next execution.
+        self.assertEqual(len(self.pool.idle), 1)
+        self.assertEqual(self.pool.count, 1)
+
+    def test_timeout(self):
+        with patch.dict(jail_code.LIMITS, {"REALTIME": 0.5}):
+            with self.assertRaises(SafeExecException) as cm:
+                self.pool_exec("import time\ntime.sleep(5)", {})
+        self.assertIn("Timed out", cm.exception.message)
+
+    def test_pool_full(self):
+        sandbox = self.pool.checkout()
+        self.assertFalse(self.pool.safe_exec("a = 1", {}))
+        self.pool.checkin(sandbox)
+        self.assertTrue(self.pool.safe_exec("a = 1", {}))
+
+    def test_dead_sandbox(self):
+        self.pool_exec("a = 1", {})
+        self.pool.idle[0].process.kill()
+        self.pool.idle[0].process.wait()
+        # The caller runs the code some other way, and the sandbox is replaced.
+        self.assertFalse(self.pool.safe_exec("a = 1", {}))
+        self.assertEqual(self.pool.count, 1)
+        self.pool_exec("a = 1", {})
+
+    def test_unresponsive_sandbox(self):
+        pool = SandboxPool(1, cmdline=[sys.executable, "-c", "import time; time.sleep(60)"])
+        self.addCleanup(pool.close)
+        with patch("capa.safe_exec.sandbox_pool.STARTUP_TIMEOUT", 0.1):
+            # The caller runs the code some other way.
+            self.assertFalse(pool.safe_exec("a = 1", {}))
+
+    def test_forked_pool(self):
+        self.pool_exec("a = 1", {})
+        sandbox = self.pool.idle[0]
+        # Pretend this process was forked from the one that started the sandbox.
+        self.pool.pid = -1
+        new_sandbox = self.pool.checkout()
+        self.addCleanup(sandbox.close)
+        self.addCleanup(self.pool.checkin, new_sandbox)
+
+        self.assertIsNot(new_sandbox, sandbox)
+        self.assertTrue(sandbox.process.stdin.closed)
+        self.assertTrue(sandbox.process.stdout.closed)
+        # The sandbox is left running for the process that started it.
+        self.assertIsNone(sandbox.process.poll())
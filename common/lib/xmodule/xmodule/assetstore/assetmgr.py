@@ -58,3 +58,25 @@ class AssetManager(object):
         compressed course structure from the structure cache.
         """
         return contentstore().find(asset_key, throw_on_not_found, as_stream)
+
+    @staticmethod
+    @contract(asset_keys='list(AssetKey)')
+    def find_many(asset_keys):
+        """
+        Finds the metadata of many course assets at once, in the deprecated contentstore.
+
+        Returns a dict from each asset key to the asset's data dictionary; the assets that don't
+        exist are left out.
+        """
+        return contentstore().find_many(asset_keys)
+
+    @staticmethod
+    @contract(page_size='int,>0', cursor='str|unicode|None')
+    def get_content_page(course_key, page_size, cursor=None, **kwargs):
+        """
+        Lists a page of the assets of a course, in the deprecated contentstore.
+
+        Returns the assets' data dictionaries, and the cursor to pass to get the next page (None
+        if there are no more assets). See ContentStore.get_content_page for the other arguments.
+        """
+        return contentstore().get_content_page(course_key, page_size, cursor=cursor, **kwargs)
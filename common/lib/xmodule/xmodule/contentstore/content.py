@@ -21,7 +21,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -33,6 +33,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # the MD5 of the data, as stored by the contentstore; None if it isn't known
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -157,6 +159,12 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        yield self._data[first_byte:last_byte + 1]
+
     @staticmethod
     def serialize_asset_key_with_slash(asset_key):
         """
@@ -171,10 +179,10 @@ class StaticContent(object):
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
     def stream_data(self):
@@ -199,6 +207,13 @@ class StaticContentStream(StaticContent):
             position += STREAM_DATA_CHUNK_SIZE
             yield chunk
 
+    def read_chunk(self, offset, size):
+        """
+        Return `size` bytes of the data, starting at `offset` (fewer at the end of the data).
+        """
+        self._stream.seek(offset)
+        return self._stream.read(size)
+
     def close(self):
         self._stream.close()
 
@@ -206,9 +221,19 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
+    def copy_metadata(self):
+        """
+        Return a StaticContent with the attributes of this content, but without its data (None), for caching.
+        """
+        return StaticContent(self.location, self.name, self.content_type, None,
+                             last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
+                             import_path=self.import_path, length=self.length, locked=self.locked,
+                             content_digest=self.content_digest)
+
 
 class ContentStore(object):
     '''
@@ -235,6 +260,27 @@ class ContentStore(object):
         '''
         raise NotImplementedError
 
+    def get_content_page(self, course_key, page_size, cursor=None, sort_field='uploadDate', ascending=False,
+                         content_types=None, exclude_content_types=False, get_thumbnails=False):
+        """
+        Returns a page of the static assets of a course, and the cursor of the next page (None if it's the last).
+        The assets have the same format as those of get_all_content_for_course.
+        """
+        raise NotImplementedError
+
+    def find_many(self, asset_keys):
+        """
+        Returns the data dictionaries of the assets with the given keys, as a dict from asset key to data
+        dictionary. The data dictionaries have the same format as those of get_all_content_for_course.
+        """
+        raise NotImplementedError
+
+    def export_all_for_course_to_fs(self, course_key, output_fs, workers=1):
+        """
+        Export all of the assets of a course to the filesystem output_fs, and return their policy.
+        """
+        raise NotImplementedError
+
     def delete_all_course_assets(self, course_key):
         """
         Delete all of the assets which use this course_key as an identifier
@@ -248,6 +294,12 @@ class ContentStore(object):
         """
         raise NotImplementedError
 
+    def trim_variants(self, max_bytes):
+        """
+        Delete the least recently used image variants until they take at most max_bytes
+        """
+        raise NotImplementedError
+
     def generate_thumbnail(self, content, tempfile_path=None):
         thumbnail_content = None
         # use a naming convention to associate originals with the thumbnail
@@ -3,6 +3,11 @@ from importlib import import_module
 
 from django.conf import settings
 
+try:
+    from cache_toolbox.core import del_cached_content
+except ImportError:
+    del_cached_content = None
+
 _CONTENTSTORE = {}
 
 
@@ -25,6 +30,9 @@ def contentstore(name='default'):
         if 'ADDITIONAL_OPTIONS' in settings.CONTENTSTORE:
             if name in settings.CONTENTSTORE['ADDITIONAL_OPTIONS']:
                 options.update(settings.CONTENTSTORE['ADDITIONAL_OPTIONS'][name])
+        if del_cached_content is not None:
+            # Saving or deleting an asset drops its cached copies (see contentserver).
+            options.setdefault('invalidate_cached_content', del_cached_content)
         _CONTENTSTORE[name] = class_(**options)
 
     return _CONTENTSTORE[name]
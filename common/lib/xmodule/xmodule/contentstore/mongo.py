@@ -9,22 +9,36 @@ import logging
 from .content import StaticContent, ContentStore, StaticContentStream
 from xmodule.exceptions import NotFoundError
 from fs.osfs import OSFS
+from fs.path import pathjoin
+import base64
+import datetime
+from multiprocessing.pool import ThreadPool
 import os
 import json
+import re
 from bson.son import SON
+from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import AssetKey
+from opaque_keys.edx.locations import AssetLocation
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
 from xmodule.util.misc import escape_invalid_characters
+from tempfile import SpooledTemporaryFile
+
+# Exported assets bigger than this are spooled to disk while they are written out.
+EXPORT_SPOOL_BYTES = 1024 * 1024
 
 
 class MongoContentStore(ContentStore):
 
     # pylint: disable=unused-argument
-    def __init__(self, host, db, port=27017, user=None, password=None, bucket='fs', collection=None, **kwargs):
+    def __init__(self, host, db, port=27017, user=None, password=None, bucket='fs', collection=None,
+                 invalidate_cached_content=None, **kwargs):
         """
         Establish the connection with the mongo backend and connect to the collections
 
         :param collection: ignores but provided for consistency w/ other doc_store_config patterns
+        :param invalidate_cached_content: a function called with the AssetKey of each asset that is saved,
+            deleted or has its attributes changed, so that cached copies of it can be dropped
         """
         logging.debug('Using MongoDB for static content serving at host={0} port={1} db={2}'.format(host, port, db))
 
@@ -47,6 +61,7 @@ class MongoContentStore(ContentStore):
         self.fs = gridfs.GridFS(_db, bucket)
 
         self.fs_files = _db[bucket + ".files"]  # the underlying collection GridFS uses
+        self.invalidate_cached_content = invalidate_cached_content
 
     def close_connections(self):
         """
@@ -68,7 +83,7 @@ class MongoContentStore(ContentStore):
         # The way to version files in gridFS is to not use the file id as the _id but just as the filename.
         # Then you can upload as many versions as you like and access by date or version. Because we use
         # the location as the _id, we must delete before adding (there's no replace method in gridFS)
-        self.delete(content_id)  # delete is a noop if the entry doesn't exist; so, don't waste time checking
+        self.fs.delete(content_id)  # delete is a noop if the entry doesn't exist; so, don't waste time checking
 
         thumbnail_location = content.thumbnail_location.to_deprecated_list_repr() if content.thumbnail_location else None
         with self.fs.new_file(_id=content_id, filename=unicode(content.location), content_type=content.content_type,
@@ -83,13 +98,40 @@ class MongoContentStore(ContentStore):
             else:
                 fp.write(content.data)
 
+        self._invalidate(content.location)
         return content
 
     def delete(self, location_or_id):
         if isinstance(location_or_id, AssetKey):
+            location = location_or_id
             location_or_id, _ = self.asset_db_key(location_or_id)
+        else:
+            location = self._asset_key_from_id(location_or_id)
         # Deletes of non-existent files are considered successful
         self.fs.delete(location_or_id)
+        self._invalidate(location)
+
+    def _invalidate(self, location):
+        """
+        Drop the cached copies of the asset at `location` (None if it isn't known).
+        """
+        if self.invalidate_cached_content is not None and location is not None:
+            self.invalidate_cached_content(location)
+
+    @staticmethod
+    def _asset_key_from_id(content_id):
+        """
+        Return the AssetKey of the asset with the database _id `content_id`, or None if it can't be made.
+        """
+        try:
+            if isinstance(content_id, basestring):
+                return AssetKey.from_string(content_id)
+            return AssetLocation(
+                content_id['org'], content_id['course'], content_id.get('run'),
+                content_id['category'], content_id['name'], content_id.get('revision'),
+            )
+        except (InvalidKeyError, KeyError):
+            return None
 
     def find(self, location, throw_on_not_found=True, as_stream=False):
         content_id, __ = self.asset_db_key(location)
@@ -107,7 +149,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=thumbnail_location,
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -121,7 +164,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=thumbnail_location,
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -158,25 +202,70 @@ class MongoContentStore(ContentStore):
             assets_policy_file: the filename for the policy file which should be in the same
                 directory as the other policy files.
         """
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+        policy = self.export_all_for_course_to_fs(course_key, OSFS(output_directory))
+
+        with open(assets_policy_file, 'w') as f:
+            json.dump(policy, f, sort_keys=True, indent=4)
+
+    def export_all_for_course_to_fs(self, course_key, output_fs, workers=1):
+        """
+        Export all of this course's assets to the filesystem output_fs, and return their policy:
+        the dict of the attributes of each asset, keyed by asset name.
+
+        `workers` threads fetch the assets at once. Assets are streamed from GridFS into temporary
+        files, spooled to disk past EXPORT_SPOOL_BYTES, so at most `workers` assets are held at a time.
+        """
         policy = {}
         assets, __ = self.get_all_content_for_course(course_key)
+        workers = max(workers, 1)
+        pool = ThreadPool(workers) if workers > 1 and len(assets) > 1 else None
+
+        try:
+            for start in xrange(0, len(assets), workers):
+                batch = [asset['asset_key'] for asset in assets[start:start + workers]]
+                if pool is not None:
+                    fetched = pool.map(self._fetch_for_export, batch)
+                else:
+                    fetched = [self._fetch_for_export(asset_key) for asset_key in batch]
+                for content, data_file in fetched:
+                    with data_file:
+                        self._write_export(content, data_file, output_fs)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
         for asset in assets:
-            # TODO: On 6/19/14, I had to put a try/except around this
-            # to export a course. The course failed on JSON files in
-            # the /static/ directory placed in it with an import.
-            #
-            # If this hasn't been looked at in a while, remove this comment.
-            #
-            # When debugging course exports, this might be a good place
-            # to look. -- pmitros
-            self.export(asset['asset_key'], output_directory)
             for attr, value in asset.iteritems():
                 if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
                     policy.setdefault(asset['asset_key'].name, {})[attr] = value
+        return policy
 
-        with open(assets_policy_file, 'w') as f:
-            json.dump(policy, f, sort_keys=True, indent=4)
+    def _fetch_for_export(self, location):
+        """
+        Return the asset at location, and a temporary file holding its data.
+        """
+        content = self.find(location, as_stream=True)
+        data_file = SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+        for chunk in content.stream_data():
+            data_file.write(chunk)
+        data_file.seek(0)
+        return content, data_file
+
+    @staticmethod
+    def _write_export(content, data_file, output_fs):
+        """
+        Write the data of content, read from data_file, to output_fs, in the directory of its import path.
+        """
+        export_dir = os.path.dirname(content.import_path) if content.import_path is not None else ''
+        if export_dir:
+            output_fs.makedir(export_dir, recursive=True, allow_recreate=True)
+
+        # Escape invalid char from filename.
+        export_name = escape_invalid_characters(name=content.name, invalid_char_list=['/', '\\'])
+        output_fs.setcontents(pathjoin(export_dir, export_name), data_file)
 
     def get_all_content_thumbnails_for_course(self, course_key):
         return self._get_all_content_for_course(course_key, get_thumbnails=True)[0]
@@ -202,6 +291,7 @@ class MongoContentStore(ContentStore):
             assets_to_delete = assets_to_delete + items.count()
             for asset in items:
                 self.fs.delete(asset[prefix])
+                self._invalidate(self._asset_key_from_id(asset[prefix]))
 
             self.fs_files.remove(query)
         return assets_to_delete
@@ -244,6 +334,75 @@ class MongoContentStore(ContentStore):
             asset['asset_key'] = course_key.make_asset_key(asset_id['category'], asset_id['name'])
         return assets, count
 
+    def get_content_page(self, course_key, page_size, cursor=None, sort_field='uploadDate', ascending=False,
+                         content_types=None, exclude_content_types=False, get_thumbnails=False):
+        """
+        Returns a page of the static assets of a course, and the cursor of the next page (None if it's the last).
+
+        Unlike get_all_content_for_course, pages are found from the position of the previous page's last
+        asset (keyset pagination) rather than by skipping the assets before them, so every page is as cheap
+        to get as the first one, however many assets the course has.
+
+        Args:
+            course_key (CourseKey): the course of the assets
+            page_size (int): the maximum number of assets to return
+            cursor (str): the cursor returned with the previous page, or None for the first page
+            sort_field (str): the asset field to sort by ('uploadDate' or 'displayname')
+            ascending (bool): the direction of the sort
+            content_types (list): if given, only assets with one of these content types (case-insensitive)
+                are returned; or, if exclude_content_types, only the other assets
+            get_thumbnails (bool): whether to return the thumbnails rather than the assets
+
+        The assets have the same format as those of get_all_content_for_course.
+        Raises ValueError if the cursor is invalid.
+        """
+        query = query_for_course(course_key, "asset" if not get_thumbnails else "thumbnail")
+        if content_types is not None:
+            query.update(content_type_filter(content_types, exclude=exclude_content_types))
+        direction = pymongo.ASCENDING if ascending else pymongo.DESCENDING
+        if cursor is not None:
+            after_value, after_id = decode_cursor(cursor)
+            comparison = '$gt' if ascending else '$lt'
+            query['$or'] = [
+                {sort_field: {comparison: after_value}},
+                {sort_field: after_value, '_id': {comparison: after_id}},
+            ]
+
+        items = self.fs_files.find(query, sort=[(sort_field, direction), ('_id', direction)], limit=page_size + 1)
+        assets = list(items)
+        next_cursor = None
+        if len(assets) > page_size:
+            assets = assets[:page_size]
+            next_cursor = encode_cursor(assets[-1].get(sort_field), self.make_id_son(dict(assets[-1])))
+
+        for asset in assets:
+            asset_id = asset.get('content_son', asset['_id'])
+            asset['asset_key'] = course_key.make_asset_key(asset_id['category'], asset_id['name'])
+        return assets, next_cursor
+
+    def find_many(self, asset_keys):
+        """
+        Returns the data dictionaries of the assets with the given keys, in one query, as a dict from
+        each asset key to its data dictionary. The assets that don't exist are left out.
+
+        The data dictionaries have the same format as those of get_all_content_for_course.
+        """
+        keys_by_id = {}
+        for asset_key in asset_keys:
+            content_id, __ = self.asset_db_key(asset_key)
+            keys_by_id[_hashable_id(content_id)] = asset_key
+        if not keys_by_id:
+            return {}
+
+        content_ids = [self.asset_db_key(asset_key)[0] for asset_key in keys_by_id.itervalues()]
+        assets = {}
+        for asset in self.fs_files.find({'_id': {'$in': content_ids}}):
+            asset_key = keys_by_id.get(_hashable_id(self.make_id_son(dict(asset))))
+            if asset_key is not None:
+                asset['asset_key'] = asset_key
+                assets[asset_key] = asset
+        return assets
+
     def set_attr(self, asset_key, attr, value=True):
         """
         Add/set the given attr on the asset at the given location. Does not allow overwriting gridFS built in
@@ -287,6 +446,7 @@ class MongoContentStore(ContentStore):
         result = self.fs_files.update({'_id': asset_db_key}, {"$set": attr_dict}, upsert=False)
         if not result.get('updatedExisting', True):
             raise NotFoundError(asset_db_key)
+        self._invalidate(location)
 
     def get_attrs(self, location):
         """
@@ -354,6 +514,7 @@ class MongoContentStore(ContentStore):
         for asset in matching_assets:
             asset_key = self.make_id_son(asset)
             self.fs.delete(asset_key)
+            self._invalidate(self._asset_key_from_id(asset_key))
 
     # codifying the original order which pymongo used for the dicts coming out of location_to_dict
     # stability of order is more important than sanity of order as any changes to order make things
@@ -468,6 +629,102 @@ class MongoContentStore(ContentStore):
             sparse=True,
             background=True
         )
+        # The asset manager sorts by displayname (the indexes above are on display_name, which assets don't have)
+        self.fs_files.create_index(
+            [
+                ('_id.org', pymongo.ASCENDING),
+                ('_id.course', pymongo.ASCENDING),
+                ('displayname', pymongo.ASCENDING)
+            ],
+            sparse=True,
+            background=True
+        )
+        self.fs_files.create_index(
+            [
+                ('content_son.org', pymongo.ASCENDING),
+                ('content_son.course', pymongo.ASCENDING),
+                ('displayname', pymongo.ASCENDING)
+            ],
+            sparse=True,
+            background=True
+        )
+        # Only image variants have last_accessed; needed by `trim_variants`
+        self.fs_files.create_index(
+            [
+                ('last_accessed', pymongo.ASCENDING)
+            ],
+            sparse=True,
+            background=True
+        )
+
+    def trim_variants(self, max_bytes):
+        """
+        Delete the least recently used image variants (the assets with a last_accessed attr)
+        until they take at most max_bytes.
+
+        Returns the number of variants deleted.
+        """
+        variants = self.fs_files.find(
+            {'last_accessed': {'$exists': True}}, {'length': True}
+        ).sort('last_accessed', pymongo.ASCENDING)
+        variants = list(variants)
+        total_bytes = sum(variant['length'] for variant in variants)
+        deleted = 0
+        for variant in variants:
+            if total_bytes <= max_bytes:
+                break
+            self.fs.delete(variant['_id'])
+            self._invalidate(self._asset_key_from_id(variant['_id']))
+            total_bytes -= variant['length']
+            deleted += 1
+        return deleted
+
+
+def content_type_filter(content_types, exclude=False):
+    """
+    Construct a query for the assets with one of the content_types (or with none of them, if exclude),
+    compared case-insensitively.
+    """
+    patterns = [re.compile(u'^{}$'.format(re.escape(content_type)), re.IGNORECASE) for content_type in content_types]
+    return {'contentType': {'$nin' if exclude else '$in': patterns}}
+
+
+def encode_cursor(value, content_id):
+    """
+    Encode the sort value and the _id of the last asset of a page into an opaque cursor string.
+    """
+    if isinstance(value, datetime.datetime):
+        delta = value - datetime.datetime(1970, 1, 1, tzinfo=value.tzinfo)
+        value = {'$date': (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000}
+    if not isinstance(content_id, basestring):
+        content_id = {'$son': content_id.items()}
+    return base64.urlsafe_b64encode(json.dumps([value, content_id]))
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor into the sort value and the _id it was made of.
+
+    Raises ValueError if the cursor is invalid.
+    """
+    try:
+        value, content_id = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        if isinstance(value, dict):
+            value = datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=value['$date'])
+        if isinstance(content_id, dict):
+            content_id = SON((field_name, field_value) for field_name, field_value in content_id['$son'])
+    except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+        raise ValueError("Invalid cursor: {!r}".format(cursor))
+    return value, content_id
+
+
+def _hashable_id(content_id):
+    """
+    Returns a hashable version of an asset _id (a string or a SON).
+    """
+    if isinstance(content_id, basestring):
+        return content_id
+    return tuple(content_id.items())
 
 
 def query_for_course(course_key, category=None):
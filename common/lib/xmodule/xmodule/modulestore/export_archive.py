@@ -0,0 +1,233 @@
+"""
+A write-only filesystem that writes course exports straight into a tar archive.
+
+Exports used to be written to a tree of files in a temporary directory, which
+was tarred afterwards, so that every exported course was on the disk twice.
+`TarExportFS` can be given to the export managers instead of an OSFS: each
+file written to it is added to the archive as soon as it is closed, and the
+archive is written to any file-like object, which doesn't need to be seekable.
+
+A file is spooled in memory (or in a temporary file, past `spool_bytes`)
+until it is closed, as a tar header needs the size of its file, so the peak
+memory and disk use of an export is that of its largest file.
+
+A file can be written more than once (as when two assets map to the same
+export path): each write adds a member to the archive, and since extracting an
+archive writes its members in order, the last write wins, as it would on a
+disk.
+"""
+
+import logging
+import tarfile
+import time
+from tempfile import SpooledTemporaryFile
+
+from fs.base import FS
+from fs.errors import (
+    DestinationExistsError, ParentDirectoryMissingError, ResourceInvalidError, ResourceNotFoundError,
+    UnsupportedError,
+)
+from fs.path import dirname, normpath, relpath
+
+log = logging.getLogger(__name__)
+
+# Files bigger than this are spooled to the disk until they are added to the archive.
+DEFAULT_SPOOL_BYTES = 1024 * 1024
+
+
+class TarExportFS(FS):
+    """
+    A filesystem whose files are added to a tar archive written to `fileobj`.
+
+    Files can only be written; a file written again replaces the earlier one
+    when the archive is extracted. `close` finishes the archive, but doesn't
+    close `fileobj`.
+    """
+    _meta = {
+        'thread_safe': True,
+        'virtual': False,
+        'read_only': False,
+        'unicode_paths': True,
+        'case_insensitive_paths': False,
+        'network': False,
+        'atomic.setcontents': False,
+    }
+
+    def __init__(self, fileobj, mode='w|gz', spool_bytes=DEFAULT_SPOOL_BYTES):
+        super(TarExportFS, self).__init__(thread_synchronize=True)
+        self.tar_file = tarfile.open(fileobj=fileobj, mode=mode)
+        self.spool_bytes = spool_bytes
+        self.dirs = set([u''])
+        self.file_sizes = {}
+
+    @staticmethod
+    def _normalize(path):
+        """
+        Return the path of `path` in the archive.
+        """
+        return relpath(normpath(path))
+
+    def _check_new_file(self, path):
+        """
+        Raise an error if a file can't be created at `path`.
+        """
+        if path in self.dirs:
+            raise ResourceInvalidError(path)
+        if dirname(path) not in self.dirs:
+            raise ParentDirectoryMissingError(path)
+
+    def _add_file(self, path, fileobj, size):
+        """
+        Add the `size` bytes read from `fileobj` to the archive, as the file at `path`.
+        """
+        member = tarfile.TarInfo(path.encode('utf-8'))
+        member.size = size
+        member.mtime = time.time()
+        member.mode = 0644
+        with self._lock:
+            self._check_new_file(path)
+            if path in self.file_sizes:
+                log.warning("%s was written to the export archive more than once; the last write wins", path)
+            self.tar_file.addfile(member, fileobj)
+            self.file_sizes[path] = size
+
+    def open(self, path, mode='r', **kwargs):  # pylint: disable=arguments-differ
+        if 'r' in mode or '+' in mode or 'a' in mode:
+            raise UnsupportedError('read from an export archive', path=path)
+        path = self._normalize(path)
+        with self._lock:
+            self._check_new_file(path)
+        return _ArchiveMemberFile(self, path)
+
+    def setcontents(self, path, data=b'', encoding=None, errors=None, chunk_size=64 * 1024):
+        """
+        Add a file made of `data`, a string or a seekable file-like object, to the archive.
+        """
+        if not hasattr(data, 'read'):
+            with self.open(path, 'wb') as member_file:
+                member_file.write(data)
+            return len(data)
+        start = data.tell()
+        data.seek(0, 2)
+        size = data.tell() - start
+        data.seek(start)
+        self._add_file(self._normalize(path), data, size)
+        return size
+
+    def isdir(self, path):
+        return self._normalize(path) in self.dirs
+
+    def isfile(self, path):
+        return self._normalize(path) in self.file_sizes
+
+    def listdir(self, path='./', wildcard=None, full=False, absolute=False, dirs_only=False, files_only=False):
+        path = self._normalize(path)
+        if path not in self.dirs:
+            raise ResourceNotFoundError(path)
+        with self._lock:
+            entries = [
+                entry for entry in list(self.dirs) + list(self.file_sizes)
+                if entry and dirname(entry) == path
+            ]
+        entries = [entry.rsplit(u'/', 1)[-1] for entry in entries]
+        return self._listdir_helper(path, entries, wildcard, full, absolute, dirs_only, files_only)
+
+    def makedir(self, path, recursive=False, allow_recreate=False):
+        path = self._normalize(path)
+        with self._lock:
+            if path in self.file_sizes:
+                raise ResourceInvalidError(path)
+            if path in self.dirs:
+                if not allow_recreate:
+                    raise DestinationExistsError(path)
+                return
+            parent = dirname(path)
+            if parent not in self.dirs:
+                if not recursive:
+                    raise ParentDirectoryMissingError(path)
+                self.makedir(parent, recursive=True, allow_recreate=True)
+            member = tarfile.TarInfo(path.encode('utf-8'))
+            member.type = tarfile.DIRTYPE
+            member.mtime = time.time()
+            member.mode = 0755
+            self.tar_file.addfile(member)
+            self.dirs.add(path)
+
+    def remove(self, path):
+        raise UnsupportedError('remove from an export archive', path=path)
+
+    def removedir(self, path, recursive=False, force=False):
+        raise UnsupportedError('remove from an export archive', path=path)
+
+    def rename(self, src, dst):
+        raise UnsupportedError('rename in an export archive', path=src)
+
+    def getinfo(self, path):
+        path = self._normalize(path)
+        if path in self.dirs:
+            return {}
+        if path in self.file_sizes:
+            return {'size': self.file_sizes[path]}
+        raise ResourceNotFoundError(path)
+
+    def close(self):
+        if not self.closed:
+            self.tar_file.close()
+        super(TarExportFS, self).close()
+
+
+class _ArchiveMemberFile(object):
+    """
+    A file being written to a TarExportFS, which adds it to the archive when it is closed.
+    """
+    def __init__(self, export_fs, path):
+        self.export_fs = export_fs
+        self.path = path
+        self.spool = SpooledTemporaryFile(max_size=export_fs.spool_bytes)
+
+    def write(self, data):
+        """
+        Write `data`, which is encoded in UTF-8 if it is unicode.
+        """
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self.spool.write(data)
+
+    def writelines(self, lines):
+        """
+        Write each of `lines`.
+        """
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        """
+        Do nothing: the file is only written to the archive when it is closed.
+        """
+
+    @property
+    def closed(self):
+        """
+        Whether the file was closed.
+        """
+        return self.spool is None
+
+    def close(self):
+        """
+        Add the file to the archive.
+        """
+        if self.spool is None:
+            return
+        try:
+            size = self.spool.tell()
+            self.spool.seek(0)
+            self.export_fs._add_file(self.path, self.spool, size)  # pylint: disable=protected-access
+        finally:
+            self.spool.close()
+            self.spool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
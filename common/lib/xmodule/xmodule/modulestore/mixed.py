@@ -539,6 +539,15 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         except NotImplementedError:
             return None, None
 
+    def get_structure_diff(self, course_key, from_version, to_version):
+        """
+        Returns the StructureDiff of the blocks of two versions of the structure of the given course or library.
+
+        Raises NotImplementedError if the course's modulestore doesn't version structures.
+        """
+        store = self._verify_modulestore_support(course_key, 'get_structure_diff')
+        return store.get_structure_diff(course_key, from_version, to_version)
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
@@ -0,0 +1,286 @@
+"""
+A compact, memory-mappable binary encoding for split modulestore structures.
+
+Structure versions are immutable, so once a structure has been written to disk
+in this format every worker process on the host can ``mmap`` the same file and
+share its pages. Individual blocks are decoded lazily, on lookup by
+:class:`~xmodule.modulestore.split_mongo.BlockKey`, instead of deserializing
+the whole structure up front.
+
+File layout (all integers are little-endian, unsigned 32 bit)::
+
+    header          MAGIC, block count, metadata length, keys length, records length
+    metadata        pickled structure document, without its 'blocks'
+    key offsets     (block count + 1) offsets into the keys area
+    keys            sorted, utf-8 encoded "<block_type>\\0<block_id>" strings
+    record offsets  (block count + 1) offsets into the records area
+    records         one pickled ``BlockData.to_storable()`` per key, in key order
+"""
+import copy
+import cPickle as pickle
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections import MutableMapping
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+
+
+MAGIC = 'EDXSTRC1'
+HEADER = struct.Struct('<8sIIII')
+OFFSET = struct.Struct('<I')
+KEY_SEPARATOR = '\0'
+
+
+def _encode_key(block_key):
+    """
+    Return the sortable byte string used to store ``block_key``.
+    """
+    return KEY_SEPARATOR.join(
+        unicode(part).encode('utf-8') for part in (block_key.type, block_key.id)
+    )
+
+
+def _decode_key(encoded):
+    """
+    Inverse of :func:`_encode_key`.
+    """
+    block_type, block_id = encoded.split(KEY_SEPARATOR, 1)
+    return BlockKey(block_type.decode('utf-8'), block_id.decode('utf-8'))
+
+
+def _offsets_to_bytes(offsets):
+    """
+    Serialize a list of offsets as a little-endian uint32 array.
+    """
+    packed = array('I', offsets)
+    if packed.itemsize != OFFSET.size:
+        return ''.join(OFFSET.pack(offset) for offset in offsets)
+    if struct.pack('=I', 1) != OFFSET.pack(1):
+        packed.byteswap()
+    return packed.tostring()
+
+
+def encode_structure(structure):
+    """
+    Encode a structure (as returned by ``structure_from_mongo``) into the
+    compact binary format, returning the encoded bytes.
+    """
+    metadata = dict(structure)
+    blocks = metadata.pop('blocks')
+    metadata_bytes = pickle.dumps(metadata, pickle.HIGHEST_PROTOCOL)
+
+    entries = sorted(
+        (_encode_key(block_key), block) for block_key, block in blocks.iteritems()
+    )
+
+    key_offsets = [0]
+    record_offsets = [0]
+    keys = []
+    records = []
+    for encoded_key, block in entries:
+        keys.append(encoded_key)
+        key_offsets.append(key_offsets[-1] + len(encoded_key))
+        record = pickle.dumps(block.to_storable(), pickle.HIGHEST_PROTOCOL)
+        records.append(record)
+        record_offsets.append(record_offsets[-1] + len(record))
+
+    return ''.join([
+        HEADER.pack(MAGIC, len(entries), len(metadata_bytes), key_offsets[-1], record_offsets[-1]),
+        metadata_bytes,
+        _offsets_to_bytes(key_offsets),
+        ''.join(keys),
+        _offsets_to_bytes(record_offsets),
+        ''.join(records),
+    ])
+
+
+def write_structure(path, structure):
+    """
+    Atomically write ``structure`` to ``path`` in the compact format.
+
+    The data is written to a temporary file in the same directory and renamed
+    into place, so concurrent readers never observe a partially written file.
+    """
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(encode_structure(structure))
+        os.rename(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class CompactStructure(object):
+    """
+    Read-only view over an encoded structure held in a buffer (usually an ``mmap``).
+    """
+    def __init__(self, buf):
+        self._buf = buf
+        magic, self.block_count, metadata_len, keys_len, records_len = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compact structure: bad magic {!r}".format(magic))
+
+        self._metadata_start = HEADER.size
+        self._key_offsets_start = self._metadata_start + metadata_len
+        self._keys_start = self._key_offsets_start + (self.block_count + 1) * OFFSET.size
+        self._record_offsets_start = self._keys_start + keys_len
+        self._records_start = self._record_offsets_start + (self.block_count + 1) * OFFSET.size
+        if self._records_start + records_len > len(buf):
+            raise ValueError("Truncated compact structure")
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-map the file at ``path`` read-only and return a :class:`CompactStructure` over it.
+        """
+        with open(path, 'rb') as structure_file:
+            buf = mmap.mmap(structure_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buf)
+
+    def close(self):
+        """
+        Release the underlying buffer, if it supports it.
+        """
+        if hasattr(self._buf, 'close'):
+            self._buf.close()
+
+    def _offset(self, table_start, index):
+        """
+        Return the ``index``-th offset from the offset table starting at ``table_start``.
+        """
+        return OFFSET.unpack_from(self._buf, table_start + index * OFFSET.size)[0]
+
+    def _encoded_key(self, index):
+        """
+        Return the encoded key stored at ``index``.
+        """
+        start = self._keys_start + self._offset(self._key_offsets_start, index)
+        end = self._keys_start + self._offset(self._key_offsets_start, index + 1)
+        return self._buf[start:end]
+
+    def _find(self, block_key):
+        """
+        Binary search the sorted key table for ``block_key``, returning its index or None.
+        """
+        try:
+            target = _encode_key(block_key)
+        except (AttributeError, UnicodeError):
+            return None
+        low, high = 0, self.block_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._encoded_key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.block_count and self._encoded_key(low) == target:
+            return low
+        return None
+
+    def metadata(self):
+        """
+        Return the structure document, without its blocks.
+        """
+        return pickle.loads(self._buf[self._metadata_start:self._key_offsets_start])
+
+    def keys(self):
+        """
+        Yield every BlockKey in the structure, in storage order.
+        """
+        for index in xrange(self.block_count):
+            yield _decode_key(self._encoded_key(index))
+
+    def contains(self, block_key):
+        """
+        Return True if ``block_key`` is in the structure.
+        """
+        return self._find(block_key) is not None
+
+    def get_block(self, block_key):
+        """
+        Decode and return the BlockData for ``block_key``, or None if it isn't in the structure.
+        """
+        index = self._find(block_key)
+        if index is None:
+            return None
+        start = self._records_start + self._offset(self._record_offsets_start, index)
+        end = self._records_start + self._offset(self._record_offsets_start, index + 1)
+        return BlockData(**pickle.loads(self._buf[start:end]))
+
+    def to_structure(self):
+        """
+        Return a structure document whose 'blocks' are decoded lazily from this view.
+        """
+        structure = self.metadata()
+        structure['blocks'] = CompactBlockMap(self)
+        return structure
+
+
+class CompactBlockMap(MutableMapping):
+    """
+    A {BlockKey: BlockData} mapping backed by a :class:`CompactStructure`.
+
+    Blocks are decoded on first access and memoized. Writes and deletes are
+    kept in a local overlay, so callers that treat 'blocks' as a plain dict
+    keep working; deep copies (as made by ``version_structure``) produce a
+    plain dict.
+    """
+    def __init__(self, compact):
+        self._compact = compact
+        self._decoded = {}
+        self._deleted = set()
+
+    def __getitem__(self, block_key):
+        if block_key in self._decoded:
+            return self._decoded[block_key]
+        if block_key in self._deleted:
+            raise KeyError(block_key)
+        block = self._compact.get_block(block_key)
+        if block is None:
+            raise KeyError(block_key)
+        self._decoded[block_key] = block
+        return block
+
+    def __setitem__(self, block_key, block):
+        self._deleted.discard(block_key)
+        self._decoded[block_key] = block
+
+    def __delitem__(self, block_key):
+        if block_key not in self:
+            raise KeyError(block_key)
+        self._decoded.pop(block_key, None)
+        self._deleted.add(block_key)
+
+    def __contains__(self, block_key):
+        if block_key in self._decoded:
+            return True
+        return block_key not in self._deleted and self._compact.contains(block_key)
+
+    def __iter__(self):
+        stored = set()
+        for block_key in self._compact.keys():
+            stored.add(block_key)
+            if block_key not in self._deleted:
+                yield block_key
+        for block_key in self._decoded.keys():
+            if block_key not in stored:
+                yield block_key
+
+    def __len__(self):
+        return sum(1 for __ in self)
+
+    def __deepcopy__(self, memo):
+        return {
+            copy.deepcopy(block_key, memo): copy.deepcopy(block, memo)
+            for block_key, block in self.iteritems()
+        }
+
+    def __repr__(self):
+        return '{}({} blocks)'.format(self.__class__.__name__, len(self))
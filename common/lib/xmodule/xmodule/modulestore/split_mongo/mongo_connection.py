@@ -4,10 +4,13 @@ Segregation of pymongo functions from the data modeling mechanisms for split mod
 import datetime
 import cPickle as pickle
 import math
+import os
+import threading
 import zlib
 import pymongo
 import pytz
 import re
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -21,6 +24,7 @@ from mongodb_proxy import autoretry_read, MongoProxy
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.compact_structure import CompactStructure, write_structure
 
 
 new_contract('BlockData', BlockData)
@@ -260,17 +264,95 @@ class CourseStructureCache(object):
             self.cache.set(key, compressed_pickled_data, None)
 
 
+class SharedStructureCache(object):
+    """
+    Host-wide cache of course structures in the compact binary format of
+    :mod:`xmodule.modulestore.split_mongo.compact_structure`.
+
+    Each immutable structure version is written once to ``cache_dir`` (ideally
+    on a tmpfs such as /dev/shm), and every worker process on the host
+    memory-maps the same file, so the block data is shared through the page
+    cache rather than unpickled into each worker's heap. Blocks are decoded
+    lazily, on lookup by BlockKey.
+
+    At most ``max_open`` structures are kept mapped per process; the least
+    recently used mapping is dropped beyond that. Files are never removed by
+    this class, since structures never change; expire them out of band.
+    """
+    _open_structures = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir, max_open=64):
+        self.cache_dir = cache_dir
+        self.max_open = max_open
+
+    def _path(self, key):
+        """Return the file path used for the structure whose id is ``key``."""
+        return os.path.join(self.cache_dir, '{}.structure'.format(key))
+
+    def _open(self, key):
+        """Return the mapped CompactStructure for ``key``, or None if it isn't on disk."""
+        with self._lock:
+            compact = self._open_structures.pop(key, None)
+            if compact is None:
+                try:
+                    compact = CompactStructure.open(self._path(key))
+                except (IOError, OSError, ValueError):
+                    return None
+            self._open_structures[key] = compact
+            while len(self._open_structures) > self.max_open:
+                # Structures handed out earlier may still reference the mapping,
+                # so just drop ours and let it be unmapped when they are gone.
+                self._open_structures.popitem(last=False)
+            return compact
+
+    def get(self, key, course_context=None):
+        """Return the structure for ``key`` with lazily decoded blocks, or None on a miss."""
+        with TIMER.timer("SharedStructureCache.get", course_context) as tagger:
+            compact = self._open(key)
+            tagger.tag(from_cache=str(compact is not None).lower())
+
+            if compact is None:
+                # Always log cache misses, because they are unexpected
+                tagger.sample_rate = 1
+                return None
+
+            tagger.measure('blocks', compact.block_count)
+            return compact.to_structure()
+
+    def set(self, key, structure, course_context=None):
+        """Write ``structure`` to the shared cache directory, unless it is already there."""
+        with TIMER.timer("SharedStructureCache.set", course_context) as tagger:
+            path = self._path(key)
+            if os.path.exists(path):
+                return
+            tagger.measure('blocks', len(structure['blocks']))
+            try:
+                if not os.path.isdir(self.cache_dir):
+                    os.makedirs(self.cache_dir)
+                write_structure(path, structure)
+            except (IOError, OSError):
+                # Another process may have created the directory concurrently, or the
+                # disk is full; either way, the structure is still served from mongo.
+                tagger.tag(write_failed='true')
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache_dir=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        If ``structure_cache_dir`` is set, structures are cached in a host-wide
+        :class:`SharedStructureCache` in that directory instead of the
+        'course_structure_cache' django cache.
         """
+        self.structure_cache_dir = structure_cache_dir
         if kwargs.get('replicaSet') is None:
             kwargs.pop('replicaSet', None)
             mongo_class = pymongo.MongoClient
@@ -318,7 +400,10 @@ class MongoConnection(object):
         This method will use a cached version of the structure if it is availble.
         """
         with TIMER.timer("get_structure", course_context) as tagger_get_structure:
-            cache = CourseStructureCache()
+            if self.structure_cache_dir:
+                cache = SharedStructureCache(self.structure_cache_dir)
+            else:
+                cache = CourseStructureCache()
 
             structure = cache.get(key, course_context)
             tagger_get_structure.tag(from_cache=str(bool(structure)).lower())
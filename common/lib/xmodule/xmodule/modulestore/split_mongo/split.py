@@ -81,6 +81,7 @@ from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.structure_diff import diff_structures, StructureDiffCache
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
 from types import NoneType
@@ -1320,6 +1321,39 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             result
         )
 
+    def get_structure_diff(self, course_key, from_version, to_version):
+        """
+        Find the blocks that differ between two versions of the structure of a course or library.
+
+        :param course_key: the course or library; its version is ignored
+        :param from_version: the version guid of the structure to compare against
+        :param to_version: the version guid of the structure whose changes are returned
+        :return a StructureDiff of the sets of the usage keys of the blocks that were added, removed,
+            moved to another parent, or whose fields or definition changed, in to_version
+        """
+        if not isinstance(course_key, CourseLocator) or course_key.deprecated:
+            # The supplied CourseKey is of the wrong type, so it can't possibly be stored in this modulestore.
+            raise ItemNotFoundError(course_key)
+
+        from_version = course_key.as_object_id(from_version)
+        to_version = course_key.as_object_id(to_version)
+        # the structures of an active bulk operation can still change until it ends
+        cache = StructureDiffCache() if not self._get_bulk_ops_record(course_key).active else None
+        structure_diff = cache.get(from_version, to_version) if cache else None
+        if structure_diff is None:
+            structures = []
+            for version_guid in (from_version, to_version):
+                structure = self.get_structure(course_key, version_guid)
+                if structure is None:
+                    raise ItemNotFoundError('Structure: {}'.format(version_guid))
+                structures.append(structure)
+            structure_diff = diff_structures(*structures)
+            if cache:
+                cache.set(from_version, to_version, structure_diff)
+
+        course_key = course_key.version_agnostic()
+        return structure_diff.map_keys(lambda block_key: course_key.make_usage_key(block_key.type, block_key.id))
+
     def get_definition_successors(self, definition_locator, version_history_depth=1):
         """
         Find the version_history_depth next versions of this definition. Return as a VersionTree
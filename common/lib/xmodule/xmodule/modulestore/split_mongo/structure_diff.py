@@ -0,0 +1,119 @@
+"""
+The blocks that differ between two versions of a split modulestore structure.
+
+Structures are immutable, so the difference between two versions never changes:
+it is computed once and kept in the 'course_structure_cache' django cache, if
+there is one, next to the structures themselves.
+
+A block whose `edit_info.update_version` and definition id are the same in both
+versions wasn't edited in between, so only the blocks whose edit info changed
+have their fields compared; and only the children of those blocks can have
+moved.
+"""
+from collections import namedtuple
+
+from django.core.cache import get_cache, InvalidCacheBackendError
+
+
+class StructureDiff(namedtuple('StructureDiff', 'added removed moved changed')):
+    """
+    The keys of the blocks that were added to, removed from, moved to another parent (or into or
+    out of the tree) in, or had their fields or definition changed in a structure version, from
+    another version.
+    """
+    __slots__ = ()
+
+    def __nonzero__(self):
+        return any((self.added, self.removed, self.moved, self.changed))
+
+    def map_keys(self, key_function):
+        """
+        Returns a StructureDiff of the results of `key_function` on each key of this one.
+        """
+        return StructureDiff(*(set(key_function(key) for key in keys) for keys in self))
+
+
+def _children_parents(blocks, block_keys):
+    """
+    Returns the dict of the parent of each child of the blocks `block_keys` in `blocks`.
+    """
+    parents = {}
+    for block_key in block_keys:
+        for child_key in blocks[block_key].fields.get('children', []):
+            parents[child_key] = block_key
+    return parents
+
+
+def diff_structures(from_structure, to_structure):
+    """
+    Returns the StructureDiff of the BlockKeys of `to_structure` from `from_structure`.
+    """
+    from_blocks = from_structure['blocks']
+    to_blocks = to_structure['blocks']
+
+    added = set(block_key for block_key in to_blocks if block_key not in from_blocks)
+    removed = set(block_key for block_key in from_blocks if block_key not in to_blocks)
+    changed = set()
+    for block_key, block in to_blocks.iteritems():
+        from_block = from_blocks.get(block_key)
+        if from_block is None:
+            continue
+        if (
+                block.edit_info.update_version == from_block.edit_info.update_version and
+                block.definition == from_block.definition
+        ):
+            continue
+        if (
+                block.definition != from_block.definition or
+                block.fields != from_block.fields or
+                block.defaults != from_block.defaults
+        ):
+            changed.add(block_key)
+
+    # a block can only move out of a parent that changed or was removed, and into one that changed or was added
+    from_parents = _children_parents(from_blocks, changed | removed)
+    to_parents = _children_parents(to_blocks, changed | added)
+    moved = set(
+        block_key for block_key in set(from_parents) | set(to_parents)
+        if block_key in from_blocks and block_key in to_blocks and
+        from_parents.get(block_key) != to_parents.get(block_key)
+    )
+    return StructureDiff(added, removed, moved, changed)
+
+
+class StructureDiffCache(object):
+    """
+    Wrapper around the 'course_structure_cache' django cache to cache the differences between
+    structure versions. If that cache doesn't exist, then don't do anything for set and get.
+    """
+    def __init__(self):
+        self.no_cache_found = False
+        try:
+            self.cache = get_cache('course_structure_cache')
+        except InvalidCacheBackendError:
+            self.no_cache_found = True
+
+    @staticmethod
+    def _key(from_version, to_version):
+        """
+        Returns the cache key of the difference between two versions.
+        """
+        return u'structure_diff.{}.{}'.format(from_version, to_version)
+
+    def get(self, from_version, to_version):
+        """
+        Returns the cached StructureDiff of `to_version` from `from_version`, or None.
+        """
+        if self.no_cache_found:
+            return None
+        cached = self.cache.get(self._key(from_version, to_version))
+        return StructureDiff(*cached) if cached is not None else None
+
+    def set(self, from_version, to_version, structure_diff):
+        """
+        Caches the StructureDiff of `to_version` from `from_version`.
+        """
+        if self.no_cache_found:
+            return
+        # Structures are immutable, so we set a timeout of "never"
+        self.cache.set(self._key(from_version, to_version), tuple(structure_diff), None)
@@ -8,6 +8,7 @@ import mimetypes
 from tempfile import mkdtemp
 import path
 import shutil
+from fs.memoryfs import MemoryFS
 
 from opaque_keys.edx.locator import CourseLocator, AssetLocator
 from opaque_keys.edx.keys import AssetKey
@@ -146,6 +147,20 @@ class TestContentstore(unittest.TestCase):
         finally:
             shutil.rmtree(root_dir)
 
+    @ddt.data(1, 3)
+    def test_export_for_course_to_fs(self, workers):
+        """
+        Test export to a filesystem, fetching the assets with one or several threads
+        """
+        self.set_up_assets(False)
+        output_fs = MemoryFS()
+        policy = self.contentstore.export_all_for_course_to_fs(self.course1_key, output_fs, workers=workers)
+        self.assertItemsEqual(policy.keys(), self.course1_files)
+        for filename in self.course1_files:
+            self.assertTrue(output_fs.isfile(filename), "{} is not a file".format(filename))
+            content = self.contentstore.find(self.course1_key.make_asset_key('asset', filename))
+            self.assertEqual(output_fs.getcontents(filename), content.data)
+
     @ddt.data(True, False)
     def test_get_all_content(self, deprecated):
         """
@@ -178,6 +193,71 @@ class TestContentstore(unittest.TestCase):
             self.contentstore.set_attr(asset_key, 'locked', not prelocked)
             self.assertEqual(self.contentstore.get_attr(asset_key, 'locked', False), not prelocked)
 
+    @ddt.data(True, False)
+    def test_find_many(self, deprecated):
+        """
+        Test finding many assets in one query
+        """
+        self.set_up_assets(deprecated)
+        asset_keys = [self.course1_key.make_asset_key('asset', filename) for filename in self.course1_files]
+        unknown_asset = self.course1_key.make_asset_key('asset', 'no_such_file.gif')
+        assets = self.contentstore.find_many(asset_keys + [unknown_asset])
+        self.assertItemsEqual(assets.keys(), asset_keys)
+        for asset_key, asset in assets.iteritems():
+            self.assertEqual(asset['asset_key'], asset_key)
+            self.assertEqual(asset['displayname'], asset_key.name)
+        self.assertEqual(self.contentstore.find_many([]), {})
+
+    @ddt.data(
+        (True, 'uploadDate', False), (True, 'displayname', True),
+        (False, 'uploadDate', True), (False, 'displayname', False),
+    )
+    @ddt.unpack
+    def test_get_content_page(self, deprecated, sort_field, ascending):
+        """
+        Test paging through the assets of a course with cursors
+        """
+        self.set_up_assets(deprecated)
+        all_assets, __ = self.contentstore.get_all_content_for_course(
+            self.course1_key, sort=[(sort_field, 1 if ascending else -1)]
+        )
+        names = []
+        cursor = None
+        while True:
+            assets, cursor = self.contentstore.get_content_page(
+                self.course1_key, 2, cursor=cursor, sort_field=sort_field, ascending=ascending
+            )
+            self.assertLessEqual(len(assets), 2)
+            names.extend(asset['asset_key'].name for asset in assets)
+            if cursor is None:
+                break
+        self.assertItemsEqual(names, self.course1_files)
+        if sort_field == 'displayname':
+            self.assertEqual(names, [asset['asset_key'].name for asset in all_assets])
+
+    @ddt.data(True, False)
+    def test_get_content_page_content_types(self, deprecated):
+        """
+        Test filtering the assets of a page by content type
+        """
+        self.set_up_assets(deprecated)
+        assets, cursor = self.contentstore.get_content_page(self.course1_key, 10, content_types=['IMAGE/JPEG'])
+        self.assertIsNone(cursor)
+        self.assertItemsEqual([asset['asset_key'].name for asset in assets], ['picture1.jpg', 'picture2.jpg'])
+        assets, cursor = self.contentstore.get_content_page(
+            self.course1_key, 10, content_types=['image/jpeg'], exclude_content_types=True
+        )
+        self.assertEqual([asset['asset_key'].name for asset in assets], ['contains.sh'])
+
+    def test_invalid_cursor(self):
+        """
+        Test that invalid cursors are rejected
+        """
+        self.set_up_assets(False)
+        for cursor in ('not a cursor', 'W10=', u'\xe9'):
+            with self.assertRaises(ValueError):
+                self.contentstore.get_content_page(self.course1_key, 2, cursor=cursor)
+
     @ddt.data(True, False)
     def test_copy_assets(self, deprecated):
         """
@@ -209,3 +289,33 @@ class TestContentstore(unittest.TestCase):
         # ensure it didn't remove any from other course
         __, count = self.contentstore.get_all_content_for_course(self.course2_key)
         self.assertEqual(count, len(self.course2_files))
+
+    @ddt.data(True, False)
+    def test_invalidate_cached_content(self, deprecated):
+        """
+        Test that saving, deleting and changing assets invalidates their cached copies
+        """
+        self.set_up_assets(deprecated)
+        invalidated = []
+        self.contentstore.invalidate_cached_content = invalidated.append
+
+        def invalidated_names():
+            """
+            The names of the invalidated assets, which are then forgotten.
+            """
+            names = [(asset_key.category, asset_key.name) for asset_key in invalidated]
+            del invalidated[:]
+            return names
+
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[1])
+        self.save_asset(self.course1_files[1], asset_key, 'new name', False)
+        self.assertEqual(invalidated_names(), [('asset', self.course1_files[1])])
+
+        self.contentstore.set_attr(asset_key, 'locked', True)
+        self.assertEqual(invalidated_names(), [('asset', self.course1_files[1])])
+
+        self.contentstore.delete(asset_key)
+        self.assertEqual(invalidated_names(), [('asset', self.course1_files[1])])
+
+        self.contentstore.delete_all_course_assets(self.course2_key)
+        self.assertItemsEqual(invalidated_names(), [('asset', filename) for filename in self.course2_files])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for export_archive.py
+"""
+from StringIO import StringIO
+import tarfile
+import unittest
+
+from fs.errors import ParentDirectoryMissingError, ResourceInvalidError, UnsupportedError
+
+from xmodule.contentstore.mongo import MongoContentStore
+from xmodule.modulestore.export_archive import TarExportFS
+
+
+class TestTarExportFS(unittest.TestCase):
+    """
+    Tests for TarExportFS
+    """
+    def setUp(self):
+        super(TestTarExportFS, self).setUp()
+        self.archive = StringIO()
+        self.export_fs = TarExportFS(self.archive, spool_bytes=16)
+
+    def read_archive(self):
+        """
+        Close the archive, and return the dict of the contents of its files (None for directories), by name.
+        """
+        self.export_fs.close()
+        self.archive.seek(0)
+        with tarfile.open(fileobj=self.archive, mode='r:gz') as tar_file:
+            return {
+                member.name: tar_file.extractfile(member).read() if member.isfile() else None
+                for member in tar_file.getmembers()
+            }
+
+    def test_write_files(self):
+        course_fs = self.export_fs.makeopendir('course')
+        with course_fs.open('course.xml', 'w') as course_xml:
+            course_xml.write(u'<course name="é"/>')
+        course_fs.makeopendir('static/images', recursive=True).setcontents('image.jpg', StringIO('x' * 100))
+        course_fs.makeopendir('policies').setcontents('assets.json', '{}')
+
+        self.assertItemsEqual(course_fs.listdir(), ['course.xml', 'static', 'policies'])
+        self.assertTrue(course_fs.isfile('static/images/image.jpg'))
+        self.assertTrue(course_fs.isdir('static/images'))
+        self.assertEqual(
+            self.read_archive(),
+            {
+                'course': None,
+                'course/course.xml': '<course name="\xc3\xa9"/>',
+                'course/static': None,
+                'course/static/images': None,
+                'course/static/images/image.jpg': 'x' * 100,
+                'course/policies': None,
+                'course/policies/assets.json': '{}',
+            }
+        )
+
+    def test_write_twice(self):
+        self.export_fs.setcontents('course.xml', '<course/>')
+        with self.export_fs.open('course.xml', 'w') as course_xml:
+            course_xml.write('<course name="again"/>')
+        self.assertEqual(self.export_fs.getinfo('course.xml'), {'size': 22})
+        # The last write wins when the archive is extracted.
+        self.assertEqual(self.read_archive(), {'course.xml': '<course name="again"/>'})
+
+    def test_assets_with_same_export_path(self):
+        class Content(object):  # pylint: disable=too-few-public-methods
+            """The attributes of an asset that its export path is made of."""
+            def __init__(self, name):
+                self.name = name
+                self.import_path = 'images/x'
+
+        write_export = MongoContentStore._write_export  # pylint: disable=protected-access
+        self.export_fs.makedir('static')
+        static_fs = self.export_fs.opendir('static')
+        # Slashes are escaped in the names of exported assets, so both are exported as images/a_b.png.
+        write_export(Content('a/b.png'), StringIO('first'), static_fs)
+        write_export(Content('a_b.png'), StringIO('second'), static_fs)
+        self.assertEqual(self.read_archive(), {
+            'static': None,
+            'static/images': None,
+            'static/images/a_b.png': 'second',
+        })
+
+    def test_unsupported(self):
+        self.export_fs.setcontents('course.xml', '<course/>')
+        with self.assertRaises(ResourceInvalidError):
+            self.export_fs.makedir('course.xml')
+        with self.assertRaises(ParentDirectoryMissingError):
+            self.export_fs.open('static/image.jpg', 'w')
+        with self.assertRaises(UnsupportedError):
+            self.export_fs.open('course.xml', 'r')
+        with self.assertRaises(UnsupportedError):
+            self.export_fs.remove('course.xml')
+        self.assertEqual(self.read_archive(), {'course.xml': '<course/>'})
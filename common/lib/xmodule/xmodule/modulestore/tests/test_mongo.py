@@ -11,6 +11,8 @@ from path import Path as path
 import pymongo
 import logging
 import shutil
+from StringIO import StringIO
+import tarfile
 from tempfile import mkdtemp
 from uuid import uuid4
 from datetime import datetime
@@ -31,8 +33,9 @@ from xmodule.modulestore.draft import DraftModuleStore
 from opaque_keys.edx.locations import SlashSeparatedCourseKey, AssetLocation
 from opaque_keys.edx.locator import LibraryLocator, CourseLocator
 from opaque_keys.edx.keys import UsageKey
-from xmodule.modulestore.xml_exporter import export_course_to_xml
+from xmodule.modulestore.xml_exporter import export_course_to_archive, export_course_to_xml
 from xmodule.modulestore.xml_importer import import_course_from_xml, perform_xlint
+from xmodule.contentstore.content import StaticContent
 from xmodule.contentstore.mongo import MongoContentStore
 
 from nose.tools import assert_in
@@ -575,6 +578,31 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         self.assertTrue(path(root_dir / 'test_export/static/images/course_image.jpg').isfile())
         self.assertTrue(path(root_dir / 'test_export/static/images_course_image.jpg').isfile())
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_export_legacy_course_image_to_archive(self, _from_json):
+        """
+        Make sure that a course image imported from the legacy location, which
+        the assets are exported to, is only added once to an export archive.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'simple', '2012_Fall')
+        location = course_key.make_asset_key('asset', 'images_course_image.jpg')
+        course_image = self.content_store.find(location)
+        self.addCleanup(self.content_store.save, course_image)
+        self.content_store.save(StaticContent(
+            location, course_image.name, course_image.content_type, course_image.data,
+            import_path='images/course_image.jpg'
+        ))
+
+        archive = StringIO()
+        export_course_to_archive(self.draft_store, self.content_store, course_key, archive, 'test_export')
+        archive.seek(0)
+        with tarfile.open(fileobj=archive, mode='r:gz') as tar_file:
+            names = tar_file.getnames()
+            self.assertEqual(names.count('test_export/static/images/course_image.jpg'), 1)
+            self.assertEqual(
+                tar_file.extractfile('test_export/static/images/course_image.jpg').read(), course_image.data
+            )
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_export_course_image_nondefault(self, _from_json):
         """
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the compact structure format and the SharedStructureCache.
+"""
+import copy
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from bson.objectid import ObjectId
+from pytz import UTC
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.compact_structure import (
+    CompactBlockMap, CompactStructure, encode_structure, write_structure
+)
+from xmodule.modulestore.split_mongo.mongo_connection import SharedStructureCache
+
+
+def make_structure(chapter_count=3):
+    """
+    Return a small structure document, in the form returned by ``structure_from_mongo``.
+    """
+    version = ObjectId()
+    root = BlockKey(u'course', u'course')
+    chapters = [BlockKey(u'chapter', u'chapter_{}'.format(index)) for index in range(chapter_count)]
+    edit_info = {
+        'update_version': version,
+        'edited_on': datetime.datetime(2015, 1, 1, tzinfo=UTC),
+        'edited_by': 42,
+    }
+    blocks = {
+        root: BlockData(
+            block_type=u'course', definition=ObjectId(), fields={'children': chapters}, edit_info=edit_info,
+        ),
+    }
+    for chapter in chapters:
+        blocks[chapter] = BlockData(
+            block_type=u'chapter',
+            definition=ObjectId(),
+            fields={'display_name': u'Chapter é {}'.format(chapter.id)},
+            edit_info=edit_info,
+        )
+    return {
+        '_id': version,
+        'root': root,
+        'original_version': version,
+        'previous_version': None,
+        'edited_by': 42,
+        'edited_on': datetime.datetime(2015, 1, 1, tzinfo=UTC),
+        'schema_version': 1,
+        'blocks': blocks,
+    }
+
+
+class TestCompactStructure(unittest.TestCase):
+    """
+    Tests for encoding and lazily decoding structures.
+    """
+    def setUp(self):
+        super(TestCompactStructure, self).setUp()
+        self.structure = make_structure()
+        self.compact = CompactStructure(encode_structure(self.structure))
+
+    def test_round_trip(self):
+        decoded = self.compact.to_structure()
+        self.assertIsInstance(decoded['blocks'], CompactBlockMap)
+        self.assertEqual(decoded, self.structure)
+
+    def test_lookup_by_block_key(self):
+        chapter = BlockKey(u'chapter', u'chapter_1')
+        self.assertTrue(self.compact.contains(chapter))
+        self.assertEqual(self.compact.get_block(chapter), self.structure['blocks'][chapter])
+        self.assertIsNone(self.compact.get_block(BlockKey(u'chapter', u'missing')))
+        self.assertIsNone(self.compact.get_block(BlockKey(u'sequential', u'chapter_1')))
+
+    def test_lookup_decodes_single_block(self):
+        blocks = self.compact.to_structure()['blocks']
+        blocks[BlockKey(u'chapter', u'chapter_2')]
+        self.assertEqual(len(blocks._decoded), 1)  # pylint: disable=protected-access
+
+    def test_block_map_overlay(self):
+        blocks = self.compact.to_structure()['blocks']
+        new_key = BlockKey(u'chapter', u'new')
+        old_key = BlockKey(u'chapter', u'chapter_0')
+        blocks[new_key] = BlockData(block_type=u'chapter')
+        del blocks[old_key]
+
+        self.assertIn(new_key, blocks)
+        self.assertNotIn(old_key, blocks)
+        self.assertEqual(len(blocks), len(self.structure['blocks']))
+        with self.assertRaises(KeyError):
+            blocks[old_key]  # pylint: disable=pointless-statement
+
+    def test_deepcopy_is_plain_dict(self):
+        blocks = copy.deepcopy(self.compact.to_structure()['blocks'])
+        self.assertIs(type(blocks), dict)
+        self.assertEqual(blocks, self.structure['blocks'])
+
+    def test_bad_magic(self):
+        with self.assertRaises(ValueError):
+            CompactStructure('X' * 64)
+
+
+class TestSharedStructureCache(unittest.TestCase):
+    """
+    Tests for the memory-mapped, host-wide structure cache.
+    """
+    def setUp(self):
+        super(TestSharedStructureCache, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.addCleanup(SharedStructureCache._open_structures.clear)  # pylint: disable=protected-access
+        self.cache = SharedStructureCache(os.path.join(self.cache_dir, 'structures'), max_open=2)
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get(ObjectId()))
+
+    def test_set_and_get(self):
+        structure = make_structure()
+        self.cache.set(structure['_id'], structure)
+        self.assertEqual(self.cache.get(structure['_id']), structure)
+
+        # another process (or cache instance) sees the same file
+        other_cache = SharedStructureCache(self.cache.cache_dir)
+        self.assertEqual(other_cache.get(structure['_id']), structure)
+
+    def test_max_open(self):
+        structures = [make_structure() for __ in range(3)]
+        for structure in structures:
+            self.cache.set(structure['_id'], structure)
+            self.cache.get(structure['_id'])
+        self.assertEqual(len(SharedStructureCache._open_structures), 2)  # pylint: disable=protected-access
+        # evicted structures are re-opened from disk
+        self.assertEqual(self.cache.get(structures[0]['_id']), structures[0])
+
+    def test_write_is_atomic(self):
+        structure = make_structure()
+        os.makedirs(self.cache.cache_dir)
+        path = os.path.join(self.cache.cache_dir, 'structure')
+        write_structure(path, structure)
+        self.assertEqual(os.listdir(self.cache.cache_dir), ['structure'])
@@ -1429,6 +1429,45 @@ class TestItemCrud(SplitModuleTest):
         other_updated = modulestore().update_item(other_block, self.user_id)
         self.assertIn(moved_child.version_agnostic(), version_agnostic(other_updated.children))
 
+    def test_structure_diff(self):
+        """
+        test finding the blocks that were added, removed, moved and changed between two versions of a course
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        course = modulestore().get_course(course_key)
+        pre_version_guid = course.location.version_guid
+
+        # move a child of chapter3 to chapter1, and add a chapter
+        chapter3 = modulestore().get_item(course_key.make_usage_key('chapter', 'chapter3'))
+        moved_child = chapter3.children.pop()
+        chapter3.save()  # decache model changes
+        modulestore().update_item(chapter3, self.user_id)
+        chapter1 = modulestore().get_item(course_key.make_usage_key('chapter', 'chapter1'))
+        chapter1.children.append(moved_child)
+        modulestore().update_item(chapter1, self.user_id)
+        new_chapter = modulestore().create_child(
+            self.user_id, course.location.version_agnostic(), 'chapter', fields={'display_name': 'new chapter'}
+        )
+        post_version_guid = modulestore().get_course(course_key).location.version_guid
+
+        structure_diff = modulestore().get_structure_diff(course_key, pre_version_guid, post_version_guid)
+        self.assertEqual(structure_diff.added, {new_chapter.location.version_agnostic()})
+        self.assertEqual(structure_diff.removed, set())
+        self.assertEqual(structure_diff.moved, {moved_child.version_agnostic()})
+        self.assertEqual(
+            structure_diff.changed,
+            {
+                course.location.version_agnostic(),
+                chapter1.location.version_agnostic(),
+                chapter3.location.version_agnostic(),
+            }
+        )
+
+        reverse_diff = modulestore().get_structure_diff(course_key, post_version_guid, pre_version_guid)
+        self.assertEqual(reverse_diff.removed, structure_diff.added)
+        self.assertEqual(reverse_diff.moved, structure_diff.moved)
+        self.assertFalse(modulestore().get_structure_diff(course_key, post_version_guid, post_version_guid))
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_update_definition(self, _from_json):
         """
@@ -14,12 +14,14 @@ from xmodule.modulestore.inheritance import own_metadata
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
 from xmodule.modulestore import LIBRARY_ROOT
 from fs.osfs import OSFS
+from contextlib import closing
 from json import dumps
 import json
 import os
 from path import Path as path
 import shutil
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
+from xmodule.modulestore.export_archive import TarExportFS
 from opaque_keys.edx.locator import CourseLocator, LibraryLocator
 
 DRAFT_DIR = "drafts"
@@ -29,6 +31,9 @@ EXPORT_VERSION_KEY = "export_format"
 
 DEFAULT_CONTENT_FIELDS = ['metadata', 'data']
 
+# How many threads fetch the static assets of a course at once.
+DEFAULT_ASSET_EXPORT_WORKERS = 4
+
 
 def _export_drafts(modulestore, course_key, export_fs, xml_centric_course_key):
     """
@@ -107,7 +112,8 @@ class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir, root_fs=None,
+                 asset_workers=DEFAULT_ASSET_EXPORT_WORKERS):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -116,12 +122,16 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `root_fs`: A filesystem to write the exported xml to instead of `root_dir`, such as a TarExportFS
+        `asset_workers`: How many threads fetch static assets at once
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.root_fs = root_fs
+        self.asset_workers = asset_workers
 
     @abstractmethod
     def get_key(self):
@@ -157,7 +167,7 @@ class ExportManager(object):
         """
         with self.modulestore.bulk_operations(self.courselike_key):
 
-            fsm = OSFS(self.root_dir)
+            fsm = self.root_fs if self.root_fs is not None else OSFS(self.root_dir)
             root = lxml.etree.Element('unknown')  # pylint: disable=no-member
 
             # export only the published content
@@ -174,7 +184,7 @@ class ExportManager(object):
             self.process_root(root, export_fs)
 
             # Process extra items-- drafts, assets, etc
-            root_courselike_dir = self.root_dir + '/' + self.target_dir
+            root_courselike_dir = self.root_dir + '/' + self.target_dir if self.root_dir is not None else None
             self.process_extra(root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs)
 
             # Any last pass adjustments
@@ -204,26 +214,20 @@ class CourseExportManager(ExportManager):
 
     def process_extra(self, root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs):
         # Export the modulestore's asset metadata.
-        asset_dir = root_courselike_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
+        asset_dir = export_fs.makeopendir(AssetMetadata.EXPORTED_ASSET_DIR)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = self.modulestore.get_all_asset_metadata(self.courselike_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)  # pylint: disable=no-member
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
+        with asset_dir.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file)  # pylint: disable=no-member
 
         # export the static assets
         policies_dir = export_fs.makeopendir('policies')
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
-            )
+            export_assets(self.contentstore, self.courselike_key, export_fs, policies_dir, self.asset_workers)
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -238,11 +242,11 @@ class CourseExportManager(ExportManager):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
-                        course_image_file.write(course_image.data)
+                    output_dir = export_fs.makeopendir('static/images', recursive=True)
+                    # An image imported from the legacy location was already exported there with the assets.
+                    if not output_dir.isfile('course_image.jpg'):
+                        with output_dir.open('course_image.jpg', 'wb') as course_image_file:
+                            course_image_file.write(course_image.data)
 
         # export the static tabs
         export_extra_content(
@@ -320,14 +324,10 @@ class LibraryExportManager(ExportManager):
         to ease in duck typing during import. This may be expanded as a useful feature eventually.
         """
         # export the static assets
-        export_fs.makeopendir('policies')
+        policies_dir = export_fs.makeopendir('policies')
 
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                self.root_dir + '/' + self.target_dir + '/static/',
-                self.root_dir + '/' + self.target_dir + '/policies/assets.json',
-            )
+            export_assets(self.contentstore, self.courselike_key, export_fs, policies_dir, self.asset_workers)
 
     def post_process(self, root, export_fs):
         """
@@ -343,6 +343,16 @@ class LibraryExportManager(ExportManager):
         xml_file.close()
 
 
+def export_assets(contentstore, courselike_key, export_fs, policies_dir, workers):
+    """
+    Export the static assets of a courselike to the static directory of export_fs,
+    and their policy to assets.json in policies_dir.
+    """
+    static_dir = export_fs.makeopendir('static')
+    policy = contentstore.export_all_for_course_to_fs(courselike_key, static_dir, workers=workers)
+    policies_dir.setcontents('assets.json', dumps(policy, sort_keys=True, indent=4))
+
+
 def export_course_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
     """
     Thin wrapper for the Course Export Manager. See ExportManager for details.
@@ -357,6 +367,26 @@ def export_library_to_xml(modulestore, contentstore, library_key, root_dir, libr
     LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
 
 
+def export_course_to_archive(modulestore, contentstore, course_key, fileobj, course_dir, **kwargs):
+    """
+    Export a course as a tar.gz archive written to fileobj, with its files in course_dir,
+    without writing them to the disk first. See ExportManager and TarExportFS for details.
+    """
+    with closing(TarExportFS(fileobj)) as root_fs:
+        CourseExportManager(modulestore, contentstore, course_key, None, course_dir, root_fs=root_fs, **kwargs).export()
+
+
+def export_library_to_archive(modulestore, contentstore, library_key, fileobj, library_dir, **kwargs):
+    """
+    Export a library as a tar.gz archive written to fileobj, with its files in library_dir,
+    without writing them to the disk first. See ExportManager and TarExportFS for details.
+    """
+    with closing(TarExportFS(fileobj)) as root_fs:
+        LibraryExportManager(
+            modulestore, contentstore, library_key, None, library_dir, root_fs=root_fs, **kwargs
+        ).export()
+
+
 def adapt_references(subtree, destination_course_key, export_fs):
     """
     Map every reference in the subtree into destination_course_key and set it back into the xblock fields
@@ -20,9 +20,15 @@ Modulestore virtual   |          XML physical (draft, published)
              (a, a)   |  (a, a) | (x, a) | (x, x) | (x, y) | (a, x)
              (a, b)   |  (a, b) | (x, b) | (x, x) | (x, y) | (a, x)
 """
+import copy
+import hashlib
+import itertools
 import logging
 from abc import abstractmethod
-from opaque_keys.edx.locator import LibraryLocator
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+import time
+from opaque_keys.edx.locator import BlockUsageLocator, LibraryLocator
 import os
 import mimetypes
 from path import Path as path
@@ -43,21 +49,151 @@ import xblock
 from xmodule.tabs import CourseTabList
 from xmodule.assetstore import AssetMetadata
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
-from xmodule.modulestore.exceptions import DuplicateCourseError
+from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
 from xmodule.modulestore.mongo.base import MongoRevisionKey
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
 from xmodule.modulestore.tests.utils import LocationMixin
 from xmodule.util.misc import escape_invalid_characters
+import dogstats_wrapper as dog_stats_api
 
 
 log = logging.getLogger(__name__)
 
+# How many threads upload the static files of a course at once.
+DEFAULT_STATIC_IMPORT_WORKERS = 4
+
+
+def _list_static_files(static_dir, verbose=False):
+    """
+    Return the paths of the files under `static_dir` to import as static content.
+    """
+    content_paths = []
+    for dirname, _, filenames in os.walk(static_dir):
+        for filename in filenames:
+            content_path = os.path.join(dirname, filename)
+            if re.match(ASSET_IGNORE_REGEX, filename):
+                if verbose:
+                    log.debug('skipping static content %s...', content_path)
+                continue
+            content_paths.append(content_path)
+    return content_paths
+
+
+def _static_file_name(content_path, static_dir):
+    """
+    Return the path of the file at `content_path` relative to `static_dir`.
+    """
+    # strip away leading path from the name
+    fullname_with_subpath = content_path.replace(static_dir, '')
+    if fullname_with_subpath.startswith('/'):
+        fullname_with_subpath = fullname_with_subpath[1:]
+    return fullname_with_subpath
+
+
+def _is_unchanged_asset(existing, data, displayname, mime_type, locked, import_path):
+    """
+    Return whether `existing`, the data dictionary of an asset in the content store
+    (or None), already has the given data and attributes.
+    """
+    return (
+        existing is not None and
+        existing.get('md5') == hashlib.md5(data).hexdigest() and
+        existing.get('displayname') == displayname and
+        existing.get('contentType') == mime_type and
+        existing.get('locked', False) == locked and
+        existing.get('import_path') == import_path
+    )
+
+
+def _import_static_file(content_path, static_dir, static_content_store, target_id, policy, mimetypes_list, verbose,
+                        existing_assets=None):
+    """
+    Save the file at `content_path` into the content store.
+
+    If `existing_assets`, a dict of the data dictionaries of assets already in the
+    content store by asset key, is given, files identical to their asset aren't saved.
+
+    Returns the (path relative to `static_dir`, asset key) pair of the file,
+    or None if it was skipped.
+    """
+    filename = os.path.basename(content_path)
+
+    if verbose:
+        log.debug('importing static content %s...', content_path)
+
+    try:
+        with open(content_path, 'rb') as f:
+            data = f.read()
+    except IOError:
+        if filename.startswith('._'):
+            # OS X "companion files". See
+            # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+            return None
+        # Not a 'hidden file', then re-raise exception
+        raise
+
+    fullname_with_subpath = _static_file_name(content_path, static_dir)
+    asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+
+    policy_ele = policy.get(asset_key.path, {})
+
+    # During export display name is used to create files, strip away slashes from name
+    displayname = escape_invalid_characters(
+        name=policy_ele.get('displayname', filename),
+        invalid_char_list=['/', '\\']
+    )
+    locked = policy_ele.get('locked', False)
+    mime_type = policy_ele.get('contentType')
+
+    # Check extracted contentType in list of all valid mimetypes
+    if not mime_type or mime_type not in mimetypes_list:
+        mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+
+    if existing_assets is not None and _is_unchanged_asset(
+            existing_assets.get(asset_key), data, displayname, mime_type, locked, fullname_with_subpath
+    ):
+        if verbose:
+            log.debug('static content %s is unchanged, skipping it', content_path)
+        return fullname_with_subpath, asset_key
+
+    content = StaticContent(
+        asset_key, displayname, mime_type, data,
+        import_path=fullname_with_subpath, locked=locked
+    )
+
+    # first let's save a thumbnail so we can get back a thumbnail location
+    thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+
+    if thumbnail_content is not None:
+        content.thumbnail_location = thumbnail_location
+
+    # then commit the content
+    try:
+        static_content_store.save(content)
+    except Exception as err:
+        log.exception(u'Error importing {0}, error={1}'.format(
+            fullname_with_subpath, err
+        ))
+
+    return fullname_with_subpath, asset_key
+
 
 def import_static_content(
         course_data_path, static_content_store,
-        target_id, subpath='static', verbose=False):
+        target_id, subpath='static', verbose=False,
+        workers=1, progress_callback=None, incremental=False):
+    """
+    Import the files under `subpath` of `course_data_path` into `static_content_store`.
 
+    `workers` threads upload the files at once, as the time goes into waiting
+    for the content store. `progress_callback`, if given, is called with the
+    number of files imported so far and the number of files to import. If
+    `incremental`, files whose asset already has the same content and
+    attributes aren't saved again.
+
+    Returns a dict mapping the path of each file to its asset key.
+    """
     remap_dict = {}
 
     # now import all static assets
@@ -76,71 +212,45 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
-
-            content_path = os.path.join(dirname, filename)
-
-            if re.match(ASSET_IGNORE_REGEX, filename):
-                if verbose:
-                    log.debug('skipping static content %s...', content_path)
-                continue
+    content_paths = _list_static_files(static_dir, verbose)
 
-            if verbose:
-                log.debug('importing static content %s...', content_path)
+    existing_assets = None
+    if incremental:
+        # look up all the assets in one query
+        existing_assets = static_content_store.find_many([
+            StaticContent.compute_location(target_id, _static_file_name(content_path, static_dir))
+            for content_path in content_paths
+        ])
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
-
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
-
-            policy_ele = policy.get(asset_key.path, {})
-
-            # During export display name is used to create files, strip away slashes from name
-            displayname = escape_invalid_characters(
-                name=policy_ele.get('displayname', filename),
-                invalid_char_list=['/', '\\']
-            )
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
-
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
-
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+    def import_file(content_path):
+        """
+        Import one file; run by the worker threads.
+        """
+        return _import_static_file(
+            content_path, static_dir, static_content_store, target_id, policy, mimetypes_list, verbose,
+            existing_assets
+        )
 
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception(u'Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
+    pool = None
+    if workers > 1 and len(content_paths) > 1:
+        pool = ThreadPool(min(workers, len(content_paths)))
+        results = pool.imap_unordered(import_file, content_paths)
+    else:
+        results = itertools.imap(import_file, content_paths)
 
-            # store the remapping information which will be needed
-            # to subsitute in the module data
-            remap_dict[fullname_with_subpath] = asset_key
+    try:
+        for done, result in enumerate(results, 1):
+            if result is not None:
+                # store the remapping information which will be needed
+                # to subsitute in the module data
+                fullname_with_subpath, asset_key = result
+                remap_dict[fullname_with_subpath] = asset_key
+            if progress_callback is not None:
+                progress_callback(done, len(content_paths))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
 
     return remap_dict
 
@@ -177,6 +287,17 @@ class ImportManager(object):
             Otherwise, it throws an InvalidLocationError if the courselike does not exist.
 
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
+
+        static_import_workers: how many threads upload static files at once.
+
+        progress_callback: if given, called as progress_callback(stage, done, total) as the
+            'static' stage uploads files (counted per static directory) and as the 'children'
+            stage writes blocks. The time each stage takes is kept in `stage_timings`.
+
+        incremental: if True, static files, asset metadata and blocks that are identical to those
+            already in the destination course aren't written again, so that re-importing a
+            slightly edited course only versions and publishes what changed. Static files are
+            compared by MD5, blocks by their field values.
     """
     store_class = XMLModuleStore
 
@@ -186,7 +307,8 @@ class ImportManager(object):
             load_error_modules=True, static_content_store=None,
             target_id=None, verbose=False,
             do_import_static=True, create_if_not_present=False,
-            raise_on_failure=False
+            raise_on_failure=False, static_import_workers=DEFAULT_STATIC_IMPORT_WORKERS,
+            progress_callback=None, incremental=False
     ):
         self.store = store
         self.user_id = user_id
@@ -199,17 +321,46 @@ class ImportManager(object):
         self.do_import_static = do_import_static
         self.create_if_not_present = create_if_not_present
         self.raise_on_failure = raise_on_failure
-        self.xml_module_store = self.store_class(
-            data_dir,
-            default_class=default_class,
-            source_dirs=source_dirs,
-            load_error_modules=load_error_modules,
-            xblock_mixins=store.xblock_mixins,
-            xblock_select=store.xblock_select,
-            target_course_id=target_id,
-        )
+        self.static_import_workers = static_import_workers
+        self.progress_callback = progress_callback
+        self.incremental = incremental
+        self.stage_timings = {}
+        with self.import_stage('parse', data_dir):
+            self.xml_module_store = self.store_class(
+                data_dir,
+                default_class=default_class,
+                source_dirs=source_dirs,
+                load_error_modules=load_error_modules,
+                xblock_mixins=store.xblock_mixins,
+                xblock_select=store.xblock_select,
+                target_course_id=target_id,
+            )
         self.logger, self.errors = make_error_tracker()
 
+    def report_progress(self, stage, done, total):
+        """
+        Report the progress of a stage of the import to the progress callback, if any.
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(stage, done, total)
+
+    @contextmanager
+    def import_stage(self, stage, dest_id):
+        """
+        Time a stage of the import of `dest_id` (or of the data dir, for the 'parse' stage).
+
+        The time each stage took is logged, sent to datadog, and kept in
+        `stage_timings`, keyed by stage name.
+        """
+        start = time.time()
+        yield
+        duration = time.time() - start
+        self.stage_timings[stage] = self.stage_timings.get(stage, 0) + duration
+        dog_stats_api.histogram(
+            'courselike_import.stage.time', duration, tags=[u'stage:{}'.format(stage)]
+        )
+        log.info(u"Import of %s: stage %s took %.2fs", dest_id, stage, duration)
+
     def preflight(self):
         """
         Perform any pre-import sanity checks.
@@ -227,7 +378,9 @@ class ImportManager(object):
             # first pass to find everything in /static/
             import_static_content(
                 data_path, self.static_content_store,
-                dest_id, subpath='static', verbose=self.verbose
+                dest_id, subpath='static', verbose=self.verbose,
+                workers=self.static_import_workers, progress_callback=self._report_static_progress,
+                incremental=self.incremental
             )
 
         elif self.verbose and not self.do_import_static:
@@ -250,9 +403,17 @@ class ImportManager(object):
         if os.path.exists(data_path / simport):
             import_static_content(
                 data_path, self.static_content_store,
-                dest_id, subpath=simport, verbose=self.verbose
+                dest_id, subpath=simport, verbose=self.verbose,
+                workers=self.static_import_workers, progress_callback=self._report_static_progress,
+                incremental=self.incremental
             )
 
+    def _report_static_progress(self, done, total):
+        """
+        Report the progress of the upload of static files.
+        """
+        self.report_progress('static', done, total)
+
     def import_asset_metadata(self, data_dir, course_id):
         """
         Read in assets XML file, parse it, and add all asset metadata to the modulestore.
@@ -295,6 +456,16 @@ class ImportManager(object):
             else:
                 return
 
+        if self.incremental and all_assets:
+            existing = {
+                asset_md.asset_id: asset_md.to_storable()
+                for asset_md in self.store.get_all_asset_metadata(course_id, None)
+            }
+            all_assets = [
+                asset_md for asset_md in all_assets
+                if existing.get(asset_md.asset_id) != asset_md.to_storable()
+            ]
+
         # Now add all asset metadata to the modulestore.
         if len(all_assets) > 0:
             self.store.save_asset_metadata_list(all_assets, all_assets[0].edited_by, import_only=True)
@@ -328,9 +499,14 @@ class ImportManager(object):
                 dest_id,
                 do_import_static=self.do_import_static,
                 runtime=runtime,
+                incremental=self.incremental,
             )
+            imported_fields = copy.deepcopy(_block_fields(course)) if self.incremental else None
             self.static_updater(course, source_courselike, courselike_key, dest_id, runtime)
-            self.store.update_item(course, self.user_id)
+            # The course was just written with its imported fields: it only needs
+            # to be written again if static_updater changed them.
+            if imported_fields is None or _block_fields(course) != imported_fields:
+                self.store.update_item(course, self.user_id)
 
         return course, course_data_path
 
@@ -378,6 +554,7 @@ class ImportManager(object):
         """
         all_locs = set(self.xml_module_store.modules[courselike_key].keys())
         all_locs.remove(source_courselike.location)
+        total = len(all_locs)
 
         def depth_first(subtree):
             """
@@ -402,7 +579,9 @@ class ImportManager(object):
                         dest_id,
                         do_import_static=self.do_import_static,
                         runtime=courselike.runtime,
+                        incremental=self.incremental,
                     )
+                    self.report_progress('children', total - len(all_locs), total)
 
                     depth_first(child)
 
@@ -420,7 +599,9 @@ class ImportManager(object):
                 dest_id,
                 do_import_static=self.do_import_static,
                 runtime=courselike.runtime,
+                incremental=self.incremental,
             )
+        self.report_progress('children', total, total)
 
     def run_imports(self):
         """
@@ -439,13 +620,16 @@ class ImportManager(object):
                 source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
 
                 # Import all static pieces.
-                self.import_static(data_path, dest_id)
+                with self.import_stage('static', dest_id):
+                    self.import_static(data_path, dest_id)
 
                 # Import asset metadata stored in XML.
-                self.import_asset_metadata(data_path, dest_id)
+                with self.import_stage('asset_metadata', dest_id):
+                    self.import_asset_metadata(data_path, dest_id)
 
                 # Import all children
-                self.import_children(source_courselike, courselike, courselike_key, dest_id)
+                with self.import_stage('children', dest_id):
+                    self.import_children(source_courselike, courselike, courselike_key, dest_id)
 
             # This bulk operation wraps all the operations to populate the draft branch with any items
             # from the /drafts subdirectory.
@@ -454,7 +638,8 @@ class ImportManager(object):
             # and then publishing it.
             with self.store.bulk_operations(dest_id):
                 # Import all draft items into the courselike.
-                courselike = self.import_drafts(courselike, courselike_key, data_path, dest_id)
+                with self.import_stage('drafts', dest_id):
+                    courselike = self.import_drafts(courselike, courselike_key, data_path, dest_id)
 
             yield courselike
 
@@ -664,13 +849,60 @@ def import_library_from_xml(*args, **kwargs):
     return list(manager.run_imports())
 
 
+def _comparable_value(value):
+    """
+    Return a field value with the branch and version of its usage keys removed, so that
+    it compares equal to the same value read from any branch or version of a course.
+    """
+    if isinstance(value, BlockUsageLocator):
+        return value.version_agnostic().for_branch(None)
+    elif isinstance(value, list):
+        return [_comparable_value(item) for item in value]
+    elif isinstance(value, dict):
+        return {key: _comparable_value(item) for key, item in value.iteritems()}
+    return value
+
+
+def _block_fields(block):
+    """
+    Return the values of the fields explicitly set on `block`, in comparable form, by field name.
+    """
+    return {
+        field_name: _comparable_value(field.read_from(block))
+        for field_name, field in block.fields.iteritems()
+        if field.scope != Scope.parent and field.is_set_on(block)
+    }
+
+
+def _get_unchanged_block(store, dest_course_id, location, fields):
+    """
+    Return the block of `dest_course_id` that `location` is imported to, if it exists, has
+    exactly the field values `fields`, and has no unpublished changes; otherwise, None.
+    """
+    try:
+        if location.category == 'course':
+            existing = store.get_course(dest_course_id)
+        else:
+            existing = store.get_item(dest_course_id.make_usage_key(location.category, location.block_id))
+    except ItemNotFoundError:
+        return None
+    if existing is None or _block_fields(existing) != _comparable_value(fields):
+        return None
+    if store.has_changes(existing):
+        return None
+    return existing
+
+
 def _update_and_import_module(
         module, store, user_id,
         source_course_id, dest_course_id,
-        do_import_static=True, runtime=None):
+        do_import_static=True, runtime=None, incremental=False):
     """
     Update all the module reference fields to the destination course id,
     then import the module into the destination course.
+
+    If `incremental`, a module that is identical to its block in the destination
+    course isn't written again, and that block is returned instead.
     """
     logging.debug(u'processing import of module %s...', unicode(module.location))
 
@@ -737,6 +969,12 @@ def _update_and_import_module(
 
     fields = _update_module_references(module, source_course_id, dest_course_id)
 
+    if incremental:
+        existing = _get_unchanged_block(store, dest_course_id, module.location, fields)
+        if existing is not None:
+            log.debug(u'module %s is unchanged, skipping it', unicode(module.location))
+            return existing
+
     return store.import_xblock(
         user_id, dest_course_id, module.location.category,
         module.location.block_id, fields, runtime
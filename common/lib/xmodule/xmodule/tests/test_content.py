@@ -164,6 +164,23 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_data_in_range(self):
+        """
+        Test StaticContent stream_data_in_range function, which serves ranges of cached content
+        """
+        static_content = StaticContent('loc', 'name', 'type', SAMPLE_STRING)
+        data = ''.join(static_content.stream_data_in_range(100, 1500))
+        self.assertEqual(data, SAMPLE_STRING[100:1501])
+
+    def test_static_content_stream_read_chunk(self):
+        """
+        Test StaticContentStream read_chunk function, which reads the chunks of the chunk cache
+        """
+        item = FakeGridFsItem(SAMPLE_STRING)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+        self.assertEqual(static_content_stream.read_chunk(1000, 100), SAMPLE_STRING[1000:1100])
+        self.assertEqual(static_content_stream.read_chunk(0, 10), SAMPLE_STRING[:10])
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
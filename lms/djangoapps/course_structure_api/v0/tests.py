@@ -499,6 +499,27 @@ class CourseBlocksOrNavigationTestMixin(CourseDetailTestMixin, CourseViewTestsMi
         response = self.http_get_for_course(data={'block_json': 'incorrect'})
         self.assertEqual(response.status_code, 400)
 
+    def assert_precomputed_outline(self, **params):
+        """
+        Verifies that the view's response is the same when it is computed from the course's block tree.
+        """
+        expected = self.http_get_for_course(data=params).data
+        update_course_structure(unicode(self.course.id))
+        with patch.dict('django.conf.settings.FEATURES', {'ENABLE_PRECOMPUTED_COURSE_OUTLINES': True}):
+            with patch('course_structure_api.v0.views.get_module_for_descriptor') as get_module:
+                response = self.http_get_for_course(data=params)
+        self.assertFalse(get_module.called)
+        self.assertEquals(response.data, expected)
+
+    def test_precomputed_outline(self):
+        self.assert_precomputed_outline(block_count='problem,video')
+
+    @SharedModuleStoreTestCase.modifies_courseware
+    def test_precomputed_outline_no_access_to_block(self):
+        self.sequential.visible_to_staff_only = True
+        modulestore().update_item(self.sequential, self.user.id)
+        self.assert_precomputed_outline()
+
     @SharedModuleStoreTestCase.modifies_courseware
     def test_no_access_to_block(self):
         """
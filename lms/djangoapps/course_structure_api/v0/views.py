@@ -18,6 +18,7 @@ from opaque_keys.edx.keys import CourseKey
 from course_structure_api.v0 import serializers
 from courseware import courses
 from courseware.access import has_access
+from courseware.block_transformers import get_user_block_tree
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor
 from openedx.core.lib.api.view_utils import view_course_access, view_auth_classes
@@ -512,26 +513,38 @@ class CourseBlocksAndNavigation(ListAPIView):
         REST API endpoint for listing all the blocks and/or navigation information in the course,
         while regarding user access and roles.
 
+        The blocks are taken from the course's precomputed block tree when possible
+        (see courseware.block_transformers), and otherwise loaded from the modulestore.
+
         Arguments:
             request - Django request object
             course - course module object
             return_blocks - If true, returns the blocks information for the course.
             return_nav - If true, returns the navigation information for the course.
         """
-        # set starting point
-        start_block = course
-
         # initialize request and result objects
         request_info = self.RequestInfo(request, course)
         result_data = self.ResultData(return_blocks, return_nav)
 
-        # create and populate a field data cache by pre-fetching for the course (with depth=None)
-        request_info.field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, request.user, course, depth=None,
-        )
+        # block JSON data can only be computed by the blocks themselves
+        user_block_tree = None if request_info.block_json else get_user_block_tree(request.user, course, request)
+
+        if user_block_tree is not None:
+            start_block = user_block_tree.get_root()
+            self.recurse_block_tree(
+                request_info, result_data, self.BlockInfo(start_block, request_info), user_block_tree
+            )
+        else:
+            # set starting point
+            start_block = course
+
+            # create and populate a field data cache by pre-fetching for the course (with depth=None)
+            request_info.field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course.id, request.user, course, depth=None,
+            )
 
-        # start the recursion with the start_block
-        self.recurse_blocks_nav(request_info, result_data, self.BlockInfo(start_block, request_info))
+            # start the recursion with the start_block
+            self.recurse_blocks_nav(request_info, result_data, self.BlockInfo(start_block, request_info))
 
         # return response
         response = {"root": unicode(start_block.location)}
@@ -599,6 +612,43 @@ class CourseBlocksAndNavigation(ListAPIView):
         # additional fields
         self.add_additional_fields(request_info, block_info)
 
+    def recurse_block_tree(self, request_info, result_data, block_info, user_block_tree):
+        """
+        The equivalent of recurse_blocks_nav for a block of a user's view of the course's block tree,
+        which only contains the blocks that the user has access to.
+
+        Arguments:
+            request_info - Object encapsulating the request information.
+            result_data - Running result data that is updated during the recursion.
+            block_info - Information about the current block in the recursion.
+            user_block_tree - The user's UserBlockTree of the course.
+        """
+        # add the block's value to the result
+        result_data.blocks[unicode(block_info.block.location)] = block_info.value
+
+        # descendants
+        self.update_descendants(request_info, result_data, block_info)
+
+        # children
+        block_info.children = user_block_tree.get_children(block_info.block)
+        for child in block_info.children:
+            self.recurse_block_tree(
+                request_info,
+                result_data,
+                self.BlockInfo(child, request_info, parent_block_info=block_info),
+                user_block_tree
+            )
+
+        # block count
+        self.update_block_count(request_info, result_data, block_info)
+
+        # multi-device support
+        if 'multi_device' in request_info.fields:
+            block_info.value['multi_device'] = block_info.block.multi_device
+
+        # additional fields
+        self.add_additional_fields(request_info, block_info)
+
     def update_descendants(self, request_info, result_data, block_info):
         """
         Updates the descendants data for the current block.
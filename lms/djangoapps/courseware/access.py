@@ -34,6 +34,7 @@ from xmodule.partitions.partitions import NoSuchUserPartitionError, NoSuchUserPa
 from xmodule.util.django import get_current_request_hostname
 
 from external_auth.models import ExternalAuthMap
+from courseware.access_cache import cached_access
 from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student import auth
@@ -105,6 +106,9 @@ def has_access(user, action, obj, course_key=None):
 
     Returns an AccessResponse object.  It is up to the caller to actually
     deny access in a way that makes sense in context.
+
+    Decisions are memoized for the rest of the request, and optionally across
+    requests; see courseware.access_cache.
     """
     # Just in case user is passed in as None, make them anonymous
     if not user:
@@ -113,6 +117,13 @@ def has_access(user, action, obj, course_key=None):
     if isinstance(course_key, CCXLocator):
         course_key = course_key.to_course_locator()
 
+    return cached_access(user, action, obj, course_key, _has_access)
+
+
+def _has_access(user, action, obj, course_key):
+    """
+    Compute the access decision that has_access returns, without caching it.
+    """
     # delegate the work to type-specific functions.
     # (start with more specific types, then get more general)
     if isinstance(obj, CourseDescriptor):
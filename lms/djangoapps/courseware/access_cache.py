@@ -0,0 +1,342 @@
+"""
+Memoization of has_access decisions.
+
+A courseware page can ask for hundreds of access decisions, most of them
+repeats (the same blocks are checked by the navigation, the sequence and the
+modules themselves). Decisions are cached in two tiers:
+
+* the request tier, which remembers every decision made while handling the
+  current request. It is always on, and is discarded with the request cache
+  at the end of the request.
+
+* the optional cross-request tier (``FEATURES['ENABLE_ACCESS_DECISION_CACHE']``),
+  which stores decisions in the django cache for
+  ``settings.ACCESS_DECISION_CACHE_TIMEOUT`` seconds. Its keys include a
+  generation token for the user and for the course, which is replaced
+  whenever the user's roles, enrollments, cohorts or partition groups change,
+  a cohort's content group changes, or the course is published, so that no
+  stale decision survives those changes. Decisions that carry an error (such
+  as a start date that hasn't passed yet) depend on the current time and the
+  user's language, and are never stored in it.
+
+Decisions are keyed by the user, the action, the object (and the version of
+its content), the course run, and anything else about the request that
+changes the outcome: preview mode and the user's masquerade settings.
+"""
+import hashlib
+import logging
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+import dogstats_wrapper as dog_stats_api
+import request_cache
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.user_api.models import UserCourseTag
+from student.models import CourseAccessRole, CourseEnrollment
+from xblock.core import XBlock
+from xmodule.error_module import ErrorDescriptor
+from xmodule.modulestore.django import SignalHandler
+from xmodule.x_module import XModule
+
+from courseware.access_response import AccessResponse
+
+
+log = logging.getLogger(__name__)
+
+REQUEST_CACHE_NAME = 'courseware.access'
+GENERATIONS_CACHE_NAME = 'courseware.access.generations'
+
+
+def cross_request_cache_enabled():
+    """
+    Return True if access decisions should be shared between requests.
+    """
+    return settings.FEATURES.get('ENABLE_ACCESS_DECISION_CACHE', False)
+
+
+def _content_version(obj):
+    """
+    Return the time the content of ``obj`` was last edited, or None if it isn't known.
+    """
+    try:
+        return obj.subtree_edited_on
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def _object_key(obj):
+    """
+    Return a hashable key identifying ``obj`` (and the version of its content)
+    for the purpose of has_access, or None if decisions about it can't be cached.
+    """
+    if isinstance(obj, CourseOverview):
+        return ('overview', unicode(obj.id), obj.modified)
+    if isinstance(obj, ErrorDescriptor):
+        return ('error', unicode(obj.location), None)
+    if isinstance(obj, XModule):
+        return ('module', unicode(obj.location), _content_version(obj))
+    if isinstance(obj, XBlock):
+        return ('block', unicode(obj.location), _content_version(obj))
+    if isinstance(obj, (CourseKey, UsageKey)):
+        return ('key', unicode(obj), None)
+    if isinstance(obj, basestring):
+        return ('string', obj, None)
+    return None
+
+
+def _object_course_key(obj, course_key):
+    """
+    Return the course run that the decision about ``obj`` belongs to, or None.
+    """
+    if course_key is not None:
+        return course_key
+    if isinstance(obj, CourseKey):
+        return obj
+    if isinstance(obj, UsageKey):
+        return obj.course_key
+    if isinstance(obj, CourseOverview):
+        return obj.id
+    location = getattr(obj, 'location', None)
+    return location.course_key if location is not None else None
+
+
+def _masquerade_key(user):
+    """
+    Return a hashable summary of the user's masquerade settings.
+    """
+    masquerade_settings = getattr(user, 'masquerade_settings', None)
+    if not masquerade_settings:
+        return None
+    return tuple(sorted(
+        (unicode(key), masquerade.role, masquerade.user_partition_id, masquerade.group_id, masquerade.user_name)
+        for key, masquerade in masquerade_settings.iteritems()
+    ))
+
+
+def _user_key(user):
+    """
+    Return the key identifying ``user``, or None if decisions for them can't be cached.
+    """
+    if not user.is_authenticated():
+        return 'anonymous'
+    if user.id is None:
+        return None
+    return user.id
+
+
+def _generation_key(kind, value):
+    """
+    Return the django cache key of the generation token for a user or course.
+    """
+    return u"courseware.access.generation.{}.{}".format(kind, value)
+
+
+def _generations(keys):
+    """
+    Return the current generation tokens for the cache keys ``keys``.
+
+    Tokens are read from the django cache once per request. A missing token
+    (never set, or evicted) is replaced by a new one, so that decisions
+    stored under an older token can't be found again.
+    """
+    known = request_cache.get_cache(GENERATIONS_CACHE_NAME)
+    missing = [key for key in keys if key not in known]
+    if missing:
+        found = cache.get_many(missing)
+        for key in missing:
+            if key not in found:
+                token = uuid4().hex
+                cache.set(key, token, None)
+                found[key] = token
+        known.update(found)
+    return [known[key] for key in keys]
+
+
+def _bump_generation(kind, value):
+    """
+    Replace the generation token of a user or course, invalidating the decisions stored under it.
+    """
+    key = _generation_key(kind, value)
+    cache.set(key, uuid4().hex, None)
+    request_cache.get_cache(GENERATIONS_CACHE_NAME).pop(key, None)
+
+
+def _shared_cache_key(user_key, decision_key, course_key):
+    """
+    Return the django cache key of a decision in the cross-request tier.
+    """
+    generation_keys = [_generation_key('course', course_key)]
+    if user_key != 'anonymous':
+        generation_keys.append(_generation_key('user', user_key))
+    generations = _generations(generation_keys)
+    digest = hashlib.sha1(repr((user_key, decision_key, generations))).hexdigest()
+    return u"courseware.access.decision.{}".format(digest)
+
+
+def _is_shareable(result):
+    """
+    Return True if ``result`` may be stored in the cross-request tier.
+
+    Errors are left out: they carry translated messages, and mostly depend on the current time.
+    """
+    return isinstance(result, bool) or type(result) is AccessResponse
+
+
+def _record(outcome, tier, time_saved=None):
+    """
+    Report a cache hit or miss, and on a hit, how long computing the decision took originally.
+    """
+    tags = [u"tier:{}".format(tier)] if tier else []
+    dog_stats_api.increment(u"courseware.access_cache.{}".format(outcome), tags=tags)
+    if time_saved is not None:
+        dog_stats_api.histogram(u"courseware.access_cache.time_saved", time_saved, tags=tags)
+
+
+def cached_access(user, action, obj, course_key, compute):
+    """
+    Return ``compute(user, action, obj, course_key)``, from the cache when possible.
+
+    Decisions are only cached while a request is being handled; outside of one
+    (in tests, celery tasks and management commands) they are always computed.
+    """
+    if request_cache.get_request() is None:
+        return compute(user, action, obj, course_key)
+
+    user_key = _user_key(user)
+    object_key = _object_key(obj)
+    if user_key is None or object_key is None:
+        return compute(user, action, obj, course_key)
+
+    # Imported here to avoid a circular import with courseware.access.
+    from courseware.access import in_preview_mode
+
+    run_key = _object_course_key(obj, course_key)
+    masquerade_key = _masquerade_key(user)
+    decision_key = (
+        action,
+        object_key,
+        unicode(run_key) if run_key is not None else None,
+        getattr(user, 'is_staff', False),
+        in_preview_mode(),
+        masquerade_key,
+    )
+
+    decisions = request_cache.get_cache(REQUEST_CACHE_NAME).setdefault(user_key, {})
+    if decision_key in decisions:
+        result, elapsed = decisions[decision_key]
+        _record('hit', 'request', elapsed)
+        return result
+
+    shared_key = None
+    if cross_request_cache_enabled() and run_key is not None and masquerade_key is None:
+        shared_key = _shared_cache_key(user_key, decision_key, run_key)
+        cached = cache.get(shared_key)
+        if cached is not None:
+            result, elapsed = cached
+            decisions[decision_key] = cached
+            _record('hit', 'shared', elapsed)
+            return result
+
+    start = time.time()
+    result = compute(user, action, obj, course_key)
+    elapsed = time.time() - start
+    decisions[decision_key] = (result, elapsed)
+    if shared_key is not None and _is_shareable(result):
+        cache.set(shared_key, (result, elapsed), settings.ACCESS_DECISION_CACHE_TIMEOUT)
+    _record('miss', None)
+    return result
+
+
+def invalidate_user(user_id):
+    """
+    Forget every cached access decision about the user ``user_id``.
+    """
+    request_cache.get_cache(REQUEST_CACHE_NAME).pop(user_id, None)
+    if cross_request_cache_enabled():
+        _bump_generation('user', user_id)
+
+
+def invalidate_course(course_key):
+    """
+    Forget every cached access decision about the course run ``course_key``.
+    """
+    request_cache.get_cache(REQUEST_CACHE_NAME).clear()
+    if cross_request_cache_enabled():
+        _bump_generation('course', course_key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+def _user_access_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate a user's decisions when their global staff status, an enrollment or a role changes.
+    """
+    invalidate_user(instance.id if sender is User else instance.user_id)
+
+
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def _cohort_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the decisions of users who are added to or removed from a cohort or other group.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        invalidate_user(instance.id)
+    elif pk_set:
+        for user_id in pk_set:
+            invalidate_user(user_id)
+    else:
+        # The group was cleared, so the users it had are no longer known.
+        invalidate_course(instance.course_id)
+
+
+@receiver(post_save, sender=UserCourseTag)
+@receiver(post_delete, sender=UserCourseTag)
+def _user_course_tag_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate a user's decisions when one of their course tags changes, as
+    the tags record their groups in random (experiment) partitions.
+    """
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=CourseUserGroupPartitionGroup)
+@receiver(post_delete, sender=CourseUserGroupPartitionGroup)
+def _partition_group_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the decisions about a course when one of its cohorts is linked
+    to a different content group, or unlinked.
+    """
+    try:
+        course_key = instance.course_user_group.course_id
+    except CourseUserGroup.DoesNotExist:
+        # the cohort itself is being deleted; see _group_deleted
+        return
+    invalidate_course(course_key)
+
+
+@receiver(post_delete, sender=CourseUserGroup)
+def _group_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the decisions about a course when one of its cohorts or other groups is deleted.
+    """
+    invalidate_course(instance.course_id)
+
+
+@receiver(SignalHandler.course_published)
+def _course_published(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the decisions about a course when it is published.
+    """
+    invalidate_course(course_key)
@@ -0,0 +1,384 @@
+"""
+Per-user views of a course's precomputed block tree.
+
+The block tree index stored for each published version of a course (see
+openedx.core.djangoapps.content.course_structures.block_tree) holds what the
+access checks need to know about every block. The transformers in this module
+apply one user's view of the course to that data: CCX overrides, the
+visible_to_staff_only flag, group access, start dates and split_test group
+assignments. They mirror the checks that courseware.access and the XBlock
+runtime make, so that course outlines can be computed without instantiating
+any XBlocks.
+
+Like the XBlock traversal they replace, transformers visit the blocks from the
+root down, and a block that is hidden from the user hides its whole subtree.
+"""
+from datetime import datetime, timedelta
+import json
+import logging
+
+from django.conf import settings
+from django.utils.timezone import UTC
+from lazy import lazy
+from opaque_keys.edx.keys import UsageKey
+from xmodule.partitions.partitions import NoSuchUserPartitionGroupError
+from xmodule.split_test_module import get_split_user_partitions
+
+from courseware.access import has_access, in_preview_mode
+from courseware.masquerade import is_masquerading_as_student
+from courseware.module_render import make_track_function
+from openedx.core.djangoapps.content.course_structures.block_tree import DATE_FIELD
+from openedx.core.djangoapps.content.course_structures.models import CourseStructure
+from student.roles import CourseBetaTesterRole
+
+
+log = logging.getLogger(__name__)
+
+CCX_OVERRIDE_PROVIDER = 'ccx.overrides.CustomCoursesForEdxOverrideProvider'
+
+
+class TransformContext(object):
+    """
+    What the transformers need to know about the user and the course, looked up at most once.
+    """
+    def __init__(self, user, course, request=None):
+        self.user = user
+        self.course = course
+        self.course_key = course.id
+        self.request = request
+        self.now = datetime.now(UTC())
+        self._user_groups = {}
+
+    @lazy
+    def is_staff(self):
+        """
+        Whether the user has staff access to the course, and so can see every block.
+        """
+        return bool(has_access(self.user, 'staff', self.course))
+
+    @lazy
+    def is_beta_tester(self):
+        """
+        Whether the user sees blocks early, according to their days_early_for_beta.
+        """
+        return CourseBetaTesterRole(self.course_key).has_user(self.user)
+
+    @lazy
+    def track_function(self):
+        """
+        The function used to log the user's assignment to a split_test group, if there is a request.
+        """
+        return make_track_function(self.request) if self.request is not None else None
+
+    def get_user_partition(self, partition_id):
+        """
+        Return the course's user partition with the id ``partition_id``, or None.
+        """
+        for partition in self.course.user_partitions:
+            if partition.id == partition_id:
+                return partition
+        return None
+
+    def get_group(self, partition, assign=True, track_function=None):
+        """
+        Return the user's group in ``partition``, as the partition's scheme assigns it.
+        """
+        if partition.id not in self._user_groups:
+            self._user_groups[partition.id] = partition.scheme.get_group_for_user(
+                self.course_key, self.user, partition, assign=assign, track_function=track_function
+            )
+        return self._user_groups[partition.id]
+
+
+class BlockTransformer(object):
+    """
+    A transformation of the blocks of the tree that a user sees.
+    """
+    def prepare(self, context, tree):
+        """
+        Called once for the tree, before any block is transformed.
+        """
+        pass
+
+    def transform_block(self, context, entry):
+        """
+        Apply the transformation to ``entry``, the user's copy of a block's index entry.
+
+        Returns False if the block (and its subtree) should be hidden from the user.
+        """
+        raise NotImplementedError
+
+
+class CcxOverridesTransformer(BlockTransformer):
+    """
+    Apply the start, due and visible_to_staff_only overrides of a CCX to its blocks.
+    """
+    FIELDS = ('start', 'due', 'visible_to_staff_only')
+
+    def __init__(self):
+        self.overrides = {}
+
+    def prepare(self, context, tree):
+        if CCX_OVERRIDE_PROVIDER not in settings.FIELD_OVERRIDE_PROVIDERS:
+            return
+        if not getattr(context.course, 'enable_ccx', False):
+            return
+
+        # Imported here since the ccx app is only used when custom courses are enabled.
+        from ccx.models import CcxFieldOverride
+        from ccx.overrides import get_current_ccx
+
+        ccx = get_current_ccx(context.course_key)
+        if ccx is None:
+            return
+        overrides = CcxFieldOverride.objects.filter(ccx=ccx, field__in=self.FIELDS)
+        for override in overrides:
+            # Overrides are stored against the course's own usage keys, so match on block type and id.
+            location = override.location
+            block_overrides = self.overrides.setdefault((location.block_type, location.block_id), {})
+            block_overrides[override.field] = json.loads(override.value)
+
+    def transform_block(self, context, entry):
+        for field, value in self.overrides.get((entry['block_type'], entry['url_name']), {}).iteritems():
+            entry[field] = DATE_FIELD.to_json(DATE_FIELD.from_json(value)) if field in ('start', 'due') else value
+        return True
+
+
+class VisibilityTransformer(BlockTransformer):
+    """
+    Hide blocks that are only visible to staff.
+    """
+    def transform_block(self, context, entry):
+        return not entry['visible_to_staff_only'] or context.is_staff
+
+
+class UserPartitionTransformer(BlockTransformer):
+    """
+    Hide blocks whose group access (or whose ancestors' group access) excludes the user.
+
+    See courseware.access._has_group_access.
+    """
+    def __init__(self):
+        self.enabled = True
+
+    def prepare(self, context, tree):
+        partitions = context.course.user_partitions
+        # Partitions used by split_test are handled by SplitTestTransformer.
+        self.enabled = len(partitions) != len(get_split_user_partitions(partitions))
+
+    def has_group_access(self, context, group_access):
+        """
+        Return whether the user belongs to the groups that ``group_access`` requires.
+        """
+        if False in group_access.values():
+            log.warning("Group access check excludes all students, access will be denied.")
+            return False
+
+        for partition_id, group_ids in group_access.iteritems():
+            partition = context.get_user_partition(int(partition_id))
+            if partition is None:
+                log.warning("Error looking up user partition %s, access will be denied.", partition_id)
+                return False
+            if not partition.active or group_ids is None:
+                continue
+            try:
+                groups = [partition.get_group(group_id) for group_id in group_ids]
+            except NoSuchUserPartitionGroupError:
+                log.warning("Error looking up referenced user partition group, access will be denied.")
+                return False
+            if groups and context.get_group(partition) not in groups:
+                return False
+        return True
+
+    def transform_block(self, context, entry):
+        if not self.enabled:
+            return True
+        return self.has_group_access(context, entry['group_access']) or context.is_staff
+
+
+class StartDateTransformer(BlockTransformer):
+    """
+    Hide blocks that haven't started yet, taking beta testers' early access into account.
+
+    See courseware.access._can_access_descriptor_with_start_date.
+    """
+    def __init__(self):
+        self.enabled = True
+
+    def prepare(self, context, tree):
+        start_dates_disabled = settings.FEATURES['DISABLE_START_DATES']
+        self.enabled = not (
+            (start_dates_disabled and not is_masquerading_as_student(context.user, context.course_key)) or
+            in_preview_mode()
+        )
+
+    def transform_block(self, context, entry):
+        start = DATE_FIELD.from_json(entry['start'])
+        if not self.enabled or start is None:
+            return True
+        if entry['days_early_for_beta'] is not None and context.is_beta_tester:
+            start -= timedelta(entry['days_early_for_beta'])
+        return context.now > start or context.is_staff
+
+
+class SplitTestTransformer(BlockTransformer):
+    """
+    Show only the child of each split_test block that belongs to the user's group, assigning them a group if needed.
+
+    See xmodule.split_test_module.SplitTestModule.get_child_descriptors.
+    """
+    def transform_block(self, context, entry):
+        if entry['block_type'] != 'split_test':
+            return True
+
+        children = []
+        partition = context.get_user_partition(entry['user_partition_id'])
+        if partition is None:
+            log.warning(
+                "Configuration problem! No user_partition with id %s in course %s",
+                entry['user_partition_id'], context.course_key
+            )
+        else:
+            group = context.get_group(partition, track_function=context.track_function)
+            if group is not None:
+                child = entry['group_id_to_child'].get(str(group.id))
+                if child in entry['children']:
+                    children = [child]
+        entry['children'] = children
+        return True
+
+
+# The transformers applied to a user's view of a course, in order.
+DEFAULT_TRANSFORMERS = (
+    CcxOverridesTransformer,
+    VisibilityTransformer,
+    UserPartitionTransformer,
+    StartDateTransformer,
+    SplitTestTransformer,
+)
+
+
+# The transformers that decide, as has_access(user, 'load', block) does, whether a user can load a block.
+LOAD_ACCESS_TRANSFORMERS = (
+    CcxOverridesTransformer,
+    VisibilityTransformer,
+    UserPartitionTransformer,
+    StartDateTransformer,
+)
+
+
+class OutlineBlock(object):
+    """
+    A block of a user's view of a course, with the attribute names of the XBlock it stands for.
+
+    As with an XBlock, ``children`` lists all of the block's children, including
+    those hidden from the user; UserBlockTree.get_children returns the visible ones.
+    """
+    def __init__(self, location, entry):
+        self.location = location
+        self.category = entry['block_type']
+        self.url_name = entry['url_name']
+        self.display_name = entry['raw_display_name']
+        self.display_name_with_default = entry['display_name']
+        self.graded = entry['graded']
+        self.format = entry['format']
+        self.hide_from_toc = entry['hide_from_toc']
+        self.multi_device = entry['multi_device']
+        self.video_metadata = entry.get('video')
+        self.child_keys = entry['children']
+        self.children = [UsageKey.from_string(child).map_into_course(location.course_key) for child in self.child_keys]
+        self.has_children = bool(self.child_keys)
+
+
+class UserBlockTree(object):
+    """
+    The blocks of a course that a user can see, in courseware order.
+    """
+    def __init__(self, course_key, root, blocks):
+        self.course_key = course_key
+        self.root = root
+        self.blocks = blocks
+
+    def _outline_block(self, key):
+        """
+        Return the OutlineBlock for the block stored under ``key``.
+        """
+        location = UsageKey.from_string(key).map_into_course(self.course_key)
+        return OutlineBlock(location, self.blocks[key])
+
+    def get_root(self):
+        """
+        Return the course's OutlineBlock.
+        """
+        return self._outline_block(self.root)
+
+    def get_children(self, block):
+        """
+        Return the OutlineBlocks of the children of ``block`` that the user can see.
+        """
+        return [self._outline_block(child) for child in block.child_keys if child in self.blocks]
+
+
+def transform_block_tree(block_tree, context, transformers=DEFAULT_TRANSFORMERS):
+    """
+    Return the UserBlockTree of ``block_tree`` for the user of ``context``.
+    """
+    transformers = [transformer_class() for transformer_class in transformers]
+    for transformer in transformers:
+        transformer.prepare(context, block_tree)
+
+    blocks = {}
+    stack = [block_tree.root]
+    while stack:
+        key = stack.pop()
+        entry = dict(block_tree.blocks[key])
+        if all(transformer.transform_block(context, entry) for transformer in transformers):
+            blocks[key] = entry
+            stack.extend(reversed(entry['children']))
+    return UserBlockTree(block_tree.course_key, block_tree.root, blocks)
+
+
+def get_loadable_blocks(block_tree, context, keys, transformers=LOAD_ACCESS_TRANSFORMERS):
+    """
+    Return the user's copies of the index entries of the blocks stored under ``keys``
+    that the user of ``context`` can load, paired with their keys, in the order of ``keys``.
+
+    Unlike transform_block_tree, each block is checked on its own, as
+    has_access checks a block without looking at its ancestors: the fields
+    that ancestors pass down (start, visible_to_staff_only and group access)
+    are already part of its entry.
+    """
+    transformers = [transformer_class() for transformer_class in transformers]
+    for transformer in transformers:
+        transformer.prepare(context, block_tree)
+
+    entries = []
+    for key in keys:
+        entry = dict(block_tree.blocks[key])
+        if all(transformer.transform_block(context, entry) for transformer in transformers):
+            entries.append((key, entry))
+    return entries
+
+
+def get_user_block_tree(user, course, request=None):
+    """
+    Return the UserBlockTree of ``course`` (a descriptor) for ``user``.
+
+    Returns None if outlines shouldn't be computed from the course's block
+    tree index: if that is disabled, if the index is missing or out of date,
+    or if the course has blocks whose children depend on the user's state
+    (such as randomized content blocks).
+    """
+    if not settings.FEATURES.get('ENABLE_PRECOMPUTED_COURSE_OUTLINES', False):
+        return None
+
+    block_tree = CourseStructure.get_block_tree(course.id)
+    if block_tree is None or not block_tree.is_current_for(course):
+        return None
+    if any(
+            entry['has_dynamic_children'] and entry['block_type'] != 'split_test'
+            for entry in block_tree.blocks.itervalues()
+    ):
+        return None
+
+    return transform_block_tree(block_tree, TransformContext(user, course, request))
@@ -2,6 +2,7 @@
 from __future__ import division
 from collections import defaultdict
 from functools import partial
+from itertools import islice
 import json
 import random
 import logging
@@ -13,9 +14,10 @@ from django.test.client import RequestFactory
 from django.core.cache import cache
 
 import dogstats_wrapper as dog_stats_api
+from lazy import lazy
 
 from courseware import courses
-from courseware.model_data import FieldDataCache, ScoresClient
+from courseware.model_data import FieldDataCache, FieldDataPrefetcher, ScoresClient
 from student.models import anonymous_id_for_user
 from util.module_utils import yield_dynamic_descriptor_descendants
 from xmodule import graders
@@ -24,6 +26,9 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from .models import StudentModule
 from .module_render import get_module_for_descriptor
+from .subsection_grades import (
+    SubsectionScoreStore, entry_usage_key, has_unstarted_blocks, persistent_scores_enabled, score_entry
+)
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
@@ -32,6 +37,9 @@ from openedx.core.djangoapps.signals.signals import GRADES_UPDATED
 
 log = logging.getLogger("edx.courseware")
 
+# The number of students whose grading state iterate_grades_for loads together
+GRADING_PREFETCH_BATCH_SIZE = 50
+
 
 class MaxScoresCache(object):
     """
@@ -202,6 +210,87 @@ def field_data_cache_for_grading(course, user):
     )
 
 
+class StudentScoringState(object):
+    """
+    The state needed to score a student's problems: their FieldDataCache, a
+    ScoresClient, their submissions API scores and the course's MaxScoresCache.
+
+    Each piece is only loaded when first used, so that grading a student whose
+    subsection scores are all stored doesn't touch courseware state at all.
+    """
+    def __init__(self, student, course, field_data_cache=None, scores_client=None):
+        self.student = student
+        self.course = course
+        self._field_data_cache = field_data_cache
+        self._scores_client = scores_client
+
+    @lazy
+    def field_data_cache(self):
+        """The FieldDataCache for grading the student."""
+        if self._field_data_cache is None:
+            with manual_transaction():
+                self._field_data_cache = field_data_cache_for_grading(self.course, self.student)
+        return self._field_data_cache
+
+    @lazy
+    def scores_client(self):
+        """A ScoresClient built from the FieldDataCache."""
+        if self._scores_client is None:
+            self._scores_client = ScoresClient.from_field_data_cache(self.field_data_cache)
+        return self._scores_client
+
+    @lazy
+    def submissions_scores(self):
+        """
+        Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
+        scores that were registered with the submissions API, which for the moment
+        means only openassessment (edx-ora2)
+        """
+        return sub_api.get_scores(
+            self.course.id.to_deprecated_string(), anonymous_id_for_user(self.student, self.course.id)
+        )
+
+    @lazy
+    def max_scores_cache(self):
+        """The MaxScoresCache for the course, populated for the student's scorable locations."""
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        # For the moment, we have to get scorable_locations from field_data_cache
+        # and not from scores_client, because scores_client is ignorant of things
+        # in the submissions API. As a further refactoring step, submissions should
+        # be hidden behind the ScoresClient.
+        max_scores_cache.fetch_from_remote(self.field_data_cache.scorable_locations)
+        return max_scores_cache
+
+    def has_score(self, location):
+        """Return True if the student has a score for ``location`` from either source."""
+        return location.to_deprecated_string() in self.submissions_scores or location in self.scores_client
+
+    def push_to_remote(self):
+        """Push any new max scores to the remote cache, if any scoring was done."""
+        if 'max_scores_cache' in self.__dict__:
+            self.max_scores_cache.push_to_remote()
+
+
+def score_entries(student, descendants, module_creator, scoring_state):
+    """
+    Score each of ``descendants`` for ``student``, returning a list of score
+    entries as described in `courseware.subsection_grades`.
+    """
+    entries = []
+    for descriptor in descendants:
+        (correct, total) = get_score(
+            student,
+            descriptor,
+            module_creator,
+            scoring_state.scores_client,
+            scoring_state.submissions_scores,
+            scoring_state.max_scores_cache,
+        )
+        weighted = descriptor.location.to_deprecated_string() not in scoring_state.submissions_scores
+        entries.append(score_entry(descriptor, correct, total, weighted))
+    return entries
+
+
 def answer_distributions(course_key):
     """
     Given a course_key, return answer distributions in the form of a dictionary
@@ -339,22 +428,8 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
 
     More information on the format is in the docstring for CourseGrader.
     """
-    if field_data_cache is None:
-        with manual_transaction():
-            field_data_cache = field_data_cache_for_grading(course, student)
-    if scores_client is None:
-        scores_client = ScoresClient.from_field_data_cache(field_data_cache)
-
-    # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
-    # scores that were registered with the submissions API, which for the moment
-    # means only openassessment (edx-ora2)
-    submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
-    max_scores_cache = MaxScoresCache.create_for_course(course)
-    # For the moment, we have to get scorable_locations from field_data_cache
-    # and not from scores_client, because scores_client is ignorant of things
-    # in the submissions API. As a further refactoring step, submissions should
-    # be hidden behind the ScoresClient.
-    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+    scoring_state = StudentScoringState(student, course, field_data_cache, scores_client)
+    stored_scores = SubsectionScoreStore.for_grading(student, request, course)
 
     grading_context = course.grading_context
     raw_scores = []
@@ -367,52 +442,29 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
         for section in sections:
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
+            section_key = section_descriptor.location
 
             # some problems have state that is updated independently of interaction
             # with the LMS, so they need to always be scored. (E.g. foldit.,
             # combinedopenended)
-            should_grade_section = any(
+            always_recalculate = any(
                 descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
             )
+            use_stored_scores = stored_scores is not None and not always_recalculate
 
-            # If there are no problems that always have to be regraded, check to
-            # see if any of our locations are in the scores from the submissions
-            # API. If scores exist, we have to calculate grades for this section.
-            if not should_grade_section:
-                should_grade_section = any(
-                    descriptor.location.to_deprecated_string() in submissions_scores
-                    for descriptor in section['xmoduledescriptors']
-                )
-
-            if not should_grade_section:
-                should_grade_section = any(
-                    descriptor.location in scores_client
-                    for descriptor in section['xmoduledescriptors']
-                )
+            if use_stored_scores and stored_scores.has(section_key):
+                entries = stored_scores.get(section_key)
+            else:
+                entries = _section_score_entries(student, request, course, section, scoring_state, always_recalculate)
+                if use_stored_scores and not has_unstarted_blocks(section_descriptor):
+                    stored_scores.set(section_key, entries)
 
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
-            if should_grade_section:
+            if entries is not None:
                 scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    return get_module_for_descriptor(
-                        student, request, descriptor, field_data_cache, course.id, course=course
-                    )
-
-                descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
-                for module_descriptor in descendants:
-                    (correct, total) = get_score(
-                        student,
-                        module_descriptor,
-                        create_module,
-                        scores_client,
-                        submissions_scores,
-                        max_scores_cache,
-                    )
+                for entry in entries:
+                    correct, total = entry['earned'], entry['possible']
                     if correct is None and total is None:
                         continue
 
@@ -422,7 +474,7 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
                         else:
                             correct = total
 
-                    graded = module_descriptor.graded
+                    graded = entry['graded']
                     if not total > 0:
                         # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
                         graded = False
@@ -432,8 +484,8 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
                             correct,
                             total,
                             graded,
-                            module_descriptor.display_name_with_default,
-                            module_descriptor.location
+                            entry['display_name'],
+                            entry_usage_key(course.id, entry['location'])
                         )
                     )
 
@@ -470,11 +522,38 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
         # so grader can be double-checked
         grade_summary['raw_scores'] = raw_scores
 
-    max_scores_cache.push_to_remote()
+    scoring_state.push_to_remote()
 
     return grade_summary
 
 
+def _section_score_entries(student, request, course, section, scoring_state, always_recalculate):
+    """
+    Compute the score entries for the graded section described by ``section``
+    (an entry of the course's grading context), or return None if the student
+    has no scores in it.
+    """
+    # If there are no problems that always have to be regraded, check to
+    # see if any of our locations are in the scores from the submissions
+    # API or from the courseware state.
+    should_grade_section = always_recalculate or any(
+        scoring_state.has_score(descriptor.location) for descriptor in section['xmoduledescriptors']
+    )
+    if not should_grade_section:
+        return None
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(
+            student, request, descriptor, scoring_state.field_data_cache, course.id, course=course
+        )
+
+    descendants = yield_dynamic_descriptor_descendants(section['section_descriptor'], student.id, create_module)
+    return score_entries(student, descendants, create_module, scoring_state)
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -560,13 +639,8 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
 
         course_module = getattr(course_module, '_x_module', course_module)
 
-    submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
-    max_scores_cache = MaxScoresCache.create_for_course(course)
-    # For the moment, we have to get scorable_locations from field_data_cache
-    # and not from scores_client, because scores_client is ignorant of things
-    # in the submissions API. As a further refactoring step, submissions should
-    # be hidden behind the ScoresClient.
-    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+    scoring_state = StudentScoringState(student, course, field_data_cache, scores_client)
+    stored_scores = SubsectionScoreStore.for_grading(student, request, course)
 
     chapters = []
     locations_to_children = defaultdict(list)
@@ -587,20 +661,36 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
                 graded = section_module.graded
                 scores = []
 
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendants(
-                        section_module, student.id, module_creator
-                ):
-                    locations_to_children[module_descriptor.parent].append(module_descriptor.location)
-                    (correct, total) = get_score(
-                        student,
-                        module_descriptor,
-                        module_creator,
-                        scores_client,
-                        submissions_scores,
-                        max_scores_cache,
+                # Untouched sections are stored without their entries, so they
+                # have to be walked to list their problems.
+                entries = None
+                if stored_scores is not None and stored_scores.has(section_module.location):
+                    entries = stored_scores.get(section_module.location)
+
+                if entries is None:
+                    descendants = list(yield_dynamic_descriptor_descendants(
+                        section_module, student.id, section_module.xmodule_runtime.get_module
+                    ))
+                    entries = score_entries(
+                        student, descendants, section_module.xmodule_runtime.get_module, scoring_state
                     )
+                    # Only store sections the student has interacted with, and
+                    # which don't always have to be rescored or have blocks that
+                    # haven't started yet, so that grading from stored scores
+                    # gives the same results as computing them.
+                    if (
+                            stored_scores is not None and
+                            not any(descriptor.always_recalculate_grades for descriptor in descendants) and
+                            any(scoring_state.has_score(descriptor.location) for descriptor in descendants) and
+                            not has_unstarted_blocks(section_module)
+                    ):
+                        stored_scores.set(section_module.location, entries)
+
+                for entry in entries:
+                    location = entry_usage_key(course.id, entry['location'])
+                    if entry['parent'] is not None:
+                        locations_to_children[entry_usage_key(course.id, entry['parent'])].append(location)
+                    (correct, total) = (entry['earned'], entry['possible'])
                     if correct is None and total is None:
                         continue
 
@@ -608,12 +698,12 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
                         correct,
                         total,
                         graded,
-                        module_descriptor.display_name_with_default,
-                        module_descriptor.location
+                        entry['display_name'],
+                        location
                     )
 
                     scores.append(weighted_location_score)
-                    locations_to_weighted_scores[module_descriptor.location] = weighted_location_score
+                    locations_to_weighted_scores[location] = weighted_location_score
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -637,7 +727,7 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
             'sections': sections
         })
 
-    max_scores_cache.push_to_remote()
+    scoring_state.push_to_remote()
 
     return ProgressSummary(chapters, locations_to_weighted_scores, locations_to_children)
 
@@ -767,7 +857,7 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     else:
         course = course_or_id
 
-    for student in students:
+    for student, prefetcher in _students_with_prefetched_field_data(course, students):
         with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
             try:
                 request = _get_mock_request(student)
@@ -776,7 +866,14 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
                 # It's not pretty, but untangling that is currently beyond the
                 # scope of this feature.
                 request.session = {}
-                gradeset = grade(student, request, course, keep_raw_scores)
+                if prefetcher is not None:
+                    gradeset = grade(
+                        student, request, course, keep_raw_scores,
+                        field_data_cache=prefetcher.field_data_cache_for(student),
+                        scores_client=prefetcher.scores_client_for(student),
+                    )
+                else:
+                    gradeset = grade(student, request, course, keep_raw_scores)
                 yield student, gradeset, ""
             except Exception as exc:  # pylint: disable=broad-except
                 # Keep marching on even if this student couldn't be graded for
@@ -791,6 +888,38 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
                 yield student, {}, exc.message
 
 
+def _students_with_prefetched_field_data(course, students):
+    """
+    Yield each of ``students`` with the FieldDataPrefetcher holding their
+    grading state, which is loaded in bulk for GRADING_PREFETCH_BATCH_SIZE
+    students at a time.
+
+    When subsection scores are persisted most students don't need their state
+    loaded at all, so nothing is prefetched and the prefetcher is None.
+    """
+    if persistent_scores_enabled():
+        for student in students:
+            yield student, None
+        return
+
+    students = iter(students)
+    descriptor_filter = partial(descriptor_affects_grading, course.block_types_affecting_grading)
+    while True:
+        batch = list(islice(students, GRADING_PREFETCH_BATCH_SIZE))
+        if not batch:
+            return
+        try:
+            prefetcher = FieldDataPrefetcher.for_descriptor_descendents(
+                course.id, batch, [course], descriptor_filter=descriptor_filter
+            )
+        except Exception:  # pylint: disable=broad-except
+            # Each student's state will be loaded when they are graded instead.
+            log.exception(u"Cannot prefetch grading state for course %s", course.id)
+            prefetcher = None
+        for student in batch:
+            yield student, prefetcher
+
+
 def _get_mock_request(student):
     """
     Make a fake request because grading code expects to be able to look at
@@ -9,6 +9,9 @@ Classes to provide the LMS runtime data storage to XBlocks.
 :class:`FieldDataCache`: A object which provides a read-through prefetch cache
     of data to support XBlock fields within a limited set of scopes.
 
+:class:`FieldDataPrefetcher`: Loads the data for many users at once, and hands
+    out a :class:`~FieldDataCache` for each of them.
+
 The remaining classes in this module provide read-through prefetch cache implementations
 for specific scopes. The individual classes provide the knowledge of what are the essential
 pieces of information for each scope, and thus how to cache, prefetch, and create new field data
@@ -21,10 +24,14 @@ UserInfoCache: A cache for Scope.user_info
 DjangoOrmFieldCache: A base-class for single-row-per-field caches.
 """
 
+import copy
 import json
 from abc import abstractmethod, ABCMeta
 from collections import defaultdict, namedtuple
+from itertools import groupby
+from operator import attrgetter
 from .models import (
+    chunks,
     StudentModule,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
@@ -72,6 +79,30 @@ def _all_usage_keys(descriptors, aside_types):
     return usage_ids
 
 
+def _child_descriptors(descriptor, depth, descriptor_filter):
+    """
+    Return a list of all child descriptors down to the specified depth
+    that match the descriptor filter. Includes `descriptor`
+
+    descriptor: The parent to search inside
+    depth: The number of levels to descend, or None for infinite depth
+    descriptor_filter(descriptor): A function that returns True
+        if descriptor should be included in the results
+    """
+    if descriptor_filter(descriptor):
+        descriptors = [descriptor]
+    else:
+        descriptors = []
+
+    if depth is None or depth > 0:
+        new_depth = depth - 1 if depth is not None else depth
+
+        for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+            descriptors.extend(_child_descriptors(child, new_depth, descriptor_filter))
+
+    return descriptors
+
+
 def _all_block_types(descriptors, aside_types):
     """
     Return a set of all block_types for the supplied `descriptors` and for
@@ -177,7 +208,16 @@ class DjangoOrmFieldCache(object):
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
         """
-        for field_object in self._read_objects(fields, xblocks, aside_types):
+        self.add_field_objects(self._read_objects(fields, xblocks, aside_types))
+
+    def add_field_objects(self, field_objects):
+        """
+        Add already loaded django model objects to this cache.
+
+        Arguments:
+            field_objects: Django model instances that store the data for fields in this cache
+        """
+        for field_object in field_objects:
             self._cache[self._cache_key_for_field_object(field_object)] = field_object
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
@@ -373,6 +413,15 @@ class UserStateCache(object):
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
 
+    def add_block_states(self, block_states):
+        """
+        Add already loaded state to this cache.
+
+        Arguments:
+            block_states (dict): A dict mapping UsageKeys to the stored state dict of that block.
+        """
+        self._cache.update(block_states)
+
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
         """
@@ -752,31 +801,8 @@ class FieldDataCache(object):
                 should be cached
         """
 
-        def get_child_descriptors(descriptor, depth, descriptor_filter):
-            """
-            Return a list of all child descriptors down to the specified depth
-            that match the descriptor filter. Includes `descriptor`
-
-            descriptor: The parent to search inside
-            depth: The number of levels to descend, or None for infinite depth
-            descriptor_filter(descriptor): A function that returns True
-                if descriptor should be included in the results
-            """
-            if descriptor_filter(descriptor):
-                descriptors = [descriptor]
-            else:
-                descriptors = []
-
-            if depth is None or depth > 0:
-                new_depth = depth - 1 if depth is not None else depth
-
-                for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
-                    descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
-
-            return descriptors
-
         with modulestore().bulk_operations(descriptor.location.course_key):
-            descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
+            descriptors = _child_descriptors(descriptor, depth, descriptor_filter)
 
         self.add_descriptors_to_cache(descriptors)
 
@@ -798,7 +824,8 @@ class FieldDataCache(object):
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
         return cache
 
-    def _fields_to_cache(self, descriptors):
+    @staticmethod
+    def _fields_to_cache(descriptors):
         """
         Returns a map of scopes to fields in that scope that should be cached
         """
@@ -983,6 +1010,14 @@ class ScoresClient(object):
             )
         return self._locations_to_scores.get(location)
 
+    def set_scores(self, locations_to_scores):
+        """
+        Use already fetched scores, as a dict mapping locations (with full course
+        run information) to Scores, instead of calling fetch_scores().
+        """
+        self._locations_to_scores.update(locations_to_scores)
+        self._has_fetched = True
+
     @classmethod
     def from_field_data_cache(cls, fd_cache):
         """Create a ScoresClient from a populated FieldDataCache."""
@@ -991,6 +1026,151 @@ class ScoresClient(object):
         return client
 
 
+class FieldDataPrefetcher(object):
+    """
+    Loads the field data of many users for the same descriptors in bulk, and
+    hands out a FieldDataCache (and ScoresClient) per user that is populated
+    from the prefetched data instead of querying for it.
+
+    Building a FieldDataCache for each user separately makes a query per scope
+    per user. Here Scope.user_state and Scope.preferences are loaded for
+    ``USER_CHUNK_SIZE`` users at a time, Scope.user_info likewise, and
+    Scope.user_state_summary, which doesn't depend on the user, just once.
+
+    The prefetched data itself is never modified: each FieldDataCache gets
+    its own copy, and writes through it are saved as usual. It is only valid
+    for the descriptors it was created with.
+    """
+    USER_CHUNK_SIZE = 250
+
+    def __init__(self, descriptors, course_id, users, asides=None):
+        """
+        Arguments
+        descriptors: A list of XModuleDescriptors.
+        course_id: The id of the current course
+        users: The users to prefetch data for
+        asides: The list of aside types to load, or None to prefetch no asides.
+        """
+        assert isinstance(course_id, CourseKey)
+        self.course_id = course_id
+        self.descriptors = descriptors
+        self.asides = [] if asides is None else asides
+        self.user_ids = set(user.id for user in users if user.is_authenticated())
+        self.scorable_locations = set(desc.location for desc in descriptors if desc.has_score)
+
+        self._user_states = defaultdict(dict)
+        self._scores = defaultdict(dict)
+        self._preferences = defaultdict(list)
+        self._user_info = defaultdict(list)
+        self._user_state_summary = []
+
+        fields = FieldDataCache._fields_to_cache(descriptors)  # pylint: disable=protected-access
+        user_chunks = list(chunks(self.user_ids, self.USER_CHUNK_SIZE))
+        if Scope.user_state in fields or self.scorable_locations:
+            for user_ids in user_chunks:
+                self._read_user_states(user_ids)
+        if Scope.user_state_summary in fields:
+            self._user_state_summary = list(UserStateSummaryCache(course_id)._read_objects(  # pylint: disable=protected-access
+                fields[Scope.user_state_summary], descriptors, self.asides
+            ))
+        if Scope.preferences in fields:
+            for user_ids in user_chunks:
+                preferences = XModuleStudentPrefsField.objects.chunked_filter(
+                    'module_type__in',
+                    _all_block_types(descriptors, self.asides),
+                    student__in=user_ids,
+                    field_name__in=set(field.name for field in fields[Scope.preferences]),
+                )
+                for field_object in preferences:
+                    self._preferences[field_object.student_id].append(field_object)
+        if Scope.user_info in fields:
+            for user_ids in user_chunks:
+                user_info = XModuleStudentInfoField.objects.filter(
+                    student__in=user_ids,
+                    field_name__in=set(field.name for field in fields[Scope.user_info]),
+                )
+                for field_object in user_info:
+                    self._user_info[field_object.student_id].append(field_object)
+
+    @classmethod
+    def for_descriptor_descendents(cls, course_id, users, descriptors, depth=None,
+                                   descriptor_filter=lambda descriptor: True, asides=None):
+        """
+        Prefetch the data of ``users`` for ``descriptors`` and their descendants,
+        as selected by ``depth`` and ``descriptor_filter`` (see
+        `FieldDataCache.cache_for_descriptor_descendents`).
+        """
+        all_descriptors = []
+        with modulestore().bulk_operations(course_id):
+            for descriptor in descriptors:
+                all_descriptors.extend(_child_descriptors(descriptor, depth, descriptor_filter))
+        return cls(all_descriptors, course_id, users, asides=asides)
+
+    @donottrack(StudentModule)
+    def _read_user_states(self, user_ids):
+        """
+        Load the StudentModules of ``user_ids`` for our descriptors, keeping
+        their state as UserStateCache would, and their scores as ScoresClient would.
+        """
+        usage_keys = _all_usage_keys(self.descriptors, self.asides)
+        course_key_func = attrgetter('course_key')
+        for course_key, course_usage_keys in groupby(sorted(usage_keys, key=course_key_func), course_key_func):
+            student_modules = StudentModule.objects.chunked_filter(
+                'module_state_key__in',
+                list(course_usage_keys),
+                student_id__in=user_ids,
+                course_id=course_key,
+            )
+            for student_module in student_modules:
+                usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+                if usage_key in self.scorable_locations:
+                    self._scores[student_module.student_id][usage_key] = ScoresClient.Score(
+                        student_module.grade, student_module.max_grade
+                    )
+                if student_module.state is None:
+                    continue
+                state = json.loads(student_module.state)
+                # An empty state has been deleted, and is treated as if it doesn't exist.
+                if state != {}:
+                    self._user_states[student_module.student_id][usage_key] = state
+
+    def field_data_cache_for(self, user):
+        """
+        Return a FieldDataCache for ``user`` and our descriptors.
+
+        Users whose data wasn't prefetched get a FieldDataCache that loads it as usual.
+        """
+        if user.id not in self.user_ids:
+            return FieldDataCache(self.descriptors, self.course_id, user, asides=self.asides)
+
+        field_data_cache = FieldDataCache([], self.course_id, user, asides=self.asides)
+        field_data_cache.scorable_locations.update(self.scorable_locations)
+        field_data_cache.cache[Scope.user_state].add_block_states({
+            usage_key: dict(state) for usage_key, state in self._user_states[user.id].iteritems()
+        })
+        field_data_cache.cache[Scope.user_state_summary].add_field_objects(
+            copy.copy(field_object) for field_object in self._user_state_summary
+        )
+        field_data_cache.cache[Scope.preferences].add_field_objects(
+            copy.copy(field_object) for field_object in self._preferences[user.id]
+        )
+        field_data_cache.cache[Scope.user_info].add_field_objects(
+            copy.copy(field_object) for field_object in self._user_info[user.id]
+        )
+        return field_data_cache
+
+    def scores_client_for(self, user):
+        """
+        Return a ScoresClient for ``user`` and our scorable descriptors.
+        """
+        scores_client = ScoresClient(self.course_id, user.id)
+        if user.id in self.user_ids:
+            scores_client.set_scores(self._scores[user.id])
+        else:
+            scores_client.fetch_scores(self.scorable_locations)
+        return scores_client
+
+
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 @donottrack(StudentModule)
 def set_score(user_id, usage_key, score, max_score):
@@ -305,6 +305,32 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+class StudentSubsectionScore(TimeStampedModel):
+    """
+    The scores a student earned on the scorable blocks within one subsection,
+    as computed by the grading code. Rows are only trusted while their
+    ``grading_version`` matches the current content and grading policy of the
+    course; see `courseware.subsection_grades`.
+    """
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    usage_key = LocationKeyField(max_length=255)
+
+    # identifies the course content and grading policy the scores were computed against
+    grading_version = models.CharField(max_length=255)
+
+    # JSON list of per-block score entries, in courseware order
+    scores = models.TextField(default='[]')
+
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    def __unicode__(self):
+        return u"[StudentSubsectionScore] {}: {} {} ({})".format(
+            self.user_id, self.course_id, self.usage_key, self.grading_version  # pylint: disable=no-member
+        )
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
@@ -0,0 +1,353 @@
+"""
+Persisted, per-student subsection scores.
+
+Computing a grade requires loading every graded descriptor in a course and the
+student's state for each of them. Instead, once the scores for a subsection
+have been computed they are stored in a StudentSubsectionScore row, and kept
+up to date incrementally as SCORE_CHANGED signals arrive. Grading then only
+recomputes the subsections whose rows are missing or stale.
+
+A row is stale when its ``grading_version`` no longer matches the course: the
+version changes whenever the course content is published or its grading
+policy is edited, which forces a full recompute. A student's rows for a course
+are also deleted when the student's state for a block is deleted (e.g. when
+staff reset it), and when the student's cohort or experiment groups change,
+since those decide which blocks the student is graded on. Which blocks the
+student can load also changes when they start, so subsections with blocks
+that haven't started yet aren't stored at all.
+
+Each row holds a list of entries, one for the subsection and each of its
+descendants, in the order the grading code visits them::
+
+    {
+        'location': <usage key string>,
+        'parent': <usage key string of the block's parent>,
+        'display_name': <display name>,
+        'graded': <the block's own graded flag>,
+        'weight': <the weight applied to the block's raw score, or None>,
+        'earned': <weighted points earned, or None if the block isn't scored>,
+        'possible': <weighted points possible, or None if the block isn't scored>,
+    }
+
+A row whose scores are ``null`` records that the student has not interacted
+with the subsection at all.
+"""
+from datetime import datetime
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from pytz import UTC
+
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
+
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.user_api.models import UserCourseTag
+
+from .models import SCORE_CHANGED, StudentModule, StudentSubsectionScore
+
+
+log = logging.getLogger("edx.courseware")
+
+
+def persistent_scores_enabled():
+    """
+    Return True if subsection scores should be read from and written to the database.
+    """
+    return (
+        settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_SCORES', False) and
+        not settings.GENERATE_PROFILE_SCORES
+    )
+
+
+def grading_version(course):
+    """
+    Return a string identifying the published content and grading policy of ``course``.
+    """
+    edited_on = course.subtree_edited_on.isoformat() if course.subtree_edited_on else u''
+    policy = json.dumps(course.grading_policy, sort_keys=True)
+    return hashlib.sha1(u"{}|{}".format(edited_on, policy).encode('utf-8')).hexdigest()
+
+
+def score_entry(descriptor, earned, possible, weighted=True):
+    """
+    Return the stored representation of ``descriptor`` and its score.
+
+    ``weighted`` is False for scores that are used as they are, without
+    applying the block's weight (as is the case for scores from the
+    submissions API).
+    """
+    return {
+        'location': unicode(descriptor.location),
+        'parent': unicode(descriptor.parent) if descriptor.parent else None,
+        'display_name': descriptor.display_name_with_default,
+        'graded': descriptor.graded,
+        'weight': descriptor.weight if weighted else None,
+        'earned': earned,
+        'possible': possible,
+    }
+
+
+def has_unstarted_blocks(block):
+    """
+    Return True if ``block`` or one of its descendants has a start date in the future.
+
+    Descendants are loaded through the runtime, so that the ones the student
+    can't load yet are included.
+    """
+    now = datetime.now(UTC)
+    blocks = [block]
+    while blocks:
+        block = blocks.pop()
+        start = getattr(block, 'start', None)
+        if start is not None and start > now:
+            return True
+        if block.has_children:
+            blocks.extend(block.runtime.get_block(child) for child in block.children)
+    return False
+
+
+def entry_usage_key(course_key, usage_key_string):
+    """
+    Return the UsageKey for a stored usage key string, in ``course_key``'s run.
+    """
+    return UsageKey.from_string(usage_key_string).map_into_course(course_key)
+
+
+class SubsectionScoreStore(object):
+    """
+    The stored subsection scores of one student in one course.
+
+    All of the student's rows for the course are fetched in a single query.
+    Rows computed against a different grading version are ignored, and
+    overwritten when the subsection is next computed.
+    """
+    def __init__(self, student, course, read_only=False):
+        self.student = student
+        self.course = course
+        self.read_only = read_only
+        self.version = grading_version(course)
+        self._rows = {
+            row.usage_key.map_into_course(course.id): row
+            for row in StudentSubsectionScore.objects.filter(user=student, course_id=course.id)
+        }
+
+    @classmethod
+    def for_grading(cls, student, request, course):
+        """
+        Return the store to use when grading ``student``, or None if persistent scores are disabled.
+
+        Scores computed on behalf of another user (e.g. staff viewing a student's
+        progress page) are read but never written, since they are computed with
+        that user's permissions.
+        """
+        if not persistent_scores_enabled() or not student.is_authenticated():
+            return None
+        requesting_user = getattr(request, 'user', None)
+        read_only = requesting_user is not None and requesting_user.id != student.id
+        return cls(student, course, read_only=read_only)
+
+    def has(self, usage_key):
+        """
+        Return True if there is a current row for the subsection ``usage_key``.
+        """
+        row = self._rows.get(usage_key)
+        return row is not None and row.grading_version == self.version
+
+    def get(self, usage_key):
+        """
+        Return the stored entries for the subsection ``usage_key``.
+
+        Returns None if the student hasn't interacted with the subsection.
+        Raises KeyError if there is no current row for it.
+        """
+        if not self.has(usage_key):
+            raise KeyError(usage_key)
+        return json.loads(self._rows[usage_key].scores)
+
+    def set(self, usage_key, entries):
+        """
+        Store ``entries`` (or None, for an untouched subsection) for the subsection ``usage_key``.
+        """
+        if self.read_only:
+            return
+        scores = json.dumps(entries)
+        row = self._rows.get(usage_key)
+        if row is None:
+            try:
+                row, created = StudentSubsectionScore.objects.get_or_create(
+                    user=self.student,
+                    course_id=self.course.id,
+                    usage_key=usage_key,
+                    defaults={'grading_version': self.version, 'scores': scores},
+                )
+            except IntegrityError:
+                # A concurrent request stored this subsection first; its scores are just as good.
+                log.info(u"Subsection scores for %s were stored concurrently", usage_key)
+                return
+            self._rows[usage_key] = row
+            if created:
+                return
+        row.grading_version = self.version
+        row.scores = scores
+        row.save()
+
+
+def update_stored_score(user_id, course_key, usage_key, points_earned, points_possible):
+    """
+    Apply a new raw score for ``usage_key`` to the student's stored subsection scores.
+
+    The entry for the block is updated in place. If the block isn't in any
+    stored subsection, the subsections recorded as untouched are discarded,
+    since one of them now has a score and must be recomputed, and so is the
+    stored subsection that contains the block, if any, as it was computed
+    while the student couldn't load the block.
+    """
+    # Imported here to avoid a circular import with courseware.grades.
+    from .grades import weighted_score
+
+    rows = StudentSubsectionScore.objects.filter(user__id=user_id, course_id=course_key)
+    location = unicode(usage_key)
+    for row in rows:
+        entries = json.loads(row.scores)
+        for entry in entries or []:
+            if entry['location'] == location and entry['earned'] is not None:
+                earned, possible = weighted_score(points_earned, points_possible, entry['weight'])
+                if not possible > 0:
+                    # The grader treats this block differently when it's worth nothing,
+                    # so recompute the whole subsection next time.
+                    row.delete()
+                    return
+                entry['earned'], entry['possible'] = earned, possible
+                row.scores = json.dumps(entries)
+                row.save()
+                return
+
+    rows.filter(scores='null').delete()
+    ancestors = _ancestor_locations(usage_key)
+    if ancestors:
+        rows.filter(usage_key__in=ancestors).delete()
+
+
+def _ancestor_locations(usage_key):
+    """
+    Return the locations of the ancestors of ``usage_key``, or an empty list if it isn't in the modulestore.
+    """
+    store = modulestore()
+    locations = []
+    try:
+        location = store.get_parent_location(usage_key)
+        while location is not None:
+            locations.append(location)
+            location = store.get_parent_location(location)
+    except ItemNotFoundError:
+        pass
+    return locations
+
+
+@receiver(SCORE_CHANGED)
+def score_changed_handler(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Consume signals that indicate score changes, and update the stored
+    subsection scores. See the definition of courseware.models.SCORE_CHANGED
+    for a description of the signal.
+    """
+    if not persistent_scores_enabled():
+        return
+
+    points_possible = kwargs.get('points_possible', None)
+    points_earned = kwargs.get('points_earned', None)
+    user_id = kwargs.get('user_id', None)
+    course_id = kwargs.get('course_id', None)
+    usage_id = kwargs.get('usage_id', None)
+
+    if None in (points_earned, points_possible, user_id, course_id, usage_id):
+        log.error(
+            u"Persistent grades: Required signal parameter is None. "
+            "points_possible: %s, points_earned: %s, user_id: %s, "
+            "course_id: %s, usage_id: %s",
+            points_possible, points_earned, user_id, course_id, usage_id
+        )
+        return
+
+    try:
+        course_key = CourseKey.from_string(course_id)
+        usage_key = UsageKey.from_string(usage_id).map_into_course(course_key)
+    except InvalidKeyError:
+        log.exception(u"Persistent grades: Invalid keys %s, %s", course_id, usage_id)
+        return
+
+    update_stored_score(user_id, course_key, usage_key, points_earned, points_possible)
+
+
+def invalidate_stored_scores(user_ids, course_key):
+    """
+    Delete the stored subsection scores of the users ``user_ids`` in ``course_key``.
+
+    They are recomputed the next time the users are graded.
+    """
+    if not persistent_scores_enabled():
+        return
+    StudentSubsectionScore.objects.filter(user__id__in=list(user_ids), course_id=course_key).delete()
+
+
+@receiver(post_delete, sender=StudentModule)
+def student_module_deleted_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the student's stored scores when their state for a block is
+    deleted, e.g. by `instructor.enrollment.reset_student_attempts`, which
+    doesn't send SCORE_CHANGED.
+    """
+    invalidate_stored_scores([instance.student_id], instance.course_id)
+
+
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def cohort_membership_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate the stored scores of the users who are added to or removed
+    from a cohort, as it may change the content groups they are graded on.
+    """
+    # pylint: disable=unused-argument
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        if action == 'pre_clear':
+            groups = instance.course_groups.all()
+        else:
+            groups = CourseUserGroup.objects.filter(pk__in=pk_set)
+        for group in groups:
+            invalidate_stored_scores([instance.id], group.course_id)
+    else:
+        user_ids = instance.users.values_list('id', flat=True) if action == 'pre_clear' else pk_set
+        invalidate_stored_scores(user_ids, instance.course_id)
+
+
+@receiver(post_save, sender=CourseUserGroupPartitionGroup)
+@receiver(post_delete, sender=CourseUserGroupPartitionGroup)
+def partition_group_changed_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the stored scores of the members of a cohort when the content group it is linked to changes.
+    """
+    try:
+        group = instance.course_user_group
+    except CourseUserGroup.DoesNotExist:
+        # the cohort itself is being deleted
+        return
+    invalidate_stored_scores(group.users.values_list('id', flat=True), group.course_id)
+
+
+@receiver(post_save, sender=UserCourseTag)
+@receiver(post_delete, sender=UserCourseTag)
+def user_course_tag_changed_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the student's stored scores when one of their course tags
+    changes, as the tags record their experiment (split_test) groups.
+    """
+    invalidate_stored_scores([instance.user_id], instance.course_id)
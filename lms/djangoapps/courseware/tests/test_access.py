@@ -8,6 +8,7 @@ import itertools
 import pytz
 
 from django.test import TestCase
+from django.test.client import RequestFactory
 from django.core.urlresolvers import reverse
 from mock import Mock, patch
 from nose.plugins.attrib import attr
@@ -25,6 +26,11 @@ from courseware.tests.factories import (
 )
 from courseware.tests.helpers import LoginEnrollmentTestCase
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
+from openedx.core.djangoapps.user_api.course_tag.api import set_course_tag
+from request_cache.middleware import RequestCache
+from student.roles import CourseStaffRole
 from student.tests.factories import (
     AnonymousUserFactory,
     CourseEnrollmentAllowedFactory,
@@ -35,6 +41,7 @@ from xmodule.course_module import (
     CATALOG_VISIBILITY_ABOUT,
     CATALOG_VISIBILITY_NONE,
 )
+from xmodule.modulestore.django import SignalHandler
 from xmodule.modulestore.tests.factories import CourseFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
@@ -574,3 +581,120 @@ class CourseOverviewAccessTestCase(ModuleStoreTestCase):
         overview = CourseOverview.get_from_id(self.course_default.id)
         with self.assertRaises(ValueError):
             access.has_access(self.user, '_non_existent_action', overview)
+
+
+class AccessCacheTestCase(ModuleStoreTestCase):
+    """
+    Tests for the memoization of has_access decisions.
+    """
+    def setUp(self):
+        super(AccessCacheTestCase, self).setUp()
+        self.course = CourseFactory.create()
+        self.user = UserFactory.create()
+        self.addCleanup(RequestCache.clear_request_cache)
+        self.start_request()
+
+    def start_request(self):
+        """
+        Start handling a new request, as the request cache middleware does.
+        """
+        RequestCache().process_request(RequestFactory().get('/'))
+
+    def count_checks(self):
+        """
+        Return a mock that counts the decisions that are actually computed.
+        """
+        checker = Mock(wraps=access._has_access_course_desc)
+        patcher = patch('courseware.access._has_access_course_desc', checker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return checker
+
+    def test_request_memoization(self):
+        checker = self.count_checks()
+        self.assertTrue(access.has_access(self.user, 'load', self.course))
+        self.assertTrue(access.has_access(self.user, 'load', self.course))
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 2)
+
+        self.start_request()
+        self.assertTrue(access.has_access(self.user, 'load', self.course))
+        self.assertEqual(checker.call_count, 3)
+
+    def test_no_memoization_outside_request(self):
+        RequestCache.clear_request_cache()
+        checker = self.count_checks()
+        access.has_access(self.user, 'load', self.course)
+        access.has_access(self.user, 'load', self.course)
+        self.assertEqual(checker.call_count, 2)
+
+    def test_role_change_invalidates(self):
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        CourseStaffRole(self.course.id).add_users(self.user)
+        self.assertTrue(access.has_access(self.user, 'staff', self.course))
+        CourseStaffRole(self.course.id).remove_users(self.user)
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+
+    def test_masquerade_is_part_of_key(self):
+        staff = StaffFactory(course_key=self.course.id)
+        self.assertTrue(access.has_access(staff, 'staff', self.course))
+        staff.masquerade_settings = {self.course.id: CourseMasquerade(self.course.id, role='student')}
+        self.assertFalse(access.has_access(staff, 'staff', self.course))
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_ACCESS_DECISION_CACHE': True})
+    def test_cross_request_cache(self):
+        checker = self.count_checks()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.start_request()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 1)
+
+        # Roles are checked again once they change.
+        CourseStaffRole(self.course.id).add_users(self.user)
+        self.start_request()
+        self.assertTrue(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 2)
+
+        # So is everything about the course, once it's published.
+        SignalHandler.course_published.send(sender=None, course_key=self.course.id)
+        self.start_request()
+        self.assertTrue(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 3)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_ACCESS_DECISION_CACHE': True})
+    def test_cross_request_cache_partition_groups(self):
+        cohort = CohortFactory(course_id=self.course.id, users=[self.user])
+        checker = self.count_checks()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.start_request()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 1)
+
+        # Decisions are made again once the user's cohort is linked to a content group...
+        link = CourseUserGroupPartitionGroup(course_user_group=cohort, partition_id=0, group_id=1)
+        link.save()
+        self.start_request()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 2)
+
+        # ...or unlinked from it...
+        link.delete()
+        self.start_request()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 3)
+
+        # ...or once the user is assigned to a group of a random partition.
+        set_course_tag(self.user, self.course.id, 'xblock.partition_service.partition_0', '1')
+        self.start_request()
+        self.assertFalse(access.has_access(self.user, 'staff', self.course))
+        self.assertEqual(checker.call_count, 4)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_ACCESS_DECISION_CACHE': True, 'DISABLE_START_DATES': False})
+    def test_cross_request_cache_skips_errors(self):
+        course = CourseFactory.create(start=datetime.datetime.now(pytz.utc) + datetime.timedelta(days=1))
+        checker = self.count_checks()
+        self.assertIsInstance(access.has_access(self.user, 'load', course), access_response.StartDateError)
+        self.start_request()
+        self.assertIsInstance(access.has_access(self.user, 'load', course), access_response.StartDateError)
+        self.assertEqual(checker.call_count, 2)
@@ -6,7 +6,7 @@ from mock import Mock, patch
 from nose.plugins.attrib import attr
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, FieldDataPrefetcher, InvalidScopeError
 from courseware.models import StudentModule
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
@@ -415,3 +415,77 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr('shard_1')
+class TestFieldDataPrefetcher(TestCase):
+    """Tests for loading the field data of many users at once"""
+    def setUp(self):
+        super(TestFieldDataPrefetcher, self).setUp()
+        self.users = []
+        for index in xrange(3):
+            student_module = StudentModuleFactory(
+                state=json.dumps({'a_field': 'value {}'.format(index)}), grade=index, max_grade=2
+            )
+            StudentPrefsFactory.create(student=student_module.student)
+            StudentInfoFactory.create(student=student_module.student)
+            self.users.append(student_module.student)
+        UserStateSummaryFactory.create()
+        self.descriptor = mock_descriptor([
+            mock_field(Scope.user_state, 'a_field'),
+            mock_field(Scope.user_state_summary, 'existing_field'),
+            mock_field(Scope.preferences, 'existing_field'),
+            mock_field(Scope.user_info, 'existing_field'),
+        ])
+        self.descriptor.location = location('usage_id')
+
+        # One query per scope, however many users there are
+        with self.assertNumQueries(4):
+            self.prefetcher = FieldDataPrefetcher([self.descriptor], course_id, self.users)
+
+    def kvs_for(self, user):
+        """Return a DjangoKeyValueStore backed by the prefetched FieldDataCache of `user`"""
+        with self.assertNumQueries(0):
+            return DjangoKeyValueStore(self.prefetcher.field_data_cache_for(user))
+
+    def test_field_data_cache_for(self):
+        for index, user in enumerate(self.users):
+            kvs = self.kvs_for(user)
+            with self.assertNumQueries(0):
+                self.assertEquals(
+                    'value {}'.format(index),
+                    kvs.get(DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field'))
+                )
+                self.assertEquals('old_value', kvs.get(user_state_summary_key('existing_field')))
+                self.assertEquals(
+                    'old_value',
+                    kvs.get(DjangoKeyValueStore.Key(Scope.preferences, user.id, 'mock_problem', 'existing_field'))
+                )
+                self.assertEquals(
+                    'old_value', kvs.get(DjangoKeyValueStore.Key(Scope.user_info, user.id, None, 'existing_field'))
+                )
+
+    def test_writes_do_not_change_prefetched_data(self):
+        user = self.users[0]
+        key = DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field')
+        self.kvs_for(user).set(key, 'new_value')
+        self.kvs_for(user).set(user_state_summary_key('existing_field'), 'new_value')
+        self.assertEquals({'a_field': 'new_value'}, json.loads(StudentModule.objects.get(student=user).state))
+
+        kvs = self.kvs_for(user)
+        self.assertEquals('value 0', kvs.get(key))
+        self.assertEquals('old_value', kvs.get(user_state_summary_key('existing_field')))
+
+    def test_scores_client_for(self):
+        for index, user in enumerate(self.users):
+            with self.assertNumQueries(0):
+                scores_client = self.prefetcher.scores_client_for(user)
+            self.assertEquals((index, 2), scores_client.get(location('usage_id')))
+
+    def test_user_not_prefetched(self):
+        user = UserFactory.create()
+        with self.assertNumQueries(4):
+            field_data_cache = self.prefetcher.field_data_cache_for(user)
+        self.assertFalse(
+            field_data_cache.has(DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field'))
+        )
@@ -2,6 +2,7 @@
 """
 Integration tests for submitting problem responses and getting grades.
 """
+from datetime import datetime, timedelta
 import json
 import os
 from textwrap import dedent
@@ -13,14 +14,18 @@ from django.test import TestCase
 from django.test.client import RequestFactory
 from mock import patch
 from nose.plugins.attrib import attr
+from pytz import UTC
 
 from capa.tests.response_xml_factory import (
     OptionResponseXMLFactory, CustomResponseXMLFactory, SchematicResponseXMLFactory,
     CodeResponseXMLFactory,
 )
 from courseware import grades
-from courseware.models import StudentModule, StudentModuleHistory
+from courseware.bulk_grades import BulkGrader, BulkGradingUnsupported, iterate_bulk_grades_for
+from courseware.models import StudentModule, StudentModuleHistory, StudentSubsectionScore
+from courseware.subsection_grades import grading_version
 from courseware.tests.helpers import LoginEnrollmentTestCase
+from instructor.enrollment import reset_student_attempts
 from lms.djangoapps.lms_xblock.runtime import quote_slashes
 from student.tests.factories import UserFactory
 from student.models import anonymous_id_for_user
@@ -30,6 +35,9 @@ from xmodule.partitions.partitions import Group, UserPartition
 from openedx.core.djangoapps.credit.api import (
     set_credit_requirements, get_credit_requirement_status
 )
+from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort
+from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from openedx.core.djangoapps.credit.models import CreditCourse, CreditProvider
 from openedx.core.djangoapps.user_api.tests.factories import UserCourseTagFactory
 
@@ -558,6 +566,153 @@ class TestCourseGrader(TestSubmittingProblems):
         self.check_grade_percent(0.67)
         self.assertEqual(self.get_grade_summary()['grade'], 'B')
 
+    def stored_homework_scores(self):
+        """
+        Return the stored subsection scores of the student for the homework section.
+        """
+        return StudentSubsectionScore.objects.get(
+            user=self.student_user, course_id=self.course.id, usage_key=self.homework.location
+        )
+
+    def stored_homework_earned(self):
+        """
+        Return the points earned on each homework problem, from the stored subsection scores.
+        """
+        return [
+            entry['earned']
+            for entry in sorted(json.loads(self.stored_homework_scores().scores), key=lambda entry: entry['location'])
+            if entry['earned'] is not None
+        ]
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores(self):
+        """
+        Check that subsection scores are stored, updated incrementally as
+        problems are scored, and then used instead of the courseware state.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.assertEqual(self.stored_homework_earned(), [1.0, 0.0, 0.0])
+
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+        self.assertEqual(self.stored_homework_earned(), [1.0, 1.0, 0.0])
+        with patch('courseware.grades.field_data_cache_for_grading', side_effect=AssertionError('Should not regrade')):
+            self.check_grade_percent(0.67)
+        self.assertEqual(self.score_for_hw('homework'), [1.0, 1.0, 0.0])
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores_untouched_section(self):
+        """
+        Check that a section is recomputed once the student first scores in it.
+        """
+        self.basic_setup()
+        self.check_grade_percent(0)
+        self.assertEqual(self.stored_homework_scores().scores, 'null')
+
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.assertFalse(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+        self.check_grade_percent(0.33)
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores_policy_change(self):
+        """
+        Check that stored scores are recomputed when the grading policy changes.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        old_version = self.stored_homework_scores().grading_version
+
+        self.add_grading_policy({
+            "GRADER": [{
+                "type": "Homework",
+                "min_count": 1,
+                "drop_count": 0,
+                "short_label": "HW",
+                "weight": 1.0
+            }],
+            "GRADE_CUTOFFS": {
+                'A': .9,
+                'B': .5
+            }
+        })
+        self.check_grade_percent(0.33)
+        self.assertEqual(self.get_grade_summary()['grade'], None)
+        self.assertNotEqual(self.stored_homework_scores().grading_version, old_version)
+        self.assertEqual(self.stored_homework_scores().grading_version, grading_version(self.course))
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores_missing_block(self):
+        """
+        Check that a stored section is recomputed when the student scores on a
+        block that wasn't in it, e.g. one that hadn't started when it was computed.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        row = self.stored_homework_scores()
+        location = unicode(self.problem_location('p3'))
+        row.scores = json.dumps([entry for entry in json.loads(row.scores) if entry['location'] != location])
+        row.save()
+
+        self.submit_question_answer('p3', {'2_1': 'Correct'})
+        self.assertFalse(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+        self.check_grade_percent(0.67)
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores_unstarted_block(self):
+        """
+        Check that sections with blocks that haven't started yet aren't stored,
+        as the student's scores in them change when the blocks start.
+        """
+        self.basic_setup()
+        problem = self.store.get_item(self.problem_location('p3'))
+        problem.start = datetime.now(UTC) + timedelta(days=1)
+        self.store.update_item(problem, self.student_user.id)
+        self.refresh_course()
+
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.5)
+        self.assertFalse(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores_deleted_state(self):
+        """
+        Check that stored scores are recomputed when staff delete the student's state for a problem.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        reset_student_attempts(self.course.id, self.student_user, self.problem_location('p1'), delete_module=True)
+        self.assertFalse(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+        self.check_grade_percent(0)
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_PERSISTENT_SUBSECTION_SCORES": True})
+    def test_persistent_subsection_scores_group_change(self):
+        """
+        Check that stored scores are recomputed when the student's cohort or experiment groups change.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        cohort = CohortFactory(course_id=self.course.id)
+        add_user_to_cohort(cohort, self.student_user.username)
+        self.assertFalse(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+        self.check_grade_percent(0.33)
+        self.assertTrue(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+
+        UserCourseTagFactory(
+            user=self.student_user,
+            course_id=self.course.id,
+            key='xblock.partition_service.partition_0',
+            value='0',
+        )
+        self.assertFalse(StudentSubsectionScore.objects.filter(user=self.student_user).exists())
+        self.check_grade_percent(0.33)
+
     def test_submissions_api_overrides_scores(self):
         """
         Check that answering incorrectly is graded properly.
@@ -677,6 +832,89 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.earned_hw_scores(), [1.0, 2.0, 2.0])  # Order matters
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
+    def check_bulk_grades(self):
+        """
+        Assert that bulk grading produces the same grade report values as
+        grading the student on their own.
+        """
+        expected = self.get_grade_summary()
+        other_student = UserFactory.create()
+        results = list(iterate_bulk_grades_for(self.course, [self.student_user, other_student]))
+        self.assertEqual([student for student, __, __ in results], [self.student_user, other_student])
+
+        __, gradeset, err_msg = results[0]
+        self.assertEqual(err_msg, "")
+        self.assertEqual(gradeset['percent'], expected['percent'])
+        self.assertEqual(gradeset['grade'], expected['grade'])
+        self.assertEqual(
+            [(section['label'], section['percent']) for section in gradeset['section_breakdown']],
+            [(section['label'], section['percent']) for section in expected['section_breakdown']],
+        )
+        self.assertEqual(results[1][1]['percent'], 0.0)
+
+    def test_bulk_grades_dropping(self):
+        """
+        Check that bulk grading drops the lowest homework as the grader does.
+        """
+        self.dropping_setup()
+        self.dropping_homework_stage1()
+        self.check_bulk_grades()
+        self.submit_question_answer(self.hw3_names[0], {'2_1': 'Correct'})
+        self.check_bulk_grades()
+
+    def test_bulk_grades_weighted(self):
+        """
+        Check that bulk grading applies problem and section weights.
+        """
+        self.weighted_setup()
+        self.submit_question_answer('H1P1', {'2_1': 'Correct', '2_2': 'Incorrect'})
+        self.submit_question_answer('FinalQuestion', {'2_1': 'Correct', '2_2': 'Correct'})
+        self.check_bulk_grades()
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_MAX_SCORE_CACHE": False})
+    def test_bulk_grades_no_max_score_cache(self):
+        """
+        Check bulk grading of unattempted problems when the max score cache is disabled.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_bulk_grades()
+
+    def test_bulk_grades_content_group(self):
+        """
+        Check that a problem restricted to a content group is left out of the
+        grades of the students outside the group, as in per-student grading.
+        """
+        self.basic_setup()
+        self.course.user_partitions = [
+            UserPartition(0, 'Content Groups', 'Content Groups', [Group(0, 'alpha'), Group(1, 'beta')],
+                          scheme_id='cohort')
+        ]
+        self.course.cohort_config = {'cohorted': True}
+        self.update_course(self.course, self.student_user.id)
+        problem = self.store.get_item(self.problem_location('p3'))
+        problem.group_access = {0: [1]}
+        self.store.update_item(problem, self.student_user.id)
+        self.refresh_course()
+        cohort = CohortFactory(course_id=self.course.id, users=[self.student_user])
+        CourseUserGroupPartitionGroup(course_user_group=cohort, partition_id=0, group_id=0).save()
+
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        with self.assertRaises(BulkGradingUnsupported):
+            BulkGrader(self.course)
+        self.check_bulk_grades()
+        self.assertEqual(self.get_grade_summary()['percent'], 0.5)
+
+    def test_bulk_grades_unsupported_course(self):
+        """
+        Check that courses that can't be graded in bulk are graded one student at a time.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        with patch('courseware.bulk_grades.BulkGrader', side_effect=BulkGradingUnsupported):
+            results = list(iterate_bulk_grades_for(self.course, [self.student_user]))
+        self.assertEqual(results[0][1]['percent'], 0.33)
+
     def test_min_grade_credit_requirements_status(self):
         """
         Test for credit course. If user passes minimum grade requirement then
@@ -5,6 +5,7 @@ from urllib import urlencode
 from xmodule.modulestore.search import path_to_location, navigation_index
 from xmodule.modulestore.django import modulestore
 from django.core.urlresolvers import reverse
+from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 
 
 def get_redirect_url(course_key, usage_key):
@@ -21,10 +22,18 @@ def get_redirect_url(course_key, usage_key):
         Redirect url string
     """
 
+    # Use the precomputed navigation index when it knows about the block, so that
+    # no descriptors need to be loaded; fall back to walking the modulestore.
+    block_tree = CourseStructure.get_block_tree(course_key)
+    if block_tree is not None and usage_key in block_tree:
+        path = block_tree.path_to_location(usage_key)
+    else:
+        path = path_to_location(modulestore(), usage_key)
+
     (
         course_key, chapter, section, vertical_unused,
         position, final_target_id
-    ) = path_to_location(modulestore(), usage_key)
+    ) = path
 
     # choose the appropriate view (and provide the necessary args) based on the
     # args provided by the redirect.
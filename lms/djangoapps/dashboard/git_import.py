@@ -25,6 +25,8 @@ log = logging.getLogger(__name__)
 
 GIT_REPO_DIR = getattr(settings, 'GIT_REPO_DIR', '/edx/var/app/edxapp/course_repos')
 GIT_IMPORT_STATIC = getattr(settings, 'GIT_IMPORT_STATIC', True)
+# Only write the blocks and assets that changed since the last import
+GIT_IMPORT_INCREMENTAL = getattr(settings, 'GIT_IMPORT_INCREMENTAL', False)
 
 
 class GitImportError(Exception):
@@ -213,7 +215,8 @@ def add_repo(repo, rdir_in, branch=None):
 
     try:
         management.call_command('import', GIT_REPO_DIR, rdir,
-                                nostatic=not GIT_IMPORT_STATIC)
+                                nostatic=not GIT_IMPORT_STATIC,
+                                incremental=GIT_IMPORT_INCREMENTAL)
     except CommandError:
         raise GitImportError(GitImportError.XML_IMPORT_FAILED)
     except NotImplementedError:
@@ -0,0 +1,86 @@
+"""
+Compare the latency of capa's safe_exec with and without the sandbox pool.
+
+The command runs a typical problem script a number of times through each
+path, using the CODE_JAIL settings, and prints the latency of each::
+
+    ./manage.py lms benchmark_safe_exec --settings=aws --runs 50
+
+"""
+
+from __future__ import print_function
+
+from optparse import make_option
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import BaseCommand, CommandError
+
+from capa.safe_exec import safe_exec
+from capa.safe_exec import sandbox_pool
+from codejail.django_integration import ConfigureCodeJailMiddleware
+from codejail.jail_code import is_configured
+
+# A script like those of CustomResponse problems.
+BENCHMARK_CODE = """
+def check(expect, ans):
+    return abs(float(ans) - expected) < 1e-3
+
+x = random.randint(1, 10)
+y = numpy.sqrt(x) * math.pi
+expected = round(y, 3)
+"""
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the sandbox pool.
+    """
+    help = '''Compare the latency of safe_exec with new sandboxes and with the sandbox pool'''
+    option_list = BaseCommand.option_list + (
+        make_option('--runs', type='int', default=20, help='How many executions to time on each path'),
+        make_option('--size', type='int', default=1, help='How many sandboxes the pool holds'),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            # Configure codejail as it is configured for requests.
+            ConfigureCodeJailMiddleware()
+        except MiddlewareNotUsed:
+            pass
+        if not is_configured('python'):
+            raise CommandError('CODE_JAIL["python_bin"] must be set to benchmark the sandbox')
+
+        runs = options['runs']
+
+        sandbox_pool.configure(0)
+        self.report('new sandbox', self.time_runs(runs))
+
+        sandbox_pool.configure(options['size'])
+        sandbox_pool.warm()
+        self.report('sandbox pool', self.time_runs(runs))
+        sandbox_pool.configure(0)
+
+    def time_runs(self, runs):
+        """
+        Return the latencies of `runs` executions of the benchmark code, in seconds.
+        """
+        latencies = []
+        for seed in xrange(runs):
+            start = time.time()
+            safe_exec(BENCHMARK_CODE, {}, random_seed=seed)
+            latencies.append(time.time() - start)
+        return latencies
+
+    def report(self, name, latencies):
+        """
+        Print statistics about `latencies`.
+        """
+        latencies = sorted(latencies)
+        print('{}: mean {:.1f} ms, median {:.1f} ms, 95th percentile {:.1f} ms, max {:.1f} ms'.format(
+            name,
+            sum(latencies) / len(latencies) * 1000,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.95)] * 1000,
+            latencies[-1] * 1000,
+        ))
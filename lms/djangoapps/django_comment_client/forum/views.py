@@ -243,7 +243,8 @@ def forum_form_discussion(request, course_key):
     course_settings = make_course_settings(course, request.user)
 
     user = cc.User.from_django_user(request.user)
-    user_info = user.to_dict()
+    # fetch the user while the threads are searched
+    user_info_request = cc.utils.start_request(user.to_dict)
 
     try:
         unsafethreads, query_params = get_threads(request, course)   # This might process a search query
@@ -254,6 +255,7 @@ def forum_form_discussion(request, course_key):
         return render_to_response('discussion/maintenance.html', {})
     except ValueError:
         return HttpResponseBadRequest("Invalid group_id")
+    user_info = user_info_request.get()
 
     with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
         annotated_content_info = utils.get_metadata_for_threads(course_key, threads, request.user, user_info)
@@ -317,7 +319,8 @@ def single_thread(request, course_key, discussion_id, thread_id):
     course = get_course_with_access(request.user, 'load', course_key, check_if_enrolled=True)
     course_settings = make_course_settings(course, request.user)
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
+    # fetch the user while the thread is retrieved
+    user_info_request = cc.utils.start_request(cc_user.to_dict)
     is_moderator = has_permission(request.user, "see_all_cohorts", course_key)
 
     # Currently, the front end always loads responses via AJAX, even for this
@@ -334,6 +337,7 @@ def single_thread(request, course_key, discussion_id, thread_id):
         if e.status_code == 404:
             raise Http404
         raise
+    user_info = user_info_request.get()
 
     # Verify that the student has access to this thread if belongs to a course discussion module
     thread_context = getattr(thread, "context", "course")
@@ -2,17 +2,24 @@
 import datetime
 import json
 import mock
+import re
 from nose.plugins.attrib import attr
 from pytz import UTC
 from django.utils.timezone import UTC as django_utc
 
+from django.core.cache import get_cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase, RequestFactory
+from django.test.utils import override_settings
+from django.utils import translation
+import requests
 from edxmako import add_lookup
 
 from django_comment_client.tests.factories import RoleFactory
 from django_comment_client.tests.unicode import UnicodeTestMixin
 import django_comment_client.utils as utils
+import lms.lib.comment_client as cc
+from lms.lib.comment_client import utils as cc_utils
 
 from courseware.tests.factories import InstructorFactory
 from courseware.tabs import get_course_tab_list
@@ -21,6 +28,7 @@ from openedx.core.djangoapps.course_groups.cohorts import set_course_cohort_sett
 from openedx.core.djangoapps.course_groups.tests.helpers import config_course_cohorts, topic_name_to_id
 from student.tests.factories import UserFactory, AdminFactory, CourseEnrollmentFactory
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
+from openedx.core.djangoapps.content.course_structures.tasks import update_course_structure
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase
 from student.roles import CourseStaffRole
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
@@ -1061,6 +1069,33 @@ class ContentGroupCategoryMapTestCase(CategoryMapTestMixin, ContentGroupTestCase
             requesting_user=self.non_cohorted_user
         )
 
+    def test_precomputed_category_map(self):
+        """
+        Verify that the category map and topic access computed from the
+        course's block tree index are the same, for each user.
+        """
+        self.course = modulestore().get_course(self.course.id)
+        users = [self.staff_user, self.alpha_user, self.beta_user, self.non_cohorted_user]
+        expected = [
+            (
+                utils.get_discussion_category_map(self.course, user),
+                utils.discussion_category_id_access(self.course, user, 'alpha_group_discussion'),
+            )
+            for user in users
+        ]
+        update_course_structure(unicode(self.course.id))
+        with mock.patch.dict('django.conf.settings.FEATURES', {'ENABLE_PRECOMPUTED_DISCUSSION_MAPS': True}):
+            with mock.patch('django_comment_client.utils.modulestore') as mock_modulestore:
+                actual = [
+                    (
+                        utils.get_discussion_category_map(self.course, user),
+                        utils.discussion_category_id_access(self.course, user, 'alpha_group_discussion'),
+                    )
+                    for user in users
+                ]
+        self.assertFalse(mock_modulestore.called)
+        self.assertEqual(actual, expected)
+
 
 class JsonResponseTestCase(TestCase, UnicodeTestMixin):
     def _test_unicode_data(self, text):
@@ -1232,3 +1267,153 @@ class IsCommentableCohortedTestCase(ModuleStoreTestCase):
         # Verify that team discussions are not cohorted, but other discussions are
         self.assertFalse(utils.is_commentable_cohorted(course.id, team.discussion_topic_id))
         self.assertTrue(utils.is_commentable_cohorted(course.id, "random"))
+
+
+@attr('shard_1')
+@mock.patch('lms.lib.comment_client.utils.sleep')
+@mock.patch('lms.lib.comment_client.utils.requests.Session.request')
+class CommentsServiceTransportTestCase(TestCase):
+    """
+    Tests of the transport of the requests to the comments service.
+    """
+    def make_response(self, data):
+        """
+        Returns a mock response of the comments service with the given data.
+        """
+        return mock.Mock(status_code=200, text=json.dumps(data), json=mock.Mock(return_value=data))
+
+    def test_session_reused(self, mock_request, mock_sleep):
+        self.assertIs(cc_utils.get_session(), cc_utils.get_session())
+
+    def test_retry_get(self, mock_request, mock_sleep):
+        mock_request.side_effect = [
+            requests.exceptions.ConnectionError(),
+            requests.exceptions.Timeout(),
+            self.make_response({'id': 'dummy'}),
+        ]
+        self.assertEqual(cc_utils.perform_request('get', 'http://localhost:4567/api/v1/dummy'), {'id': 'dummy'})
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(0.1), mock.call(0.2)])
+
+    def test_retries_exhausted(self, mock_request, mock_sleep):
+        mock_request.side_effect = requests.exceptions.ConnectionError()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cc_utils.perform_request('get', 'http://localhost:4567/api/v1/dummy')
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_no_retry_post(self, mock_request, mock_sleep):
+        mock_request.side_effect = requests.exceptions.Timeout()
+        with self.assertRaises(requests.exceptions.Timeout):
+            cc_utils.perform_request('post', 'http://localhost:4567/api/v1/dummy', {'body': 'dummy'})
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertFalse(mock_sleep.called)
+
+    def test_perform_concurrently(self, mock_request, mock_sleep):
+        mock_request.side_effect = lambda method, url, **kwargs: self.make_response({
+            'url': url,
+            'language': kwargs['headers']['Accept-Language'],
+        })
+        with translation.override('eo'):
+            results = cc_utils.perform_concurrently(*[
+                lambda index=index: cc_utils.perform_request('get', 'http://localhost:4567/{}'.format(index))
+                for index in range(6)
+            ])
+        self.assertEqual(
+            results,
+            [{'url': 'http://localhost:4567/{}'.format(index), 'language': 'eo'} for index in range(6)]
+        )
+
+    @override_settings(COMMENTS_SERVICE_HTTP={'CONCURRENT_REQUESTS': 1})
+    def test_start_request_errors(self, mock_request, mock_sleep):
+        mock_request.return_value = mock.Mock(status_code=404, text='Not found')
+        result = cc_utils.start_request(cc_utils.perform_request, 'get', 'http://localhost:4567/api/v1/dummy')
+        self.assertEqual(mock_request.call_count, 1)
+        with self.assertRaises(cc_utils.CommentClientRequestError):
+            result.get()
+
+
+@attr('shard_1')
+@override_settings(COMMENTS_SERVICE_CACHE={'ENABLED': True, 'CACHE': 'default'})
+@mock.patch('lms.lib.comment_client.utils.requests.Session.request')
+class CommentsServiceCacheTestCase(TestCase):
+    """
+    Tests of the read-through cache of the responses of the comments service.
+    """
+    def setUp(self):
+        super(CommentsServiceCacheTestCase, self).setUp()
+        get_cache('default').clear()
+
+    def make_response(self, method, url, **kwargs):
+        """
+        Returns a mock response of the comments service to any request, of a comment of a thread.
+        """
+        match = re.search(r'/(?:threads|comments)/([^/]+)', url)
+        data = {
+            'id': match.group(1) if match else 'new_thread',
+            'course_id': 'edX/toy/2012_Fall',
+            'thread_id': 'dummy_thread',
+            'collection': [],
+        }
+        return mock.Mock(status_code=200, text=json.dumps(data), json=mock.Mock(return_value=data))
+
+    def retrieve_thread(self):
+        """
+        Retrieves the thread that the comments belong to, as a user.
+        """
+        return cc.Thread(id='dummy_thread').retrieve(user_id='1', recursive=True, mark_as_read=False)
+
+    def test_thread_cached(self, mock_request):
+        mock_request.side_effect = self.make_response
+        self.retrieve_thread()
+        self.retrieve_thread()
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(self.retrieve_thread().id, 'dummy_thread')
+
+    @override_settings(COMMENTS_SERVICE_CACHE={'ENABLED': False})
+    def test_disabled(self, mock_request):
+        mock_request.side_effect = self.make_response
+        self.retrieve_thread()
+        self.retrieve_thread()
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_update_invalidates_thread(self, mock_request):
+        mock_request.side_effect = self.make_response
+        self.retrieve_thread()
+        cc.Thread(id='dummy_thread', body='updated').save()
+        self.retrieve_thread()
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_comment_vote_invalidates_thread(self, mock_request):
+        mock_request.side_effect = self.make_response
+        self.retrieve_thread()
+        cc.User(id='2').vote(cc.Comment(id='dummy_comment'), 'up')
+        self.retrieve_thread()
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_flag_invalidates_comment(self, mock_request):
+        mock_request.side_effect = self.make_response
+        cc.Comment(id='dummy_comment').retrieve()
+        comment = cc.Comment(id='dummy_comment')
+        comment.flagAbuse(cc.User(id='2'), comment)
+        cc.Comment(id='dummy_comment').retrieve()
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_list_invalidated_by_new_thread(self, mock_request):
+        mock_request.side_effect = self.make_response
+        query_params = {'course_id': 'edX/toy/2012_Fall', 'user_id': '1'}
+        cc.Thread.search(query_params)
+        cc.Thread.search(query_params)
+        self.assertEqual(mock_request.call_count, 1)
+        cc.Thread(course_id='edX/toy/2012_Fall', commentable_id='dummy', body='new').save()
+        cc.Thread.search(query_params)
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_mark_as_read_invalidates_user_lists(self, mock_request):
+        mock_request.side_effect = self.make_response
+        query_params = {'course_id': 'edX/toy/2012_Fall', 'user_id': '1'}
+        cc.Thread.search(query_params)
+        cc.Thread(id='dummy_thread').retrieve(user_id='1', mark_as_read=True)
+        cc.Thread.search(query_params)
+        cc.Thread.search({'course_id': 'edX/toy/2012_Fall', 'user_id': '2'})
+        cc.Thread.search({'course_id': 'edX/toy/2012_Fall', 'user_id': '2'})
+        self.assertEqual(mock_request.call_count, 4)
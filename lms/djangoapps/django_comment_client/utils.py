@@ -1,9 +1,10 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from datetime import datetime
 import json
 import logging
 
 import pytz
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.db import connection
@@ -11,7 +12,7 @@ from django.http import HttpResponse
 from django.utils.timezone import UTC
 import pystache_custom as pystache
 from opaque_keys.edx.locations import i4xEncoder
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from xmodule.modulestore.django import modulestore
 
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
@@ -21,6 +22,8 @@ from edxmako import lookup_template
 
 from courseware import courses
 from courseware.access import has_access
+from courseware.block_transformers import TransformContext, get_loadable_blocks
+from openedx.core.djangoapps.content.course_structures.block_tree import DATE_FIELD
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from openedx.core.djangoapps.course_groups.cohorts import (
     get_course_cohort_settings, get_cohort_by_id, get_cohort_id, is_course_cohorted
@@ -93,11 +96,69 @@ def has_required_keys(module):
     return True
 
 
+class IndexedDiscussion(namedtuple(
+        'IndexedDiscussion', 'location discussion_id discussion_category discussion_target sort_key start'
+)):
+    """
+    A discussion module of a course, as recorded in the course's block tree index, with the
+    attribute names of the module.
+    """
+    __slots__ = ()
+
+
+def get_discussion_index(course):
+    """
+    Returns the block tree index of the published `course` if discussion maps should be computed
+    from it, or None: if that is disabled, or if the index is missing, out of date, or from before
+    discussions were indexed.
+    """
+    if not settings.FEATURES.get('ENABLE_PRECOMPUTED_DISCUSSION_MAPS', False):
+        return None
+    block_tree = CourseStructure.get_block_tree(course.id)
+    if block_tree is None or block_tree.discussions is None or not block_tree.is_current_for(course):
+        return None
+    return block_tree
+
+
+def get_indexed_discussions(block_tree, course, user, include_all=False, discussion_ids=None):
+    """
+    Returns the IndexedDiscussions of `block_tree` (see get_discussion_index) that are
+    accessible to the given user, or all of them if `include_all`.
+
+    If `discussion_ids` is given, only the discussions with those ids are checked and returned.
+    """
+    keys = block_tree.discussions
+    if discussion_ids is not None:
+        keys = [key for key in keys if block_tree.blocks[key]['discussion']['id'] in discussion_ids]
+    if include_all:
+        entries = [(key, block_tree.blocks[key]) for key in keys]
+    else:
+        entries = get_loadable_blocks(block_tree, TransformContext(user, course), keys)
+    return [
+        IndexedDiscussion(
+            location=UsageKey.from_string(key).map_into_course(course.id),
+            discussion_id=entry['discussion']['id'],
+            discussion_category=entry['discussion']['category'],
+            discussion_target=entry['discussion']['target'],
+            sort_key=entry['discussion']['sort_key'],
+            start=DATE_FIELD.from_json(entry['start']),
+        )
+        for key, entry in entries
+    ]
+
+
 def get_accessible_discussion_modules(course, user, include_all=False):  # pylint: disable=invalid-name
     """
     Return a list of all valid discussion modules in this course that
     are accessible to the given user.
+
+    If the course's block tree index can be used (see get_discussion_index),
+    they are IndexedDiscussions filtered from the index instead.
     """
+    block_tree = get_discussion_index(course)
+    if block_tree is not None:
+        return get_indexed_discussions(block_tree, course, user, include_all=include_all)
+
     all_modules = modulestore().get_items(course.id, qualifiers={'category': 'discussion'})
 
     return [
@@ -144,6 +205,10 @@ def get_cached_discussion_id_map(course, discussion_ids, user):
     Returns a dict mapping discussion_ids to respective discussion module metadata if it is cached and visible to the
     user. If not, returns the result of get_discussion_id_map
     """
+    block_tree = get_discussion_index(course)
+    if block_tree is not None:
+        discussions = get_indexed_discussions(block_tree, course, user, discussion_ids=discussion_ids)
+        return dict(map(get_discussion_id_map_entry, discussions))
     try:
         entries = []
         for discussion_id in discussion_ids:
@@ -352,11 +417,14 @@ def discussion_category_id_access(course, user, discussion_id):
     """
     Returns True iff the given discussion_id is accessible for user in course.
     Assumes that the commentable identified by discussion_id has a null or 'course' context.
-    Uses the discussion id cache if available, falling back to
-    get_discussion_categories_ids if there is no cache.
+    Uses the course's block tree index or the discussion id cache if available,
+    falling back to get_discussion_categories_ids if there is neither.
     """
     if discussion_id in course.top_level_discussion_topic_ids:
         return True
+    block_tree = get_discussion_index(course)
+    if block_tree is not None:
+        return bool(get_indexed_discussions(block_tree, course, user, discussion_ids=[discussion_id]))
     try:
         key = get_cached_discussion_key(course, discussion_id)
         if not key:
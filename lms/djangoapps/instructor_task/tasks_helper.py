@@ -42,10 +42,11 @@ from certificates.models import (
     CertificateStatuses
 )
 from certificates.api import generate_user_certificates
+from courseware.bulk_grades import iterate_bulk_grades_for
 from courseware.courses import get_course_by_id, get_problems_in_section
 from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, FieldDataPrefetcher
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import (
     enrolled_students_features,
@@ -75,6 +76,9 @@ UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
 
+# The number of StudentModules whose students' field data is prefetched together
+FIELD_DATA_PREFETCH_BATCH_SIZE = 500
+
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
 
@@ -292,7 +296,8 @@ def run_main_task(entry_id, task_fcn, action_name):
     return task_progress
 
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                prefetch_field_data=False):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -310,6 +315,10 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `prefetch_field_data` is True, the field data of the students is loaded in bulk for batches of
+    StudentModules, and the update_fcn is also passed a `field_data_cache` keyword argument with the
+    FieldDataCache of the module's student.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -370,13 +379,18 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
+    if prefetch_field_data:
+        updates = _modules_with_field_data(modules_to_update, course_id, problems.values())
+    else:
+        updates = ((module_to_update, {}) for module_to_update in modules_to_update)
+
+    for module_to_update, update_kwargs in updates:
         task_progress.attempted += 1
         module_descriptor = problems[unicode(module_to_update.module_state_key)]
         # There is no try here:  if there's an error, we let it throw, and the task will
         # be marked as FAILED, with a stack trace.
         with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
+            update_status = update_fcn(module_descriptor, module_to_update, **update_kwargs)
             if update_status == UPDATE_STATUS_SUCCEEDED:
                 # If the update_fcn returns true, then it performed some kind of work.
                 # Logging of failures is left to the update_fcn itself.
@@ -391,6 +405,29 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     return task_progress.update_task_state()
 
 
+def _modules_with_field_data(modules_to_update, course_id, descriptors):
+    """
+    Yield each StudentModule in the `modules_to_update` query with the keyword arguments
+    to pass to the update_fcn: the FieldDataCache of the module's student for `descriptors`.
+
+    The modules are loaded in batches of FIELD_DATA_PREFETCH_BATCH_SIZE, and the field data
+    of the students in each batch is prefetched in bulk.
+    """
+    modules_to_update = modules_to_update.select_related('student').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(modules_to_update.filter(id__gt=last_id)[:FIELD_DATA_PREFETCH_BATCH_SIZE])
+        if not batch:
+            return
+        last_id = batch[-1].id
+
+        prefetcher = FieldDataPrefetcher.for_descriptor_descendents(
+            course_id, set(module_to_update.student for module_to_update in batch), descriptors
+        )
+        for module_to_update in batch:
+            yield module_to_update, {'field_data_cache': prefetcher.field_data_cache_for(module_to_update.student)}
+
+
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
     """Gets task_id from `xmodule_instance_args` dict, or returns default value if missing."""
     return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID) if xmodule_instance_args is not None else UNKNOWN_TASK_ID
@@ -418,16 +455,19 @@ def _get_track_function_for_task(student, xmodule_instance_args=None, source_pag
 
 
 def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args=None,
-                                  grade_bucket_type=None, course=None):
+                                  grade_bucket_type=None, course=None, field_data_cache=None):
     """
     Fetches a StudentModule instance for a given `course_id`, `student` object, and `module_descriptor`.
 
     `xmodule_instance_args` is used to provide information for creating a track function and an XQueue callback.
     These are passed, along with `grade_bucket_type`, to get_module_for_descriptor_internal, which sidesteps
     the need for a Request object when instantiating an xmodule instance.
+
+    `field_data_cache` is the student's FieldDataCache for the descriptor, if it has already been loaded.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    if field_data_cache is None:
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
     student_data = KvsFieldData(DjangoKeyValueStore(field_data_cache))
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
@@ -464,10 +504,11 @@ def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule
 
 
 @transaction.autocommit
-def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module):
+def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, field_data_cache=None):
     '''
     Takes an XModule descriptor and a corresponding StudentModule object, and
-    performs rescoring on the student's problem submission.
+    performs rescoring on the student's problem submission. `field_data_cache`
+    is the student's prefetched FieldDataCache, if any.
 
     Throws exceptions if the rescoring is fatal and should be aborted if in a loop.
     In particular, raises UpdateProblemModuleStateError if module fails to instantiate,
@@ -492,7 +533,8 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
             module_descriptor,
             xmodule_instance_args,
             grade_bucket_type='rescore',
-            course=course
+            course=course,
+            field_data_cache=field_data_cache,
         )
 
         if instance is None:
@@ -705,7 +747,11 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         current_step,
         total_enrolled_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    if settings.FEATURES.get('ENABLE_BULK_GRADE_REPORTS', False):
+        gradesets = iterate_bulk_grades_for(course, enrolled_students)
+    else:
+        gradesets = iterate_grades_for(course_id, enrolled_students)
+    for student, gradeset, err_msg in gradesets:
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
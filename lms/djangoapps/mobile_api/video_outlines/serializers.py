@@ -9,6 +9,7 @@ from courseware.access import has_access
 from courseware.courses import get_course_by_id
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor
+from openedx.core.djangoapps.content.course_structures.block_tree import video_metadata
 from util.module_utils import get_dynamic_descriptor_children
 
 from edxval.api import (
@@ -19,10 +20,15 @@ from edxval.api import (
 class BlockOutline(object):
     """
     Serializes course videos, pulling data from VAL and the video modules.
+
+    If `user_block_tree` (a courseware.block_transformers.UserBlockTree) is
+    given, `start_block` is one of its blocks, and the outline is computed from
+    the tree instead of the modulestore.
     """
-    def __init__(self, course_id, start_block, block_types, request, video_profiles):
+    def __init__(self, course_id, start_block, block_types, request, video_profiles, user_block_tree=None):
         """Create a BlockOutline using `start_block` as a starting point."""
         self.start_block = start_block
+        self.user_block_tree = user_block_tree
         self.block_types = block_types
         self.course_id = course_id
         self.request = request  # needed for making full URLS
@@ -56,6 +62,28 @@ class BlockOutline(object):
                 self.request.user, self.request, descriptor, field_data_cache, self.course_id, course=course
             )
 
+        def can_load(block):
+            """
+            Returns whether the user has access to the block.
+            """
+            if self.user_block_tree is not None:
+                # The tree only contains the blocks that the user has access to.
+                return True
+            return has_access(self.request.user, 'load', block, course_key=self.course_id)
+
+        def get_children(block):
+            """
+            Returns the children of the block that the user sees.
+            """
+            if self.user_block_tree is not None:
+                return self.user_block_tree.get_children(block)
+            return get_dynamic_descriptor_children(
+                block,
+                self.request.user.id,
+                create_module,
+                usage_key_filter=parent_or_requested_block_type
+            )
+
         with modulestore().bulk_operations(self.course_id):
             child_to_parent = {}
             stack = [self.start_block]
@@ -72,7 +100,7 @@ class BlockOutline(object):
                     continue
 
                 if curr_block.location.block_type in self.block_types:
-                    if not has_access(self.request.user, 'load', curr_block, course_key=self.course_id):
+                    if not can_load(curr_block):
                         continue
 
                     summary_fn = self.block_types[curr_block.category]
@@ -88,12 +116,7 @@ class BlockOutline(object):
                     }
 
                 if curr_block.has_children:
-                    children = get_dynamic_descriptor_children(
-                        curr_block,
-                        self.request.user.id,
-                        create_module,
-                        usage_key_filter=parent_or_requested_block_type
-                    )
+                    children = get_children(curr_block)
                     for block in reversed(children):
                         stack.append(block)
                         child_to_parent[block] = curr_block
@@ -166,15 +189,19 @@ def find_urls(course_id, block, child_to_parent, request):
 def video_summary(video_profiles, course_id, video_descriptor, request, local_cache):
     """
     returns summary dict for the given video module
+
+    `video_descriptor` can also be a block of a user's view of the course's
+    block tree, which carries the video's metadata.
     """
+    metadata = getattr(video_descriptor, 'video_metadata', None) or video_metadata(video_descriptor)
     always_available_data = {
         "name": video_descriptor.display_name,
         "category": video_descriptor.category,
-        "id": unicode(video_descriptor.scope_ids.usage_id),
-        "only_on_web": video_descriptor.only_on_web,
+        "id": unicode(video_descriptor.location),
+        "only_on_web": metadata['only_on_web'],
     }
 
-    if video_descriptor.only_on_web:
+    if metadata['only_on_web']:
         ret = {
             "video_url": None,
             "video_thumbnail_url": None,
@@ -187,7 +214,7 @@ def video_summary(video_profiles, course_id, video_descriptor, request, local_ca
         return ret
 
     # Get encoded videos
-    video_data = local_cache['course_videos'].get(video_descriptor.edx_video_id, {})
+    video_data = local_cache['course_videos'].get(metadata['edx_video_id'], {})
 
     # Get highest priority video to populate backwards compatible field
     default_encoded_video = {}
@@ -201,30 +228,27 @@ def video_summary(video_profiles, course_id, video_descriptor, request, local_ca
     if default_encoded_video:
         video_url = default_encoded_video['url']
     # Then fall back to VideoDescriptor fields for video URLs
-    elif video_descriptor.html5_sources:
-        video_url = video_descriptor.html5_sources[0]
+    elif metadata['html5_sources']:
+        video_url = metadata['html5_sources'][0]
     else:
-        video_url = video_descriptor.source
+        video_url = metadata['source']
 
     # Get duration/size, else default
     duration = video_data.get('duration', None)
     size = default_encoded_video.get('file_size', 0)
 
     # Transcripts...
-    transcripts_info = video_descriptor.get_transcripts_info()
-    transcript_langs = video_descriptor.available_translations(transcripts_info, verify_assets=False)
-
     transcripts = {
         lang: reverse(
             'video-transcripts-detail',
             kwargs={
                 'course_id': unicode(course_id),
-                'block_id': video_descriptor.scope_ids.usage_id.block_id,
+                'block_id': video_descriptor.location.block_id,
                 'lang': lang
             },
             request=request,
         )
-        for lang in transcript_langs
+        for lang in metadata['transcript_languages']
     }
 
     ret = {
@@ -233,7 +257,7 @@ def video_summary(video_profiles, course_id, video_descriptor, request, local_ca
         "duration": duration,
         "size": size,
         "transcripts": transcripts,
-        "language": video_descriptor.get_default_transcript_language(transcripts_info),
+        "language": metadata['default_transcript_language'],
         "encoded_videos": video_data.get('profiles')
     }
     ret.update(always_available_data)
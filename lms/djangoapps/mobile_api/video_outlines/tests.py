@@ -6,6 +6,7 @@ import ddt
 import itertools
 from uuid import uuid4
 from collections import namedtuple
+from mock import patch
 
 from edxval import api
 from mobile_api.models import MobileApiConfig
@@ -16,6 +17,7 @@ from xmodule.partitions.partitions import Group, UserPartition
 
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.content.course_structures.tasks import update_course_structure
 
 from ..testutils import MobileAPITestCase, MobileAuthTestMixin, MobileCourseAccessTestMixin
 
@@ -795,6 +797,31 @@ class TestVideoSummaryList(
         course_outline = self.api_response().data
         self.assertEqual(len(course_outline), 0)
 
+    def test_precomputed_outline(self):
+        self.login_and_enroll()
+        self._create_video_with_subs()
+        ItemFactory.create(
+            parent=self.other_unit,
+            category="video",
+            edx_video_id=self.edx_video_id,
+            visible_to_staff_only=True,
+        )
+        ItemFactory.create(
+            parent=self.nameless_unit,
+            category="video",
+            display_name=u"test html5 video omega \u03a9",
+            html5_sources=[self.html5_video_url],
+        )
+        expected_outline = self.api_response().data
+        self.assertEqual(len(expected_outline), 2)
+
+        update_course_structure(unicode(self.course.id))
+        with patch.dict('django.conf.settings.FEATURES', {'ENABLE_PRECOMPUTED_COURSE_OUTLINES': True}):
+            with patch('mobile_api.video_outlines.serializers.get_dynamic_descriptor_children') as get_children:
+                course_outline = self.api_response().data
+        self.assertFalse(get_children.called)
+        self.assertEqual(course_outline, expected_outline)
+
     def test_language(self):
         self.login_and_enroll()
         video = ItemFactory.create(
@@ -9,6 +9,7 @@ general XBlock representation in this rather specialized formatting.
 from functools import partial
 
 from django.http import Http404, HttpResponse
+from courseware.block_transformers import get_user_block_tree
 from mobile_api.models import MobileApiConfig
 
 from rest_framework import generics
@@ -77,13 +78,16 @@ class VideoSummaryList(generics.ListAPIView):
     @mobile_course_access(depth=None)
     def list(self, request, course, *args, **kwargs):
         video_profiles = MobileApiConfig.get_video_profiles()
+        user_block_tree = get_user_block_tree(request.user, course, request)
+        start_block = user_block_tree.get_root() if user_block_tree is not None else course
         video_outline = list(
             BlockOutline(
                 course.id,
-                course,
+                start_block,
                 {"video": partial(video_summary, video_profiles)},
                 request,
                 video_profiles,
+                user_block_tree=user_block_tree,
             )
         )
         return Response(video_outline)
@@ -61,6 +61,28 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# Requests to the comments service use a pool of persistent connections per process.
+# Failed GET requests are retried MAX_RETRIES times, waiting RETRY_BACKOFF seconds (doubled
+# after each retry), and views make up to CONCURRENT_REQUESTS requests at the same time.
+COMMENTS_SERVICE_HTTP = {
+    'TIMEOUT': 5,
+    'MAX_RETRIES': 2,
+    'RETRY_BACKOFF': 0.1,
+    'POOL_SIZE': 10,
+    'CONCURRENT_REQUESTS': 4,
+}
+
+# Responses of the comments service can be read through the CACHE django cache: lists of
+# threads for LIST_TIMEOUT seconds, and single threads, comments and users for ITEM_TIMEOUT
+# seconds, or until the LMS changes them.
+COMMENTS_SERVICE_CACHE = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'LIST_TIMEOUT': 30,
+    'ITEM_TIMEOUT': 300,
+    'VERSION_TIMEOUT': 24 * 60 * 60,
+}
+
 
 # Features
 FEATURES = {
@@ -425,6 +447,28 @@ FEATURES = {
     # Enable the max score cache to speed up grading
     'ENABLE_MAX_SCORE_CACHE': True,
 
+    # Store each student's subsection scores, and grade from them instead of
+    # recomputing every score from courseware state
+    'ENABLE_PERSISTENT_SUBSECTION_SCORES': False,
+
+    # Grade students in batches from their StudentModule scores when
+    # generating grade reports, instead of one student at a time
+    'ENABLE_BULK_GRADE_REPORTS': False,
+
+    # Share has_access decisions between requests through the django cache.
+    # See ACCESS_DECISION_CACHE_TIMEOUT.
+    'ENABLE_ACCESS_DECISION_CACHE': False,
+
+    # Serve course outlines (the course blocks API and the mobile video
+    # outline) from the precomputed block tree of the published course,
+    # filtered for each user, instead of loading the course's XBlocks.
+    'ENABLE_PRECOMPUTED_COURSE_OUTLINES': False,
+
+    # Compute discussion category maps and topic access from the precomputed
+    # block tree of the published course, filtered for each user, instead of
+    # loading and checking access to every discussion module of the course.
+    'ENABLE_PRECOMPUTED_DISCUSSION_MAPS': False,
+
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
 }
@@ -432,6 +476,38 @@ FEATURES = {
 # Ignore static asset files on import which match this pattern
 ASSET_IGNORE_REGEX = r"(^\._.*$)|(^\.DS_Store$)|(^.*~$)"
 
+# Chunks of the assets too big for the django cache are cached on the local disk,
+# in DIRECTORY (None to disable the chunk cache), up to MAX_BYTES in total.
+# See contentserver/chunk_cache.py.
+ASSET_CHUNK_CACHE = {
+    'DIRECTORY': None,
+    'CHUNK_SIZE': 1024 * 1024,
+    'MAX_BYTES': 10 * 1024 * 1024 * 1024,
+}
+
+# How long (in seconds) browsers and CDNs can keep unlocked course assets before
+# checking them again: MAX_AGE for every course, unless the course id is in
+# COURSE_MAX_AGE. 0 sends no Cache-Control or Expires header.
+ASSET_CACHE_POLICY = {
+    'MAX_AGE': 0,
+    'COURSE_MAX_AGE': {},
+}
+
+# Resized and re-encoded variants of image assets, asked for with the width,
+# height and format parameters of their URL. See contentserver/variants.py.
+IMAGE_VARIANTS = {
+    'ENABLED': False,
+    # Requested dimensions are rounded up to one of these.
+    'SIZES': [64, 128, 256, 384, 512, 768, 1024, 1536],
+    'JPEG_QUALITY': 85,
+    # When the variants of all assets take more than this, the least recently used are deleted.
+    'MAX_BYTES': 1024 * 1024 * 1024,
+}
+
+# The width of the course images of course cards (catalog and dashboard), when
+# image variants are enabled.
+COURSE_CARD_IMAGE_WIDTH = 384
+
 # Used for A/B testing
 DEFAULT_GROUPS = []
 
@@ -783,6 +859,21 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandboxes, kept running to execute capa code without starting a
+    # new sandbox each time.  See capa/safe_exec/sandbox_pool.py.
+    'pool': {
+        # How many warm sandboxes each process keeps?  0 disables the pool.
+        'size': 0,
+    },
+}
+
+# Results of the Python code in problems are cached in the django cache, and
+# in each process, in a cache of up to local_max_bytes (0 to disable it).
+# Results bigger than max_entry_bytes aren't cached.
+SAFE_EXEC_RESULT_CACHE = {
+    'local_max_bytes': 8 * 1024 * 1024,
+    'max_entry_bytes': 1000 * 1000,
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1112,6 +1203,11 @@ FOOTER_BROWSER_CACHE_MAX_AGE = 5 * 60
 # Credit api notification cache timeout
 CREDIT_NOTIFICATION_CACHE_TIMEOUT = 5 * 60 * 60
 
+# How long has_access decisions are shared between requests, when
+# FEATURES['ENABLE_ACCESS_DECISION_CACHE'] is set. Decisions that depend on
+# dates (such as the end of an enrollment window) can be this stale.
+ACCESS_DECISION_CACHE_TIMEOUT = 60
+
 ################################# Deprecation warnings #####################
 
 # Ignore deprecation warnings (so we don't clutter Jenkins builds/production)
@@ -1181,6 +1277,7 @@ MIDDLEWARE_CLASSES = (
 
     'django_comment_client.utils.ViewNameMiddleware',
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'capa.safe_exec.django_integration.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
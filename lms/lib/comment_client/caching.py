@@ -0,0 +1,190 @@
+"""
+A read-through cache of the responses of the comments service.
+
+Entries are keyed on the request and on the versions of the objects that the
+response depends on (e.g. ``thread.<id>``, ``course.<id>`` or ``user.<id>``).
+Invalidating an object replaces its version with a new random one, so every
+entry that depended on it is missed from then on, and expires by itself.
+Versions that are not in the cache are given a new random one in the same
+way, so an evicted version can never bring back stale entries.
+
+Single threads, comments and users are cached for ITEM_TIMEOUT seconds, while
+lists of threads, which also change with objects that the LMS doesn't write,
+are only cached for LIST_TIMEOUT seconds.
+"""
+import hashlib
+import logging
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import get_cache, InvalidCacheBackendError
+
+log = logging.getLogger(__name__)
+
+# The defaults of the COMMENTS_SERVICE_CACHE setting
+DEFAULT_CACHE_SETTINGS = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'LIST_TIMEOUT': 30,
+    'ITEM_TIMEOUT': 300,
+    'VERSION_TIMEOUT': 24 * 60 * 60,
+}
+
+# The version that all lists depend on, for invalidations whose course isn't known
+ALL_COURSES = 'all'
+
+KEY_PREFIX = 'comment_client'
+
+
+def cache_settings():
+    """
+    Returns the COMMENTS_SERVICE_CACHE setting, with its defaults.
+    """
+    config = DEFAULT_CACHE_SETTINGS.copy()
+    config.update(getattr(settings, 'COMMENTS_SERVICE_CACHE', {}))
+    return config
+
+
+def _get_cache():
+    """
+    Returns the django cache of the responses, or None if caching is disabled or that cache doesn't exist.
+    """
+    config = cache_settings()
+    if not config['ENABLED']:
+        return None
+    try:
+        return get_cache(config['CACHE'])
+    except InvalidCacheBackendError:
+        log.warning(u"The comments service cache %s doesn't exist", config['CACHE'])
+        return None
+
+
+def course_version(course_id):
+    """
+    Returns the name of the version of the lists of threads of a course.
+    """
+    return u'course.{}'.format(course_id if course_id is not None else ALL_COURSES)
+
+
+def thread_version(thread_id):
+    """
+    Returns the name of the version of a thread, including its comments.
+    """
+    return u'thread.{}'.format(thread_id)
+
+
+def comment_version(comment_id):
+    """
+    Returns the name of the version of a comment.
+    """
+    return u'comment.{}'.format(comment_id)
+
+
+def user_version(user_id):
+    """
+    Returns the name of the version of the info of a user.
+    """
+    return u'user.{}'.format(user_id)
+
+
+def reads_version(user_id):
+    """
+    Returns the name of the version of the threads that a user has read.
+    """
+    return u'reads.{}'.format(user_id)
+
+
+def list_versions(course_id, user_id=None):
+    """
+    Returns the names of the versions that a list of threads of a course, as seen by a user, depends on.
+    """
+    versions = [course_version(course_id), course_version(None)]
+    if user_id is not None:
+        versions.extend([user_version(user_id), reads_version(user_id)])
+    return versions
+
+
+def _version_key(name):
+    """
+    Returns the cache key of a version.
+    """
+    return u'{}.version.{}'.format(KEY_PREFIX, name)
+
+
+def _get_versions(cache, names):
+    """
+    Returns the current versions of the names, giving the missing ones a new version.
+    """
+    keys = [_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    timeout = cache_settings()['VERSION_TIMEOUT']
+    for key in keys:
+        if key not in versions:
+            # another process may have set it in the meantime, so keep whichever came first
+            cache.add(key, uuid4().hex, timeout)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _entry_key(cache, method, url, params, language, version_names):
+    """
+    Returns the cache key of the response to a request, at the current versions of `version_names`.
+    """
+    request = u'{} {} {} {} {}'.format(
+        method,
+        url,
+        sorted((unicode(name), unicode(value)) for name, value in params.iteritems()),
+        language,
+        _get_versions(cache, version_names),
+    )
+    return u'{}.response.{}'.format(KEY_PREFIX, hashlib.sha1(request.encode('utf-8')).hexdigest())
+
+
+def get_response(method, url, params, language, version_names):
+    """
+    Returns the key of the cache entry of the response to a request, and the cached response or None.
+
+    The key is None if caching is disabled.
+    """
+    cache = _get_cache()
+    if cache is None:
+        return None, None
+    key = _entry_key(cache, method, url, params, language, version_names)
+    return key, cache.get(key)
+
+
+def set_response(key, response, timeout):
+    """
+    Caches the response to a request, under the key returned by `get_response`.
+    """
+    cache = _get_cache()
+    if cache is not None:
+        cache.set(key, response, timeout)
+
+
+def list_timeout():
+    """
+    Returns how long lists of threads are cached for.
+    """
+    return cache_settings()['LIST_TIMEOUT']
+
+
+def item_timeout():
+    """
+    Returns how long single threads, comments and users are cached for.
+    """
+    return cache_settings()['ITEM_TIMEOUT']
+
+
+def invalidate(*version_names):
+    """
+    Gives the names new versions, so that the cached responses which depend on them are no longer used.
+    """
+    cache = _get_cache()
+    if cache is None or not version_names:
+        return
+    timeout = cache_settings()['VERSION_TIMEOUT']
+    cache.set_many(
+        {_version_key(name): uuid4().hex for name in version_names},
+        timeout
+    )
@@ -1,4 +1,5 @@
 from .utils import CommentClientRequestError, perform_request
+from . import caching
 
 from .thread import Thread, _url_for_flag_abuse_thread, _url_for_unflag_abuse_thread
 from lms.lib.comment_client import models
@@ -35,6 +36,21 @@ class Comment(models.Model):
         """Return the context of the thread which this comment belongs to."""
         return self.thread.context
 
+    def _cache_versions(self):
+        return [caching.comment_version(self.id)]
+
+    def _invalidated_versions(self):
+        versions = [
+            caching.comment_version(self.id),
+            caching.thread_version(self.attributes.get('thread_id')),
+            caching.course_version(self.attributes.get('course_id')),
+        ]
+        if self.attributes.get('parent_id'):
+            versions.append(caching.comment_version(self.attributes['parent_id']))
+        if self.attributes.get('user_id'):
+            versions.append(caching.user_version(self.attributes['user_id']))
+        return versions
+
     @classmethod
     def url_for_comments(cls, params={}):
         if params.get('parent_id'):
@@ -65,6 +81,7 @@ class Comment(models.Model):
             metric_action='comment.abuse.flagged'
         )
         voteable._update_from_response(response)
+        voteable.invalidate_cache()
 
     def unFlagAbuse(self, user, voteable, removeAll):
         if voteable.type == 'thread':
@@ -86,6 +103,7 @@ class Comment(models.Model):
             metric_action='comment.abuse.unflagged'
         )
         voteable._update_from_response(response)
+        voteable.invalidate_cache()
 
 
 def _url_for_thread_comments(thread_id):
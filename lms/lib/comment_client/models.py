@@ -1,5 +1,6 @@
 import logging
 
+from . import caching
 from .utils import extract, perform_request, CommentClientRequestError
 
 
@@ -73,10 +74,30 @@ class Model(object):
             url,
             self.default_retrieve_params,
             metric_tags=self._metric_tags,
-            metric_action='model.retrieve'
+            metric_action='model.retrieve',
+            cache_versions=self._cache_versions(),
+            cache_timeout=caching.item_timeout()
         )
         self._update_from_response(response)
 
+    def _cache_versions(self):
+        """
+        Returns the names of the cache versions that this object depends on, or None not to cache it.
+        """
+        return None
+
+    def _invalidated_versions(self):
+        """
+        Returns the names of the cache versions that a change to this object invalidates.
+        """
+        return []
+
+    def invalidate_cache(self):
+        """
+        Invalidates the cached responses of the comments service that depend on this object.
+        """
+        caching.invalidate(*self._invalidated_versions())
+
     @property
     def _metric_tags(self):
         """
@@ -146,6 +167,7 @@ class Model(object):
             )
         self.retrieved = True
         self._update_from_response(response)
+        self.invalidate_cache()
         self.after_save(self)
 
     def delete(self):
@@ -153,6 +175,7 @@ class Model(object):
         response = perform_request('delete', url, metric_tags=self._metric_tags, metric_action='model.delete')
         self.retrieved = True
         self._update_from_response(response)
+        self.invalidate_cache()
 
     @classmethod
     def url_with_id(cls, params={}):
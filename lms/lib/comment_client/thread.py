@@ -3,6 +3,7 @@ import logging
 from eventtracking import tracker
 from .utils import merge_dict, strip_blank, strip_none, extract, perform_request
 from .utils import CommentClientRequestError
+from . import caching
 import models
 import settings
 
@@ -63,7 +64,9 @@ class Thread(models.Model):
             params,
             metric_tags=[u'course_id:{}'.format(query_params['course_id'])],
             metric_action='thread.search',
-            paged_results=True
+            paged_results=True,
+            cache_versions=caching.list_versions(params['course_id'], params.get('user_id')),
+            cache_timeout=caching.list_timeout()
         )
         if query_params.get('text'):
             search_query = query_params['text']
@@ -136,9 +139,26 @@ class Thread(models.Model):
             url,
             request_params,
             metric_action='model.retrieve',
-            metric_tags=self._metric_tags
+            metric_tags=self._metric_tags,
+            cache_versions=self._cache_versions(),
+            cache_timeout=caching.item_timeout()
         )
         self._update_from_response(response)
+        if request_params.get('mark_as_read') and 'user_id' in request_params:
+            # the lists of threads seen by the user show this thread as read from now on
+            caching.invalidate(caching.reads_version(request_params['user_id']))
+
+    def _cache_versions(self):
+        return [caching.thread_version(self.id)]
+
+    def _invalidated_versions(self):
+        versions = [
+            caching.thread_version(self.id),
+            caching.course_version(self.attributes.get('course_id')),
+        ]
+        if self.attributes.get('user_id'):
+            versions.append(caching.user_version(self.attributes['user_id']))
+        return versions
 
     def flagAbuse(self, user, voteable):
         if voteable.type == 'thread':
@@ -156,6 +176,7 @@ class Thread(models.Model):
             metric_tags=self._metric_tags
         )
         voteable._update_from_response(response)
+        voteable.invalidate_cache()
 
     def unFlagAbuse(self, user, voteable, removeAll):
         if voteable.type == 'thread':
@@ -177,6 +198,7 @@ class Thread(models.Model):
             metric_action='thread.abuse.unflagged'
         )
         voteable._update_from_response(response)
+        voteable.invalidate_cache()
 
     def pin(self, user, thread_id):
         url = _url_for_pin_thread(thread_id)
@@ -189,6 +211,7 @@ class Thread(models.Model):
             metric_action='thread.pin'
         )
         self._update_from_response(response)
+        self.invalidate_cache()
 
     def un_pin(self, user, thread_id):
         url = _url_for_un_pin_thread(thread_id)
@@ -201,6 +224,7 @@ class Thread(models.Model):
             metric_action='thread.unpin'
         )
         self._update_from_response(response)
+        self.invalidate_cache()
 
 
 def _url_for_flag_abuse_thread(thread_id):
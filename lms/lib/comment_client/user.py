@@ -1,4 +1,5 @@
 from .utils import merge_dict, perform_request, CommentClientRequestError
+from . import caching
 
 import models
 import settings
@@ -38,6 +39,7 @@ class User(models.Model):
             metric_action='user.follow',
             metric_tags=self._metric_tags + ['target.type:{}'.format(source.type)],
         )
+        self.invalidate_cache()
 
     def unfollow(self, source):
         params = {'source_type': source.type, 'source_id': source.id}
@@ -48,6 +50,7 @@ class User(models.Model):
             metric_action='user.unfollow',
             metric_tags=self._metric_tags + ['target.type:{}'.format(source.type)],
         )
+        self.invalidate_cache()
 
     def vote(self, voteable, value):
         if voteable.type == 'thread':
@@ -65,6 +68,8 @@ class User(models.Model):
             metric_tags=self._metric_tags + ['target.type:{}'.format(voteable.type)],
         )
         voteable._update_from_response(response)
+        voteable.invalidate_cache()
+        self.invalidate_cache()
 
     def unvote(self, voteable):
         if voteable.type == 'thread':
@@ -82,6 +87,8 @@ class User(models.Model):
             metric_tags=self._metric_tags + ['target.type:{}'.format(voteable.type)],
         )
         voteable._update_from_response(response)
+        voteable.invalidate_cache()
+        self.invalidate_cache()
 
     def active_threads(self, query_params={}):
         if not self.course_id:
@@ -96,6 +103,8 @@ class User(models.Model):
             metric_action='user.active_threads',
             metric_tags=self._metric_tags,
             paged_results=True,
+            cache_versions=caching.list_versions(params['course_id'], self.id),
+            cache_timeout=caching.list_timeout(),
         )
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
@@ -111,10 +120,18 @@ class User(models.Model):
             params,
             metric_action='user.subscribed_threads',
             metric_tags=self._metric_tags,
-            paged_results=True
+            paged_results=True,
+            cache_versions=caching.list_versions(params['course_id'], self.id),
+            cache_timeout=caching.list_timeout(),
         )
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
+    def _cache_versions(self):
+        return [caching.user_version(self.id)]
+
+    def _invalidated_versions(self):
+        return [caching.user_version(self.id)]
+
     def _retrieve(self, *args, **kwargs):
         url = self.url(action='get', params=self.attributes)
         retrieve_params = self.default_retrieve_params.copy()
@@ -130,6 +147,8 @@ class User(models.Model):
                 retrieve_params,
                 metric_action='model.retrieve',
                 metric_tags=self._metric_tags,
+                cache_versions=self._cache_versions(),
+                cache_timeout=caching.item_timeout(),
             )
         except CommentClientRequestError as e:
             if e.status_code == 404:
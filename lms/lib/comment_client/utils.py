@@ -1,14 +1,36 @@
 from contextlib import contextmanager
 import dogstats_wrapper as dog_stats_api
 import logging
+from multiprocessing.pool import ThreadPool
+import os
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 from django.conf import settings
-from time import time
+from time import sleep, time
 from uuid import uuid4
+from django.utils import translation
 from django.utils.translation import get_language
 
+from . import caching
+
 log = logging.getLogger(__name__)
 
+# The defaults of the COMMENTS_SERVICE_HTTP setting
+DEFAULT_HTTP_SETTINGS = {
+    'TIMEOUT': 5,
+    'MAX_RETRIES': 2,
+    'RETRY_BACKOFF': 0.1,
+    'POOL_SIZE': 10,
+    'CONCURRENT_REQUESTS': 4,
+}
+
+# Only the requests of these methods are retried, as the others may have reached the service
+RETRIED_METHODS = ('get', 'head')
+
+_transport_lock = threading.Lock()
+_transport = {}
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -50,9 +72,134 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def http_settings():
+    """
+    Returns the COMMENTS_SERVICE_HTTP setting, with its defaults.
+    """
+    return merge_dict(DEFAULT_HTTP_SETTINGS, getattr(settings, 'COMMENTS_SERVICE_HTTP', {}))
+
+
+def _get_transport(name, factory):
+    """
+    Returns the transport object `name` of this process, made by `factory` if there is none yet.
+
+    Forked processes (e.g. workers of a preforking server) make their own, so
+    that they never share connections or threads with their parent.
+    """
+    pid = os.getpid()
+    with _transport_lock:
+        if _transport.get('pid') != pid:
+            _transport.clear()
+            _transport['pid'] = pid
+        if name not in _transport:
+            _transport[name] = factory()
+        return _transport[name]
+
+
+def get_session():
+    """
+    Returns the requests session of this process, which keeps the connections to the comments service alive.
+    """
+    def make_session():
+        pool_size = http_settings()['POOL_SIZE']
+        session = requests.Session()
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        return session
+    return _get_transport('session', make_session)
+
+
+class _Result(object):
+    """
+    The result of a function that was called in the current thread, like that of ThreadPool.apply_async.
+    """
+    def __init__(self, function, args, kwargs):
+        self.value = self.error = None
+        try:
+            self.value = function(*args, **kwargs)
+        except Exception as error:  # pylint: disable=broad-except
+            self.error = error
+
+    def get(self):
+        """
+        Returns the result of the function, or raises its exception.
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _call_with_language(language, function, args, kwargs):
+    """
+    Calls the function with the given language activated, for the Accept-Language header of its requests.
+    """
+    with translation.override(language):
+        return function(*args, **kwargs)
+
+
+def start_request(function, *args, **kwargs):
+    """
+    Starts calling `function`, which makes requests to the comments service, in a worker thread.
+
+    Returns an object whose `get()` method waits for the function, and returns
+    its result or raises its exception. The function must not use the database,
+    as worker threads have their own connections. If COMMENTS_SERVICE_HTTP
+    allows no CONCURRENT_REQUESTS, the function is called right away.
+    """
+    workers = http_settings()['CONCURRENT_REQUESTS']
+    if workers <= 1:
+        return _Result(function, args, kwargs)
+    pool = _get_transport('pool', lambda: ThreadPool(workers))
+    return pool.apply_async(_call_with_language, (get_language(), function, args, kwargs))
+
+
+def perform_concurrently(*functions):
+    """
+    Calls the functions, which make requests to the comments service, concurrently, and returns their results.
+    """
+    results = [start_request(function) for function in functions]
+    return [result.get() for result in results]
+
+
+def _send_request(method, url, data, params, headers):
+    """
+    Sends the request to the comments service with the session of this process, and returns the response.
+
+    Requests of RETRIED_METHODS that fail to connect or time out are retried up
+    to MAX_RETRIES times, waiting RETRY_BACKOFF seconds, then twice as long each time.
+    """
+    config = http_settings()
+    retries = config['MAX_RETRIES'] if method in RETRIED_METHODS else 0
+    attempt = 0
+    while True:
+        try:
+            return get_session().request(
+                method,
+                url,
+                data=data,
+                params=params,
+                headers=headers,
+                timeout=config['TIMEOUT']
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+            if attempt >= retries:
+                raise
+            log.warning(u"Retrying comments service request %s %s after error: %s", method, url, error)
+            dog_stats_api.increment('comment_client.request.retry', tags=[u'method:{}'.format(method)])
+            sleep(config['RETRY_BACKOFF'] * (2 ** attempt))
+            attempt += 1
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
-                    metric_action=None, metric_tags=None, paged_results=False):
+                    metric_action=None, metric_tags=None, paged_results=False,
+                    cache_versions=None, cache_timeout=None):
+    """
+    Sends a request to the comments service, and returns its decoded response.
 
+    If `cache_versions` is given for a 'get' request, its response is read
+    through the comments service cache: it is cached for `cache_timeout`
+    seconds, until one of the versions named in `cache_versions` is invalidated.
+    """
     if metric_tags is None:
         metric_tags = []
 
@@ -62,6 +209,20 @@ def perform_request(method, url, data_or_params=None, raw=False,
 
     if data_or_params is None:
         data_or_params = {}
+
+    cache_key = None
+    if cache_versions is not None and method == 'get' and not raw:
+        cache_key, cached_response = caching.get_response(
+            method, url, data_or_params, get_language(), cache_versions
+        )
+        if cache_key is not None:
+            dog_stats_api.increment(
+                'comment_client.cache.hit' if cached_response is not None else 'comment_client.cache.miss',
+                tags=metric_tags
+            )
+        if cached_response is not None:
+            return cached_response
+
     headers = {
         'X-Edx-Api-Key': getattr(settings, "COMMENTS_SERVICE_KEY", None),
         'Accept-Language': get_language(),
@@ -76,14 +237,7 @@ def perform_request(method, url, data_or_params=None, raw=False,
         data = None
         params = merge_dict(data_or_params, request_id_dict)
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
-            method,
-            url,
-            data=data,
-            params=params,
-            headers=headers,
-            timeout=5
-        )
+        response = _send_request(method, url, data, params, headers)
 
     metric_tags.append(u'status_code:{}'.format(response.status_code))
     if response.status_code > 200:
@@ -129,6 +283,8 @@ def perform_request(method, url, data_or_params=None, raw=False,
                     value=data.get('num_pages', 1),
                     tags=metric_tags
                 )
+            if cache_key is not None:
+                caching.set_response(cache_key, data, cache_timeout)
             return data
 
 
@@ -0,0 +1,251 @@
+"""
+A precomputed index of a course's block tree, used for courseware navigation.
+
+The index is generated from the published course whenever it is published (see
+signals.py and tasks.py) and stored on the CourseStructure model, so that
+finding the chapter/section path to a block (as ``jump_to`` does) is a plain
+dictionary walk rather than a modulestore traversal that loads descriptors.
+
+Each entry also holds the data that per-user transformations of the tree
+need (see courseware.block_transformers), such as visibility settings, group
+access and video and discussion metadata, so that course outlines and
+discussion category maps can be computed for a user without instantiating any
+XBlocks.
+"""
+from capa import responsetypes
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
+from xmodule.fields import Date
+from xmodule.modulestore.exceptions import ItemNotFoundError, NoPathToItem
+
+
+# Categories whose position among their children is part of a courseware url.
+POSITIONAL_CATEGORIES = ('sequential', 'videosequence')
+
+# The version of the entry format. Indexes in an older format lack the data
+# needed by per-user transformations.
+BLOCK_TREE_FORMAT = 2
+
+DATE_FIELD = Date()
+
+
+def block_tree_key(block, course_key):
+    """
+    Return the key under which ``block`` is indexed: its usage key string,
+    without any branch or version information.
+    """
+    return unicode(block.location.map_into_course(course_key))
+
+
+def supports_multi_device(block):
+    """
+    Return whether the student view of ``block`` supports multiple devices.
+
+    This is answered without binding the block to a user: problems support
+    multiple devices if all of their response types do (as in
+    LoncapaProblem.has_multi_device_support), and other blocks if their
+    student view is marked as supporting them.
+    """
+    if block.category == 'problem' and hasattr(block, 'problem_types'):
+        return all(
+            responsetypes.registry.get_class_for_tag(tag).multi_device_support
+            for tag in block.problem_types
+        )
+    view_class = getattr(block, 'module_class', type(block))
+    return block.has_support(getattr(view_class, 'student_view', None), 'multi_device')
+
+
+def video_metadata(video):
+    """
+    Return the metadata of the video block ``video`` that the mobile video outline needs.
+    """
+    transcripts = video.get_transcripts_info()
+    return {
+        'edx_video_id': video.edx_video_id,
+        'only_on_web': video.only_on_web,
+        'html5_sources': video.html5_sources,
+        'source': video.source,
+        'transcript_languages': sorted(video.available_translations(transcripts, verify_assets=False)),
+        'default_transcript_language': video.get_default_transcript_language(transcripts),
+    }
+
+
+def discussion_metadata(block):
+    """
+    Return the metadata of the discussion block ``block`` that discussion category maps need,
+    or None if it lacks any of the fields that place it in the map.
+    """
+    fields = ('discussion_id', 'discussion_category', 'discussion_target')
+    if any(getattr(block, field, None) is None for field in fields):
+        return None
+    return {
+        'id': block.discussion_id,
+        'category': block.discussion_category,
+        'target': block.discussion_target,
+        'sort_key': getattr(block, 'sort_key', None),
+    }
+
+
+def _split_test_children(block, course_key):
+    """
+    Return the group_id_to_child mapping of the split_test ``block``, with the children as index keys.
+    """
+    group_id_to_child = {}
+    for group_id, child in block.group_id_to_child.iteritems():
+        try:
+            group_id_to_child[group_id] = unicode(UsageKey.from_string(child).map_into_course(course_key))
+        except InvalidKeyError:
+            continue
+    return group_id_to_child
+
+
+def block_tree_entry(block, children, parent, course_key):
+    """
+    Return the index entry for ``block`` (a descriptor), whose visible children are ``children``.
+    """
+    entry = {
+        'block_type': block.category,
+        'url_name': block.location.name,
+        'display_name': block.display_name_with_default,
+        'raw_display_name': block.display_name,
+        'parent': block_tree_key(parent, course_key) if parent is not None else None,
+        'children': [block_tree_key(child, course_key) for child in children],
+        'start': DATE_FIELD.to_json(getattr(block, 'start', None)),
+        'due': DATE_FIELD.to_json(getattr(block, 'due', None)),
+        'days_early_for_beta': getattr(block, 'days_early_for_beta', None),
+        'format': getattr(block, 'format', None),
+        'graded': getattr(block, 'graded', False),
+        'hide_from_toc': getattr(block, 'hide_from_toc', False),
+        'visible_to_staff_only': getattr(block, 'visible_to_staff_only', False),
+        # Group access of the block and its ancestors, as partition id (a string, in JSON) to group ids
+        'group_access': getattr(block, 'merged_group_access', {}),
+        'has_dynamic_children': block.has_dynamic_children() if hasattr(block, 'has_dynamic_children') else False,
+        'multi_device': supports_multi_device(block),
+    }
+    if block.category == 'split_test':
+        entry['user_partition_id'] = block.user_partition_id
+        entry['group_id_to_child'] = _split_test_children(block, course_key)
+    if block.category == 'video':
+        entry['video'] = video_metadata(block)
+    if block.category == 'discussion':
+        discussion = discussion_metadata(block)
+        if discussion is not None:
+            entry['discussion'] = discussion
+    return entry
+
+
+class BlockTree(object):
+    """
+    Read-only navigation queries over a stored block tree index.
+
+    ``data`` is the dict stored in ``CourseStructure.block_tree_json``::
+
+        {
+            'format': <BLOCK_TREE_FORMAT of the entries>,
+            'version': <course version the index was built from, or None>,
+            'edited_on': <the course's subtree_edited_on when the index was built, or None>,
+            'root': <usage key string of the course>,
+            'blocks': {<usage key string>: <see block_tree_entry>},
+            'discussions': <usage key strings of the blocks with discussion metadata, in course order>,
+        }
+
+    Indexes built before discussions were indexed have no 'discussions'.
+    """
+    def __init__(self, course_key, data):
+        self.course_key = course_key
+        self.format = data.get('format', 1)
+        self.version = data.get('version')
+        self.edited_on = data.get('edited_on')
+        self.root = data['root']
+        self.blocks = data['blocks']
+        self.discussions = data.get('discussions')
+
+    def is_current_for(self, course):
+        """
+        Return True if the index was built from the published content of ``course``
+        (a descriptor), and holds the data needed by per-user transformations.
+        """
+        return (
+            self.format >= BLOCK_TREE_FORMAT and
+            self.edited_on == DATE_FIELD.to_json(course.subtree_edited_on)
+        )
+
+    def _usage_key(self, usage_key_string):
+        """
+        Return the UsageKey for a stored usage key string, in this course run.
+        """
+        return UsageKey.from_string(usage_key_string).map_into_course(self.course_key)
+
+    def _index_key(self, usage_key):
+        """
+        Return the key under which ``usage_key`` is stored in the index.
+        """
+        return unicode(usage_key.map_into_course(self.course_key))
+
+    def __contains__(self, usage_key):
+        return self._index_key(usage_key) in self.blocks
+
+    def get_block(self, usage_key):
+        """
+        Return the index entry for ``usage_key``.
+
+        Raises ItemNotFoundError if the block isn't in the index.
+        """
+        try:
+            return self.blocks[self._index_key(usage_key)]
+        except KeyError:
+            raise ItemNotFoundError(usage_key)
+
+    def get_parent(self, usage_key):
+        """
+        Return the UsageKey of the parent of ``usage_key``, or None for the root or an orphan.
+        """
+        parent = self.get_block(usage_key)['parent']
+        return self._usage_key(parent) if parent is not None else None
+
+    def get_children(self, usage_key):
+        """
+        Return the UsageKeys of the children of ``usage_key``, in courseware order.
+        """
+        return [self._usage_key(child) for child in self.get_block(usage_key)['children']]
+
+    def chapters(self):
+        """
+        Return the index entries of the course's chapters, in order, paired with their usage key strings.
+        """
+        return [(chapter, self.blocks[chapter]) for chapter in self.blocks[self.root]['children']]
+
+    def path_to_location(self, usage_key):
+        """
+        Return the same (course_id, chapter, section, vertical, position, final_target_id)
+        tuple as :func:`xmodule.modulestore.search.path_to_location`, computed from the index.
+
+        Raises ItemNotFoundError if the block isn't in the index, and NoPathToItem if
+        it isn't reachable from the course root.
+        """
+        path = [self._index_key(usage_key)]
+        block = self.get_block(usage_key)
+        while block['block_type'] != 'course':
+            parent = block['parent']
+            if parent is None:
+                raise NoPathToItem(usage_key)
+            path.insert(0, parent)
+            block = self.blocks[parent]
+
+        entries = [self.blocks[key] for key in path]
+        length = len(path)
+        chapter = entries[1]['url_name'] if length > 1 else None
+        section = entries[2]['url_name'] if length > 2 else None
+        vertical = entries[3]['url_name'] if length > 3 else None
+
+        position = None
+        if length > 3:
+            position_list = []
+            for path_index in range(2, length - 1):
+                if entries[path_index]['block_type'] in POSITIONAL_CATEGORIES:
+                    # positions are 1-indexed, and should be strings to be consistent with
+                    # url parsing.
+                    position_list.append(str(entries[path_index]['children'].index(path[path_index + 1]) + 1))
+            position = "_".join(position_list)
+
+        return (self.course_key, chapter, section, vertical, position, self._usage_key(path[-1]))
@@ -2,11 +2,14 @@ import json
 import logging
 
 from collections import OrderedDict
+from django.db import models
 from model_utils.models import TimeStampedModel
 
 from util.models import CompressedTextField
 from xmodule_django.models import CourseKeyField, UsageKey
 
+from .block_tree import BlockTree
+
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
@@ -24,6 +27,11 @@ class CourseStructure(TimeStampedModel):
     # JSON mapping of discussion ids to usage keys for the corresponding discussion modules
     discussion_id_map_json = CompressedTextField(verbose_name='Discussion ID Map JSON', blank=True, null=True)
 
+    # JSON navigation index of the published block tree (see block_tree.py), and
+    # the version of the course it was generated from
+    block_tree_json = CompressedTextField(verbose_name='Block Tree JSON', blank=True, null=True)
+    course_version = models.CharField(max_length=255, blank=True, null=True, verbose_name='Course Version')
+
     @property
     def structure(self):
         if self.structure_json:
@@ -53,6 +61,25 @@ class CourseStructure(TimeStampedModel):
             return result
         return None
 
+    @property
+    def block_tree(self):
+        """
+        Return the navigation index for the course as a BlockTree, or None if it hasn't been generated.
+        """
+        if self.block_tree_json:
+            return BlockTree(self.course_id, json.loads(self.block_tree_json))
+        return None
+
+    @classmethod
+    def get_block_tree(cls, course_key):
+        """
+        Return the BlockTree for ``course_key``, or None if there is no current index for the course.
+        """
+        try:
+            return cls.objects.get(course_id=course_key).block_tree
+        except cls.DoesNotExist:
+            return None
+
     def _traverse_tree(self, block, unordered_structure, ordered_blocks, parent=None):
         """
         Traverses the tree and fills in the ordered_blocks OrderedDict with the blocks in
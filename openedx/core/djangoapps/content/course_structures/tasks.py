@@ -3,25 +3,33 @@ import logging
 
 from celery.task import task
 from opaque_keys.edx.keys import CourseKey
+from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 
+from .block_tree import BLOCK_TREE_FORMAT, DATE_FIELD, block_tree_entry, block_tree_key
+
 
 log = logging.getLogger('edx.celery.task')
 
 
 def _generate_course_structure(course_key):
     """
-    Generates a course structure dictionary for the specified course.
+    Generates a course structure dictionary for the specified course, from its published content.
     """
-    with modulestore().bulk_operations(course_key):
+    store = modulestore()
+    with store.bulk_operations(course_key), store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
         course = modulestore().get_course(course_key, depth=None)
-        blocks_stack = [course]
+        blocks_stack = [(course, None)]
         blocks_dict = {}
+        block_tree = {}
         discussions = {}
         while blocks_stack:
-            curr_block = blocks_stack.pop()
+            curr_block, parent = blocks_stack.pop()
             children = curr_block.get_children() if curr_block.has_children else []
             key = unicode(curr_block.scope_ids.usage_id)
+            block_tree[block_tree_key(curr_block, course_key)] = block_tree_entry(
+                curr_block, children, parent, course_key
+            )
             block = {
                 "usage_key": key,
                 "block_type": curr_block.category,
@@ -47,12 +55,32 @@ def _generate_course_structure(course_key):
             blocks_dict[key] = block
 
             # Add this blocks children to the stack so that we can traverse them as well.
-            blocks_stack.extend(children)
+            blocks_stack.extend((child, curr_block) for child in children)
+
+        # discussion category maps list the discussions in course order
+        root = block_tree_key(course, course_key)
+        indexed_discussions = []
+        keys_stack = [root]
+        while keys_stack:
+            key = keys_stack.pop()
+            if 'discussion' in block_tree[key]:
+                indexed_discussions.append(key)
+            keys_stack.extend(reversed(block_tree[key]['children']))
+
+        version = getattr(course.location.course_key, 'version_guid', None)
         return {
             'structure': {
                 "root": unicode(course.scope_ids.usage_id),
                 "blocks": blocks_dict
             },
+            'block_tree': {
+                'format': BLOCK_TREE_FORMAT,
+                'version': unicode(version) if version else None,
+                'edited_on': DATE_FIELD.to_json(course.subtree_edited_on),
+                'root': root,
+                'blocks': block_tree,
+                'discussions': indexed_discussions,
+            },
             'discussion_id_map': discussions
         }
 
@@ -80,16 +108,22 @@ def update_course_structure(course_key):
 
     structure_json = json.dumps(structure['structure'])
     discussion_id_map_json = json.dumps(structure['discussion_id_map'])
+    block_tree_json = json.dumps(structure['block_tree'])
+    course_version = structure['block_tree']['version']
 
     structure_model, created = CourseStructure.objects.get_or_create(
         course_id=course_key,
         defaults={
             'structure_json': structure_json,
-            'discussion_id_map_json': discussion_id_map_json
+            'discussion_id_map_json': discussion_id_map_json,
+            'block_tree_json': block_tree_json,
+            'course_version': course_version,
         }
     )
 
     if not created:
         structure_model.structure_json = structure_json
         structure_model.discussion_id_map_json = discussion_id_map_json
+        structure_model.block_tree_json = block_tree_json
+        structure_model.course_version = course_version
         structure_model.save()
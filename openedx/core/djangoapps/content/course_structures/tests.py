@@ -1,7 +1,11 @@
 import json
 
+from mock import patch
+
 from xmodule_django.models import UsageKey
 from xmodule.modulestore.django import SignalHandler
+from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule.modulestore.search import path_to_location
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
@@ -226,3 +230,96 @@ class CourseStructureTaskTests(ModuleStoreTestCase):
             [unicode(value) for value in structure.discussion_id_map.values()],
             expected_structure['discussion_id_map'].values()
         )
+
+
+class BlockTreeTests(ModuleStoreTestCase):
+    """
+    Tests for the navigation index stored on CourseStructure.
+    """
+    def setUp(self):
+        super(BlockTreeTests, self).setUp()
+        self.course = CourseFactory.create(org='TestX', course='TS102', run='T1')
+        self.chapter = ItemFactory.create(parent=self.course, category='chapter', display_name='Chapter')
+        self.sequential = ItemFactory.create(
+            parent=self.chapter, category='sequential', display_name='Sequential', graded=True, format='Homework'
+        )
+        self.verticals = [
+            ItemFactory.create(parent=self.sequential, category='vertical', display_name='Vertical {}'.format(index))
+            for index in range(2)
+        ]
+        self.problem = ItemFactory.create(parent=self.verticals[1], category='problem', display_name='Problem')
+        update_course_structure(unicode(self.course.id))
+        self.block_tree = CourseStructure.get_block_tree(self.course.id)
+
+    def test_entries(self):
+        sequential = self.block_tree.get_block(self.sequential.location)
+        self.assertEqual(sequential['display_name'], 'Sequential')
+        self.assertEqual(sequential['format'], 'Homework')
+        self.assertTrue(sequential['graded'])
+        self.assertEqual(self.block_tree.get_parent(self.sequential.location), self.chapter.location)
+        self.assertEqual(
+            self.block_tree.get_children(self.sequential.location),
+            [vertical.location for vertical in self.verticals]
+        )
+        self.assertIsNone(self.block_tree.get_parent(self.course.location))
+
+    def test_user_transform_data(self):
+        self.assertTrue(self.block_tree.is_current_for(self.store.get_course(self.course.id)))
+        problem = self.block_tree.get_block(self.problem.location)
+        self.assertEqual(problem['raw_display_name'], 'Problem')
+        self.assertEqual(problem['group_access'], {})
+        self.assertFalse(problem['visible_to_staff_only'])
+        self.assertFalse(problem['has_dynamic_children'])
+        self.assertIn('multi_device', problem)
+
+    def test_video_metadata(self):
+        video = ItemFactory.create(
+            parent=self.verticals[0],
+            category='video',
+            edx_video_id='test-video',
+            html5_sources=['http://example.com/video.mp4'],
+            transcripts={'fr': 'fr.srt'},
+        )
+        update_course_structure(unicode(self.course.id))
+        entry = CourseStructure.get_block_tree(self.course.id).get_block(video.location)
+        self.assertEqual(entry['video']['edx_video_id'], 'test-video')
+        self.assertEqual(entry['video']['html5_sources'], ['http://example.com/video.mp4'])
+        self.assertEqual(entry['video']['transcript_languages'], ['fr'])
+        self.assertEqual(entry['video']['default_transcript_language'], 'fr')
+
+    def test_discussion_metadata(self):
+        discussions = [
+            ItemFactory.create(
+                parent=vertical,
+                category='discussion',
+                discussion_id='discussion_{}'.format(index),
+                discussion_category='Week 1',
+                discussion_target='Topic {}'.format(index),
+            )
+            for index, vertical in enumerate(self.verticals)
+        ]
+        update_course_structure(unicode(self.course.id))
+        block_tree = CourseStructure.get_block_tree(self.course.id)
+        self.assertEqual(block_tree.discussions, [unicode(discussion.location) for discussion in discussions])
+        self.assertEqual(
+            block_tree.get_block(discussions[1].location)['discussion'],
+            {'id': 'discussion_1', 'category': 'Week 1', 'target': 'Topic 1', 'sort_key': None}
+        )
+
+    def test_path_to_location(self):
+        for block in [self.course, self.chapter, self.sequential, self.verticals[0], self.problem]:
+            self.assertEqual(
+                self.block_tree.path_to_location(block.location),
+                path_to_location(self.store, block.location),
+            )
+
+    def test_not_indexed(self):
+        missing = self.course.id.make_usage_key('problem', 'missing')
+        self.assertNotIn(missing, self.block_tree)
+        with self.assertRaises(ItemNotFoundError):
+            self.block_tree.path_to_location(missing)
+
+    def test_cleared_on_publish(self):
+        with patch('openedx.core.djangoapps.content.course_structures.tasks.update_course_structure'):
+            listen_for_course_publish(None, self.course.id)
+        self.assertIsNone(CourseStructure.get_block_tree(self.course.id))